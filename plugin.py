@@ -2,53 +2,377 @@ import os
 import json
 import pyttsx3
 import logging
+import logging.handlers
+import atexit
+import random
+import contextvars
+import uuid
+import hashlib
+import heapq
+import math
+import mmap
+import struct
 import sys
 import threading
 import re
 from datetime import datetime
-from ctypes import byref, windll, wintypes
-from queue import Queue
+import ctypes
+import codecs
+import socket
+from ctypes import byref, wintypes
+try:
+    from ctypes import windll
+except ImportError:  # not running on Windows
+    windll = None
+try:
+    import winsound
+except ImportError:  # not running on Windows
+    winsound = None
+from queue import Empty, Full, Queue
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
 import base64
-from PIL import ImageGrab
+from PIL import Image, ImageGrab
 from io import BytesIO
 import time
+import asyncio
+import sqlite3
+import wave
 
-# Configure logging
-logging.basicConfig(
-    filename="loremaster.log",
-    level=logging.DEBUG,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    encoding='utf-8'
-)
+# Logging: callers only enqueue records (after level and sampling checks); a QueueListener
+# thread writes them, so lazy arguments such as redacted message copies are only built
+# for records that are actually written.
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread where that is safe."""
+
+    SCALARS = (str, int, float, bool, bytes, type(None))
+
+    def prepare(self, record):
+        record.request_id = tracer.request_id()
+        record.request_prefix = f"[{record.request_id}] " if record.request_id else ""
+        args = record.args or ()
+        if isinstance(args, dict) or not all(isinstance(arg, self.SCALARS) for arg in args):
+            # The caller may change a dict, list or object before the listener gets to it; format it as it is now
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+class _SamplingFilter(logging.Filter):
+    """Keeps a configured fraction of the records of each sampled category."""
+
+    def __init__(self):
+        super().__init__()
+        self.rates = {}
+    
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, "category", None))
+        return rate is None or random.random() < rate
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record):
+        entry = {"time": self.formatTime(record, self.datefmt), "level": record.levelname, "thread": record.threadName, "message": record.getMessage()}
+        category = getattr(record, "category", None)
+        if category:
+            entry["category"] = category
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _ConsoleHandler(logging.StreamHandler):
+    """Console output that replaces characters the console encoding cannot show."""
+
+    def format(self, record):
+        message = super().format(record)
+        encoding = getattr(self.stream, "encoding", None) or "utf-8"
+        return message.encode(encoding, errors="replace").decode(encoding)
+
+_logger = logging.getLogger("loremaster")
+_log_queue = Queue()
+_sampling_filter = _SamplingFilter()
+_log_listener = None
+
+def configure_logging(logging_config=None):
+    """(Re)build the logging pipeline from the "logging" config section."""
+    global _log_listener
+    logging_config = logging_config or {}
+    
+    if logging_config.get("format", "text") == "json":
+        file_formatter = JsonLinesFormatter(datefmt='%Y-%m-%d %H:%M:%S')
+    else:
+        file_formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(request_prefix)s%(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    file_handler = logging.FileHandler(logging_config.get("file", "loremaster.log"), encoding="utf-8", errors="replace")
+    file_handler.setFormatter(file_formatter)
+    handlers = [file_handler]
+    if logging_config.get("console", False):
+        console_handler = _ConsoleHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter("[LOG] %(message)s"))
+        handlers.append(console_handler)
+    
+    if _log_listener:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+    _log_listener = logging.handlers.QueueListener(_log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    
+    _sampling_filter.rates = dict(logging_config.get("sampling", {}))
+    root = logging.getLogger()
+    if not any(isinstance(handler, _DeferredQueueHandler) for handler in root.handlers):
+        queue_handler = _DeferredQueueHandler(_log_queue)
+        queue_handler.addFilter(_sampling_filter)
+        root.addHandler(queue_handler)
+    root.setLevel(logging.WARNING)
+    _logger.setLevel(logging_config.get("level", "INFO").upper())
+
+def _stop_logging():
+    if _log_listener:
+        _log_listener.stop()
+
+configure_logging()
+atexit.register(_stop_logging)
 
 # Suppress excessive debug logs
 for noisy_module in ["comtypes", "pyttsx3.drivers", "comtypes.client._events", "openai", "httpx", "httpcore"]:
     logging.getLogger(noisy_module).setLevel(logging.WARNING)
 
-def log_event(message):
-    # Clean message to avoid encoding issues
-    try:
-        clean_message = str(message).encode('utf-8', errors='replace').decode('utf-8')
-    except:
-        clean_message = str(message)
+def log_event(message, *args, level=logging.INFO, category=None):
+    """
+    Log a plugin event. args are %-formatted into message only if the record is written,
+    so expensive values can be passed as objects with a lazy __str__. Scalar args are
+    formatted on the logging thread; others when the record is queued. Messages starting
+    with "Warning" or "Error" are logged at that level. category names a sampling bucket
+    from the "logging" config.
+    """
+    if level == logging.INFO and isinstance(message, str) and message.startswith(("Warning", "Error")):
+        level = logging.WARNING if message.startswith("Warning") else logging.ERROR
+    if _logger.isEnabledFor(level):
+        _logger.log(level, message, *args, extra={"category": category})
+
+class LatencyHistogram:
+    """Latencies of one stage over a rolling window of the most recent samples."""
+
+    def __init__(self, window=512):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
     
-    # Use the logging module (which already writes to loremaster.log)
-    logging.info(clean_message)
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
     
-    # Print to console with safe encoding
-    try:
-        print(f"[LOG] {clean_message}")
-    except UnicodeEncodeError:
-        # Fallback for console output
-        safe_message = clean_message.encode('ascii', errors='replace').decode('ascii')
-        print(f"[LOG] {safe_message}")
+    def summary(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": self.count}
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 1),
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(samples[-1] * 1000, 1)
+        }
+
+class Trace:
+    __slots__ = ("request_id", "name", "start", "stages")
+
+    def __init__(self, name):
+        self.request_id = uuid.uuid4().hex[:8]
+        self.name = name
+        self.start = time.perf_counter()
+        self.stages = []
+
+class Tracer:
+    """
+    Per-request stage timing.
+
+    request() gives a talk call a request ID, kept in a context variable so it follows the
+    call across await points and into log records. stage() and record() time pipeline
+    stages into rolling histograms per stage and per stage and provider/model; stages that
+    run inside a request are also listed in its trace summary.
+    """
+
+    def __init__(self, window=512):
+        self.window = window
+        self.lock = threading.Lock()
+        self.stages = {}  # stage -> LatencyHistogram
+        self.models = {}  # (stage, "provider:model") -> LatencyHistogram
+        self.current = contextvars.ContextVar("loremaster_trace", default=None)
+    
+    def request_id(self):
+        trace = self.current.get()
+        return trace.request_id if trace else None
+    
+    @contextmanager
+    def request(self, name="talk"):
+        trace = Trace(name)
+        token = self.current.set(trace)
+        try:
+            yield trace
+        finally:
+            elapsed = time.perf_counter() - trace.start
+            self.current.reset(token)
+            self._add(name, elapsed)
+            stages = ", ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in trace.stages)
+            log_event(f"[{trace.request_id}] {name} took {elapsed * 1000:.0f}ms ({stages or 'no stages'})")
+    
+    @contextmanager
+    def stage(self, name, model=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, model)
+    
+    def record(self, name, seconds, model=None):
+        self._add(name, seconds, model)
+        trace = self.current.get()
+        if trace:
+            trace.stages.append((name, seconds))
+    
+    def _add(self, name, seconds, model=None):
+        with self.lock:
+            histogram = self.stages.get(name)
+            if histogram is None:
+                histogram = self.stages[name] = LatencyHistogram(self.window)
+            histogram.add(seconds)
+            if model:
+                histogram = self.models.get((name, model))
+                if histogram is None:
+                    histogram = self.models[(name, model)] = LatencyHistogram(self.window)
+                histogram.add(seconds)
+    
+    def reset(self):
+        with self.lock:
+            self.stages.clear()
+            self.models.clear()
+    
+    def stats(self):
+        with self.lock:
+            return {
+                "stages": {name: histogram.summary() for name, histogram in self.stages.items()},
+                "models": {f"{name} {model}": histogram.summary() for (name, model), histogram in self.models.items()}
+            }
+
+tracer = Tracer()
+
+class BackgroundLoop:
+    """
+    Event loop on a daemon thread that runs the asyncio core for the blocking API.
+
+    run() and iterate() block the calling thread until a coroutine or async generator on
+    the loop is done. Each call runs in a copy of the caller's context, so stages recorded
+    on the loop still land in the caller's trace.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def _get_loop(self):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self.loop.run_forever, name="asyncio-core", daemon=True)
+                self.thread.start()
+        return self.loop
+
+    def run(self, coro):
+        loop = self._get_loop()
+        if threading.current_thread() is self.thread:
+            coro.close()
+            raise RuntimeError("Blocking call made from the background event loop; await the async API instead.")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def iterate(self, agen):
+        async def next_item():
+            return await agen.__anext__()
+
+        try:
+            while True:
+                try:
+                    item = self.run(next_item())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            self.run(agen.aclose())
+
+background_loop = BackgroundLoop()
+
+class MetricsReporter:
+    """Periodically writes a stats snapshot to a JSON file (replaced atomically)."""
+
+    def __init__(self, stats_fn, path, interval_seconds=30):
+        self.stats_fn = stats_fn
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+    
+    def _run(self):
+        while not self.stop_event.wait(self.interval_seconds):
+            self.flush()
+    
+    def flush(self):
+        try:
+            snapshot = {"time": datetime.now().isoformat(timespec="seconds"), **self.stats_fn()}
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=2, default=str)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            log_event(f"Warning: Could not write metrics file {self.path}: {e}")
+    
+    def stop(self):
+        self.stop_event.set()
+        self.flush()
+
+class RedactedMessages:
+    """Log argument for a chat message list; the copy without image data is only built when the record is written."""
+
+    __slots__ = ("messages",)
+
+    def __init__(self, messages):
+        self.messages = messages
+    
+    def __str__(self):
+        return str(LLMHandler._safe_messages(self.messages))
 
 class ConfigManager:
     def __init__(self):
         self.api_key = self._load_openai_key()
         self.llm_config = self._load_llm_config()
         self.vision_config = self._load_vision_config()
+        self.parser_config = self._load_parser_config()
+        self.execution_config = self._load_execution_config()
+        self.transport_config = self._load_transport_config()
+        self.http_config = self._load_http_config()
+        self.residency_config = self._load_residency_config()
+        self.context_config = self._load_context_config()
+        self.logging_config = self._load_logging_config()
+        self.metrics_config = self._load_metrics_config()
+        self.speech_config = self._load_speech_config()
+        self.cassette_config = self._load_cassette_config()
+        self.reply_cache_config = self._load_reply_cache_config()
+        self.lore_config = self._load_lore_config()
+        self.routing_config = self._load_routing_config()
     
     def _load_openai_key(self):
         api_key = os.environ.get("OPENAI_API_KEY")
@@ -68,7 +392,8 @@ class ConfigManager:
         default_config = {
             "llm_provider": "openai",  # "openai" or "ollama"
             "openai_model": "gpt-4o",
-            "ollama_model": "llama3.2"
+            "ollama_model": "llama3.2",
+            "streaming": False  # stream replies and speak them sentence by sentence
         }
         
         try:
@@ -87,8 +412,17 @@ class ConfigManager:
             "vision_provider": "ollama",  # "openai" or "ollama"
             "openai_vision_model": "gpt-4o",
             "ollama_vision_model": "llava:13b",
-            "screenshot_size": [512, 512],
-            "screenshot_quality": 85
+            "screenshot_size": [512, 512],  # bounding box; the aspect ratio is preserved
+            "screenshot_quality": 85,
+            "debug_screenshot": False,  # write loremaster_vlm.png (on a background thread)
+            "screen_cache_size": 8,  # recent frames kept for reuse; 0 disables the screen cache
+            "screen_hash_threshold": 4,  # max differing bits (of 64) for two frames to count as the same screen
+            "reuse_vision_answers": True,  # reuse the VLM answer for the same query on the same screen
+            "frame_sampler": False,  # keep sampling the screen in the background so queries see the moment they were asked
+            "sampler_fps": 2,
+            "sampler_frames": 8,  # ring buffer slots
+            "sampler_memory_mb": 4,  # preallocated ring buffer size, split evenly across slots
+            "sampler_sequence_frames": 1  # frames sent per vision query (the last one is closest to the query)
         }
         
         try:
@@ -101,6 +435,181 @@ class ConfigManager:
             log_event("Using default vision configuration.")
             return default_config
 
+    def _load_section_config(self, section, default_config):
+        """Load an optional config.json section, filling in defaults for missing keys"""
+        try:
+            with open("config.json", "r") as config_file:
+                config = json.load(config_file)
+                section_config = {**default_config, **config.get(section, {})}
+                log_event(f"Loaded {section} config: {section_config}")
+                return section_config
+        except (FileNotFoundError, json.JSONDecodeError):
+            log_event(f"Using default {section} configuration.")
+            return dict(default_config)
+
+    def _load_parser_config(self):
+        """Load message parser configuration from config.json"""
+        default_config = {
+            "local_fast_path": True,  # resolve common inputs without an LLM routing call
+            "local_confidence_threshold": 0.8,
+            "cache_size": 256,  # 0 disables the parse cache
+            "cache_ttl_seconds": 3600,
+            "cache_file": None,  # e.g. "loremaster_parse_cache.json" to keep the cache across restarts
+            "cache_save_delay_seconds": 5  # new entries are batched into one cache_file write per delay
+        }
+        return self._load_section_config("parser", default_config)
+
+    def _load_execution_config(self):
+        """Load request execution configuration from config.json"""
+        default_config = {
+            "speculative": False,  # overlap parsing with screenshot capture and reply generation
+            "async_core": False  # run the pipe loop on asyncio and handle tool_calls concurrently
+        }
+        return self._load_section_config("execution", default_config)
+
+    def _load_transport_config(self):
+        """Load pipe transport configuration from config.json"""
+        default_config = {
+            "backend": "auto",  # "auto", "kernel32", "stdio" or "unix"
+            "socket_path": "loremaster.sock",  # used by the "unix" backend
+            "buffer_size": 65536
+        }
+        return self._load_section_config("transport", default_config)
+
+    def _load_http_config(self):
+        """Load backend HTTP connection pool configuration from config.json"""
+        default_config = {
+            "openai_base_url": None,  # defaults to OPENAI_BASE_URL or the public API
+            "ollama_host": None,  # defaults to OLLAMA_HOST or http://127.0.0.1:11434
+            "max_connections": 10,
+            "max_keepalive_connections": 5,
+            "keepalive_expiry_seconds": 120,
+            "timeout_seconds": 120,
+            "connect_timeout_seconds": 10,
+            "http2": True,  # used for HTTPS backends when the optional h2 package is installed
+            "preconnect": True  # open backend connections at initialize()
+        }
+        return self._load_section_config("http", default_config)
+
+    def _load_residency_config(self):
+        """Load Ollama model residency configuration from config.json"""
+        default_config = {
+            "warm_up": True,  # load the configured Ollama models at initialize()
+            "prime_persona": True,  # prefill the active persona system prompt while warming up
+            "keep_alive": "30m",  # how long Ollama keeps a model loaded after a request
+            "model_keep_alive": {},  # per-model overrides, e.g. {"llava:13b": -1} to pin a model
+            "schedule": True,  # order queued requests to minimize model swaps
+            "max_consecutive": 4,  # same-model requests allowed ahead of a waiting request for another model
+            "cold_load_threshold_seconds": 0.5
+        }
+        return self._load_section_config("residency", default_config)
+
+    def _load_context_config(self):
+        """Load conversation context budgeting configuration from config.json"""
+        default_config = {
+            "prompt_token_budget": 4000,  # system prompt + history sent per request
+            "tokenizer": "auto",  # "auto" (tiktoken for OpenAI models when installed), "tiktoken" or "approximate"
+            "max_messages": None,  # optional hard cap on history messages, on top of the token budget
+            "summarize_evicted": True,  # fold evicted turns into a per character:game memory block (background LLM call)
+            "summary_token_budget": 300,  # max size of the memory block; it counts against prompt_token_budget
+            "stable_prefix": False,  # prefix-cache-friendly layout: identical persona prompt for text and vision, append-only history
+            "compaction_target": 0.6,  # with stable_prefix, evict down to this fraction of the history budget at once
+            "store_file": "loremaster_conversations.db",  # SQLite store that keeps conversations across restarts; null keeps them in memory only
+            "max_resident_contexts": 8,  # conversations held in memory; others are reloaded from the store on demand
+            "max_memories": 64,  # without a store: conversations dropped from memory keep only their summary, for this many of them
+            "log_detail": "events",  # per-character <game>_<character>_context.log: "none", "events" or "full" (every context sent)
+            "log_max_bytes": 1048576,  # rotate a context log once it grows past this size
+            "log_backups": 2
+        }
+        return self._load_section_config("context", default_config)
+
+    def _load_logging_config(self):
+        """Load loremaster.log configuration from config.json"""
+        default_config = {
+            "level": "INFO",  # "DEBUG" adds full LLM requests, raw pipe commands and per-request token usage
+            "format": "text",  # "text" or "json" (JSON lines)
+            "file": "loremaster.log",
+            "console": False,  # also print log lines to stdout
+            "sampling": {}  # fraction of records kept per category: "llm_messages", "pipe_io", "usage"
+        }
+        return self._load_section_config("logging", default_config)
+
+    def _load_metrics_config(self):
+        """Load latency metrics configuration from config.json"""
+        default_config = {
+            "window": 512,  # recent samples per stage used for the percentiles
+            "file": "loremaster_metrics.json",  # periodically rewritten stats snapshot; null disables it
+            "flush_interval_seconds": 30
+        }
+        return self._load_section_config("metrics", default_config)
+
+    def _load_speech_config(self):
+        """Load speech output configuration from config.json"""
+        default_config = {
+            "backend": "pyttsx3",  # "null" skips audio output (benchmarks, headless runs)
+            "queue_policy": "supersede",  # a newer reply cuts off and drops older utterances; "queue" plays everything
+            "voices": {},  # character name -> voice name or ID substring, e.g. {"Zeus": "david"}
+            "null_words_per_minute": 0,  # simulated playback time for the null backend (0: instant)
+            "render_cache_dir": None,  # e.g. "loremaster_tts_cache": render utterances ahead of playback (needs winsound)
+            "render_cache_mb": 64,  # least recently played audio is deleted beyond this size
+            "render_workers": 2,
+            "render_timeout_seconds": 2.0,  # an utterance whose render takes longer is spoken live instead
+            "prerender": [  # fixed lines rendered at startup
+                "Failed to capture or process the screen image.",
+                "An error occurred while analyzing the screen."
+            ]
+        }
+        return self._load_section_config("speech", default_config)
+
+    def _load_cassette_config(self):
+        """Load LLM/VLM record/replay configuration from config.json"""
+        default_config = {
+            "mode": None,  # "record" saves model exchanges, "replay" serves them instead of calling the backends
+            "file": "loremaster_cassette.jsonl",
+            "replay_latency": False,  # reproduce the recorded call and streaming times
+            "latency_scale": 1.0
+        }
+        return self._load_section_config("cassette", default_config)
+
+    def _load_reply_cache_config(self):
+        """Load text reply cache configuration from config.json"""
+        default_config = {
+            "enabled": False,
+            "file": "loremaster_replies.db",
+            "max_mb": 8,  # least recently used replies are evicted beyond this size
+            "context_turns": 2  # recent messages that must match for a cached reply to be reused
+        }
+        return self._load_section_config("reply_cache", default_config)
+
+    def _load_lore_config(self):
+        """Load per-game lore pack configuration from config.json"""
+        default_config = {
+            "enabled": True,
+            "packs_dir": "lore_packs",  # one subdirectory of .txt/.md/.json files per game
+            "top_k": 3,
+            "token_budget": 400,  # prompt tokens available to retrieved passages
+            "min_score": 0.0,
+            "recheck_seconds": 10  # how often an open pack's files are checked for changes
+        }
+        return self._load_section_config("lore", default_config)
+
+    def _load_routing_config(self):
+        """Load latency-aware provider routing configuration from config.json"""
+        default_config = {
+            "enabled": False,  # route each LLM/VLM request to the faster of OpenAI and Ollama (needs an API key)
+            "ewma_alpha": 0.3,  # weight of the newest call in the latency and error-rate averages
+            "error_penalty": 4.0,  # a backend's latency score is multiplied by 1 + error_penalty * error rate
+            "hedge": False,  # also ask the other backend when a request outlasts the first one's p95 latency
+            "hedge_percentile": 0.95,
+            "hedge_min_seconds": 0.5,
+            "min_samples": 5,  # latency samples needed before hedging on a backend
+            "window": 128,  # recent latencies per backend used for the percentile
+            "failure_threshold": 3,  # consecutive failures that take a backend out of rotation
+            "cooldown_seconds": 30,  # time out of rotation before a backend is tried again
+            "explore_seconds": 60  # a backend not tried for this long gets the next request, to measure it again (0: never)
+        }
+        return self._load_section_config("routing", default_config)
+
 class PromptManager:
     """Centralized prompt management for the LoreMaster plugin"""
     
@@ -118,9 +627,11 @@ CHARACTER CREATION: Make specific decisions immediately:
     _CREATIVE_RULES = """Make specific choices immediately. Give exact instructions, not general advice. Replace "you can" with "set this to"."""
     
     @staticmethod
+    @lru_cache(maxsize=128)
     def get_character_system_prompt(character, game, is_vision=False):
         """
         Generate streamlined character system prompt with optional vision additions.
+        Memoized, so a persona's prompt is built once and stays byte-identical across turns.
         
         Usage: ConversationHandler.handle_conversation() for character responses.
         """
@@ -181,223 +692,1967 @@ Input: What do you see on screen?
 Output: {"game":"Game","character":"Character","sex":"male","message":"What do you see on screen?","requires_vision":true}"""
 
     @staticmethod
-    def get_vision_prompt(character, game, user_query):
+    def get_summary_prompt(character, game, max_words):
+        """
+        Get the prompt that folds evicted conversation turns into a character's memory block.
+
+        Usage: ContextSummarizer for rolling summaries of long conversations.
+        """
+        return f"""Maintain a compact memory of an ongoing conversation between the user and {character} from {game}.
+Merge the current memory with the new conversation turns into one updated memory.
+Keep names, facts, decisions, promises and the user's preferences; drop small talk and repetition.
+Write plain third-person notes, at most {max_words} words. Respond with the memory only."""
+
+    @staticmethod
+    def get_memory_message(summary):
+        """
+        Get the memory block inserted after the system prompt.
+
+        Usage: CharacterManager.get_context_messages() once older turns have been summarized.
+        """
+        return f"Memory of your earlier conversation with the user:\n{summary}"
+
+    @staticmethod
+    def get_lore_message(game, passages):
+        """
+        Get the lore reference block inserted before the user's question.
+
+        Usage: ConversationHandler when the game has a lore pack with matching passages.
+        """
+        notes = "\n".join(f"- {passage}" for passage in passages)
+        return f"Reference notes about {game}. Use them when they answer the question, and stay in character:\n{notes}"
+
+    @staticmethod
+    def get_vision_prompt(character, game, user_query, frame_count=1):
         """
         Get vision analysis prompt with character context.
 
         Usage: VisionHandler.analyze_screen() for screenshot analysis.
         """
         character_prompt = PromptManager.get_character_system_prompt(character, game, is_vision=True)
-        return f"{character_prompt}\n\nUser asks: {user_query}"
+        return f"{character_prompt}{PromptManager._frames_note(frame_count)}\n\nUser asks: {user_query}"
 
-class LLMHandler:
-    def __init__(self, config_manager):
-        self.config = config_manager
-        self.llm_config = config_manager.llm_config
-        self.client = None
-        self.use_openai = False
-        self._initialize_client()
+    @staticmethod
+    def get_vision_turn_prompt(user_query, frame_count=1):
+        """
+        Get the vision instructions and question as a user turn, leaving the persona system
+        prompt identical to text turns so provider prompt caches can reuse the prefix.
+
+        Usage: VisionHandler.analyze_screen() when "stable_prefix" is enabled.
+        """
+        return f"{PromptManager._VISION_RULES.strip()}{PromptManager._frames_note(frame_count)}\n\nUser asks: {user_query}"
+
+    @staticmethod
+    def _frames_note(frame_count):
+        if frame_count <= 1:
+            return ""
+        return (
+            f"\n\nYou are shown {frame_count} consecutive frames of the screen in chronological order. "
+            "The last frame is the moment the user asked; earlier frames show what led up to it."
+        )
+
+class PromptCacheStats:
+    """
+    Prompt prefill counters per provider/model: cached prompt tokens reported in OpenAI usage,
+    and prompt eval counts and durations reported by Ollama (tokens reused from its KV cache
+    are not evaluated again, so a stable prefix shows up as a low prompt_eval_count).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.models = {}  # "provider:model" -> counters
     
-    def _initialize_client(self):
-        # Use the configured LLM provider
-        if self.llm_config["llm_provider"] == "openai":
-            if self.config.api_key:
-                try:
-                    from openai import OpenAI
-                    self.client = OpenAI(api_key=self.config.api_key)
-                    self.use_openai = True
-                    log_event(f"Using OpenAI for LLM with model '{self.llm_config['openai_model']}'.")
-                except ImportError:
-                    log_event("OpenAI library not available. Falling back to Ollama.")
-                    self._initialize_ollama()
-            else:
-                log_event("No API key available. Falling back to Ollama.")
-                self._initialize_ollama()
-        else:
-            self._initialize_ollama()
+    def _counters(self, key):
+        return self.models.setdefault(key, {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "prompt_eval_seconds": 0.0})
     
-    def _initialize_ollama(self):
-        try:
-            import ollama
-            self.client = ollama
-            self.use_openai = False
-            log_event(f"Using Ollama for LLM with model '{self.llm_config['ollama_model']}'.")
-        except ImportError:
-            raise ImportError("Neither OpenAI nor Ollama is available.")
+    def record_openai(self, model, usage):
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        with self.lock:
+            counters = self._counters(f"openai:{model}")
+            counters["requests"] += 1
+            counters["prompt_tokens"] += usage.prompt_tokens or 0
+            counters["cached_tokens"] += cached_tokens
+        log_event("OpenAI prompt tokens: %s (%s cached)", usage.prompt_tokens, cached_tokens, level=logging.DEBUG, category="usage")
     
-    def chat(self, messages):
-        # Log messages but exclude base64 image data
-        safe_messages = []
-        for msg in messages:
-            if isinstance(msg.get('content'), list):
-                safe_content = []
-                for item in msg['content']:
-                    if item.get('type') == 'image_url':
-                        safe_content.append({'type': 'image_url', 'image_url': {'url': '[BASE64_IMAGE_DATA_EXCLUDED]'}})
-                    else:
-                        safe_content.append(item)
-                safe_messages.append({**msg, 'content': safe_content})
-            else:
-                safe_messages.append(msg)
-        
-        log_event(f"LLM request messages: {safe_messages}")
-        
-        if self.use_openai:
-            response = self.client.chat.completions.create(
-                model=self.llm_config["openai_model"],
-                messages=messages,
-                temperature=0
-            )
-            return response.choices[0].message.content
+    def record_ollama(self, model, response):
+        prompt_eval_count = response.get("prompt_eval_count") or 0
+        prompt_eval_seconds = (response.get("prompt_eval_duration") or 0) / 1e9
+        with self.lock:
+            counters = self._counters(f"ollama:{model}")
+            counters["requests"] += 1
+            counters["prompt_tokens"] += prompt_eval_count
+            counters["prompt_eval_seconds"] += prompt_eval_seconds
+        log_event("Ollama prompt eval: %s tokens in %.3fs", prompt_eval_count, prompt_eval_seconds, level=logging.DEBUG, category="usage")
+    
+    def stats(self):
+        with self.lock:
+            stats = {key: dict(counters) for key, counters in self.models.items()}
+        for counters in stats.values():
+            counters["cached_ratio"] = counters["cached_tokens"] / counters["prompt_tokens"] if counters["prompt_tokens"] else 0.0
+            counters["prompt_eval_seconds"] = round(counters["prompt_eval_seconds"], 3)
+        return stats
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when the cassette has no recorded exchange for a request."""
+
+class Cassette:
+    """
+    Records LLM/VLM request/response pairs with their timings, and replays them.
+
+    Exchanges are appended to a JSON lines file; image bytes are replaced by their SHA-1 and
+    stored once in a sibling "<name>_images" directory. Replay matches on the text of the
+    request (images excluded, so a re-captured screen still matches) and serves repeated
+    requests in recorded order. With replay_latency the recorded call time, or the recorded
+    arrival of every streamed fragment, is reproduced (scaled by latency_scale).
+    Talk inputs are recorded too, so a captured session can be driven through the plugin again.
+    """
+
+    def __init__(self, path, mode, replay_latency=False, latency_scale=1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.latency_scale = latency_scale
+        self.images_dir = f"{os.path.splitext(path)[0]}_images"
+        self.lock = threading.Lock()
+        self.exchanges = {}  # key -> recorded exchanges not yet replayed
+        self.counters = {"recorded": 0, "hits": 0, "misses": 0}
+        self.file = None
+        if mode == "record":
+            os.makedirs(self.images_dir, exist_ok=True)
+            self.file = open(path, "a", encoding="utf-8")
         else:
-            response = self.client.chat(model=self.llm_config["ollama_model"], messages=messages)
-            if "message" in response and "content" in response["message"]:
-                return response["message"]["content"]
-            else:
-                raise ValueError("Invalid response format from Ollama.")
+            self._load()
+        log_event(f"Cassette {mode} mode: {path}")
+    
+    @classmethod
+    def from_config(cls, cassette_config):
+        if not cassette_config.get("mode"):
+            return None
+        return cls(
+            cassette_config.get("file", "loremaster_cassette.jsonl"),
+            cassette_config["mode"],
+            cassette_config.get("replay_latency", False),
+            cassette_config.get("latency_scale", 1.0)
+        )
+    
+    @property
+    def recording(self):
+        return self.mode == "record"
+    
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.exchanges.setdefault(entry["key"], deque()).append(entry)
+    
+    def inputs(self):
+        """Recorded talk inputs in order, for driving a replay."""
+        with open(self.path, "r", encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        return [entry["request"] for entry in entries if entry["kind"] == "input"]
+    
+    def _compact(self, value):
+        """Copy of a request with bytes replaced by "sha1:<digest>", saving new images when recording."""
+        if isinstance(value, (bytes, bytearray)):
+            digest = hashlib.sha1(value).hexdigest()
+            image_path = os.path.join(self.images_dir, f"{digest}.jpg")
+            if self.recording and not os.path.exists(image_path):
+                with open(image_path, "wb") as f:
+                    f.write(value)
+            return f"sha1:{digest}"
+        if isinstance(value, dict):
+            return {k: self._compact(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._compact(v) for v in value]
+        return value
+    
+    @staticmethod
+    def _key(kind, request):
+        def text_only(value):
+            if isinstance(value, str) and value.startswith("sha1:"):
+                return "<image>"
+            if isinstance(value, dict):
+                if value.get("type") == "image_url":
+                    return "<image>"
+                return {k: text_only(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [text_only(v) for v in value]
+            return value
+        canonical = json.dumps([kind, text_only(request)], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+    
+    def _write(self, entry):
+        with self.lock:
+            self.file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self.file.flush()
+            self.counters["recorded"] += 1
+    
+    def record_input(self, user_input):
+        if self.recording:
+            self._write({"kind": "input", "key": None, "request": user_input})
+    
+    def _record(self, kind, model, request, response, seconds, chunks=None):
+        request = self._compact(request)
+        entry = {"kind": kind, "model": model, "key": self._key(kind, request), "request": request,
+                 "response": response, "seconds": round(seconds, 4)}
+        if chunks is not None:
+            entry["chunks"] = chunks
+        self._write(entry)
+    
+    def _next(self, kind, request):
+        key = self._key(kind, self._compact(request))
+        with self.lock:
+            recorded = self.exchanges.get(key)
+            if not recorded:
+                self.counters["misses"] += 1
+                raise CassetteMissError(f"No recorded {kind} exchange for this request in {self.path}")
+            self.counters["hits"] += 1
+            # The last exchange for a key keeps answering repeats of the request
+            return recorded.popleft() if len(recorded) > 1 else recorded[0]
+    
+    def _delays(self, entry):
+        """(seconds to wait, fragment) pairs reproducing the recorded pacing."""
+        chunks = entry.get("chunks") or [[entry["seconds"], entry["response"]]]
+        previous = 0.0
+        for offset, fragment in chunks:
+            yield ((offset - previous) * self.latency_scale if self.replay_latency else 0.0), fragment
+            previous = offset
+    
+    def call(self, kind, model, request, fn):
+        """Return the response for request: fn() and record it, or the recorded response."""
+        if not self.recording:
+            entry = self._next(kind, request)
+            if self.replay_latency:
+                time.sleep(entry["seconds"] * self.latency_scale)
+            return entry["response"]
+        start = time.perf_counter()
+        response = fn()
+        self._record(kind, model, request, response, time.perf_counter() - start)
+        return response
+    
+    def stream(self, kind, model, request, fn):
+        """Yield the fragments of fn() and record them with their arrival times, or replay them."""
+        if not self.recording:
+            for delay, fragment in self._delays(self._next(kind, request)):
+                if delay > 0:
+                    time.sleep(delay)
+                yield fragment
+            return
+        start = time.perf_counter()
+        chunks = []
+        for fragment in fn():
+            chunks.append([round(time.perf_counter() - start, 4), fragment])
+            yield fragment
+        self._record(kind, model, request, "".join(fragment for _, fragment in chunks), time.perf_counter() - start, chunks)
+    
+    async def acall(self, kind, model, request, fn):
+        if not self.recording:
+            entry = self._next(kind, request)
+            if self.replay_latency:
+                await asyncio.sleep(entry["seconds"] * self.latency_scale)
+            return entry["response"]
+        start = time.perf_counter()
+        response = await fn()
+        self._record(kind, model, request, response, time.perf_counter() - start)
+        return response
+    
+    async def astream(self, kind, model, request, fn):
+        if not self.recording:
+            for delay, fragment in self._delays(self._next(kind, request)):
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield fragment
+            return
+        start = time.perf_counter()
+        chunks = []
+        async for fragment in fn():
+            chunks.append([round(time.perf_counter() - start, 4), fragment])
+            yield fragment
+        self._record(kind, model, request, "".join(fragment for _, fragment in chunks), time.perf_counter() - start, chunks)
+    
+    def stats(self):
+        with self.lock:
+            return {"mode": self.mode, "file": self.path, **self.counters}
+    
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+class BackendClientRegistry:
+    """
+    Backend clients shared by LLMHandler and VisionHandler.
+
+    Each backend gets one pooled keep-alive httpx transport (HTTP/2 for HTTPS backends when
+    the optional h2 package is installed) sized by the "http" config, and every client for
+    that backend rides on it. New connections are counted through httpcore trace events, so
+    stats() shows how often requests reused a pooled connection.
+    """
 
-class VisionHandler:
     def __init__(self, config_manager):
         self.config = config_manager
-        self.vision_config = config_manager.vision_config
-        self._initialize_vision_client()
+        self.http_config = config_manager.http_config
+        self.lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.transports = {}  # (backend, is_async) -> httpx transport
+        self.http_clients = {}  # (backend, is_async) -> httpx client
+        self.clients = {}  # (backend, is_async) -> OpenAI/Ollama client
+        self.connection_stats = {}  # backend -> counters
+        self.prompt_cache_stats = PromptCacheStats()
+        self.cassette = Cassette.from_config(getattr(config_manager, "cassette_config", {}))
     
-    def _initialize_vision_client(self):
-        """Initialize the vision client based on configuration"""
-        if self.vision_config["vision_provider"] == "openai":
-            if self.config.api_key:
-                try:
-                    from openai import OpenAI
-                    self.vision_client = OpenAI(api_key=self.config.api_key)
-                    self.use_openai_vision = True
-                    log_event(f"Using OpenAI for vision with model '{self.vision_config['openai_vision_model']}'.")
-                except ImportError:
-                    log_event("OpenAI library not available. Falling back to Ollama for vision.")
-                    self._initialize_ollama_vision()
-            else:
-                log_event("No API key available. Falling back to Ollama for vision.")
-                self._initialize_ollama_vision()
-        else:
-            # This should be the path taken when vision_provider is "ollama"
-            self._initialize_ollama_vision()
+    def base_url(self, backend):
+        if backend == "openai":
+            return self.http_config.get("openai_base_url") or os.environ.get("OPENAI_BASE_URL") or "https://api.openai.com/v1"
+        return self.http_config.get("ollama_host") or os.environ.get("OLLAMA_HOST") or "http://127.0.0.1:11434"
     
-    def _initialize_ollama_vision(self):
-        """Initialize Ollama for vision tasks"""
+    def _use_http2(self, backend):
+        if not self.http_config.get("http2", True) or not self.base_url(backend).startswith("https://"):
+            return False
         try:
-            import ollama
-            self.vision_client = ollama
-            self.use_openai_vision = False
-            log_event(f"Using Ollama for vision with model '{self.vision_config['ollama_vision_model']}'.")
+            import h2  # noqa: F401 - optional dependency of httpx[http2]
+            return True
         except ImportError:
-            raise ImportError("Ollama not available for vision tasks.")
-    
-    def capture_and_encode_screenshot(self):
-        """Capture a screenshot, resize it, and encode it in Base64."""
-        try:
-            screenshot = ImageGrab.grab()
-            
-            # Get size from config
-            width, height = self.vision_config["screenshot_size"]
-            resized_screenshot = screenshot.resize((width, height))
-            
-            # Save the resized screenshot for debugging
-            try:
-                resized_screenshot.save("loremaster_vlm.png", format="PNG")
-                log_event("Screenshot saved as loremaster_vlm.png for debugging")
-            except Exception as save_error:
-                log_event(f"Warning: Could not save debug screenshot: {save_error}")
-            
-            buffer = BytesIO()
-            quality = self.vision_config["screenshot_quality"]
-            resized_screenshot.save(buffer, format="JPEG", quality=quality)
-            buffer.seek(0)
-            
-            base64_screenshot = base64.b64encode(buffer.getvalue()).decode("utf-8")
-            log_event(f"Screenshot captured, resized to {width}x{height}, and encoded successfully.")
-            return base64_screenshot
-        except Exception as e:
-            log_event(f"Error capturing or encoding screenshot: {e}")
-            return None
+            return False
     
-    def analyze_screen(self, user_query, character_info):
-        """Analyze the screen using the configured vision provider"""
-        image_b64 = self.capture_and_encode_screenshot()
-        if not image_b64:
-            return "Failed to capture or process the screen image."
-
-        # Use centralized prompt management
-        character_prompt = PromptManager.get_vision_prompt(
-            character_info['character'], 
-            character_info['game'], 
-            user_query
+    def _timeout(self):
+        import httpx
+        return httpx.Timeout(
+            self.http_config.get("timeout_seconds", 120),
+            connect=self.http_config.get("connect_timeout_seconds", 10)
         )
-
-        try:
-            if self.use_openai_vision:
-                return self._analyze_with_openai(character_prompt, image_b64)
-            else:
-                return self._analyze_with_ollama(character_prompt, image_b64)
-        except Exception as e:
-            log_event(f"Error in analyze_screen(): {e}")
-            return "An error occurred while analyzing the screen."
     
-    def _analyze_with_openai(self, prompt, image_b64):
-        """Analyze using OpenAI Vision API"""
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{image_b64}",
-                            "detail": "low"
-                        }
-                    }
-                ]
+    def _count(self, backend, counter, amount=1):
+        with self.stats_lock:
+            self.connection_stats[backend][counter] += amount
+    
+    def _event_hooks(self, backend, is_async):
+        def on_trace(event_name, info):
+            if event_name == "connection.connect_tcp.complete":
+                self._count(backend, "new_connections")
+            elif event_name == "connection.start_tls.complete":
+                self._count(backend, "tls_handshakes")
+        
+        def on_request(request):
+            request.extensions["trace"] = on_trace
+            self._count(backend, "requests")
+        
+        if not is_async:
+            return {"request": [on_request]}
+        
+        async def on_trace_async(event_name, info):
+            on_trace(event_name, info)
+        
+        async def on_request_async(request):
+            request.extensions["trace"] = on_trace_async
+            self._count(backend, "requests")
+        
+        return {"request": [on_request_async]}
+    
+    def _get_transport(self, backend, is_async):
+        """Return the pooled transport for a backend, creating it (and its httpx client) on first use."""
+        key = (backend, is_async)
+        with self.lock:
+            if key not in self.transports:
+                import httpx
+                limits = httpx.Limits(
+                    max_connections=self.http_config.get("max_connections", 10),
+                    max_keepalive_connections=self.http_config.get("max_keepalive_connections", 5),
+                    keepalive_expiry=self.http_config.get("keepalive_expiry_seconds", 120)
+                )
+                http2 = self._use_http2(backend)
+                transport_class = httpx.AsyncHTTPTransport if is_async else httpx.HTTPTransport
+                client_class = httpx.AsyncClient if is_async else httpx.Client
+                self.transports[key] = transport_class(limits=limits, http2=http2)
+                self.http_clients[key] = client_class(
+                    base_url=self.base_url(backend),
+                    transport=self.transports[key],
+                    timeout=self._timeout(),
+                    event_hooks=self._event_hooks(backend, is_async)
+                )
+                self.connection_stats.setdefault(backend, {"requests": 0, "new_connections": 0, "tls_handshakes": 0})
+                log_event(f"Created pooled {'async ' if is_async else ''}HTTP transport for {backend} ({self.base_url(backend)}, http2={http2})")
+            return self.transports[key]
+    
+    def openai_client(self, is_async=False):
+        key = ("openai", is_async)
+        self._get_transport("openai", is_async)
+        with self.lock:
+            if key not in self.clients:
+                from openai import AsyncOpenAI, OpenAI
+                client_class = AsyncOpenAI if is_async else OpenAI
+                self.clients[key] = client_class(
+                    api_key=self.config.api_key,
+                    base_url=self.base_url("openai"),
+                    http_client=self.http_clients[key],
+                    timeout=self._timeout()
+                )
+            return self.clients[key]
+    
+    def ollama_client(self, is_async=False):
+        key = ("ollama", is_async)
+        transport = self._get_transport("ollama", is_async)
+        with self.lock:
+            if key not in self.clients:
+                import ollama
+                client_class = ollama.AsyncClient if is_async else ollama.Client
+                self.clients[key] = client_class(
+                    host=self.base_url("ollama"),
+                    transport=transport,
+                    timeout=self._timeout(),
+                    event_hooks=self._event_hooks("ollama", is_async)
+                )
+            return self.clients[key]
+    
+    def preconnect(self):
+        """Open a pooled connection to every backend in use so the first query skips TCP/TLS setup."""
+        for (backend, is_async), http_client in list(self.http_clients.items()):
+            if is_async:
+                continue
+            start = time.perf_counter()
+            try:
+                http_client.get("")
+                log_event(f"Pre-connected to {backend} in {time.perf_counter() - start:.3f}s")
+            except Exception as e:
+                log_event(f"Warning: Could not pre-connect to {backend}: {e}")
+    
+    async def apreconnect(self):
+        """Async counterpart of preconnect() for the async clients' pools."""
+        for (backend, is_async), http_client in list(self.http_clients.items()):
+            if not is_async:
+                continue
+            start = time.perf_counter()
+            try:
+                await http_client.get("")
+                log_event(f"Pre-connected to {backend} in {time.perf_counter() - start:.3f}s")
+            except Exception as e:
+                log_event(f"Warning: Could not pre-connect to {backend}: {e}")
+    
+    def stats(self):
+        """Return request and connection counters per backend."""
+        with self.stats_lock:
+            stats = {backend: dict(counters) for backend, counters in self.connection_stats.items()}
+        for counters in stats.values():
+            counters["reused_connections"] = max(counters["requests"] - counters["new_connections"], 0)
+            counters["reuse_ratio"] = counters["reused_connections"] / counters["requests"] if counters["requests"] else 0.0
+        return stats
+
+class ModelResidencyManager:
+    """
+    Keeps the configured Ollama models resident and avoids needless model swaps.
+
+    Models are preloaded (and primed with the persona system prompt) at initialize(), every
+    request carries a per-model keep_alive, and when parse, text and vision requests for
+    different models queue up at the same time, requests for the model that is already
+    loaded go first (bounded by max_consecutive so the other model is not starved). Cold
+    loads are detected from the load_duration Ollama reports with each response.
+    """
+
+    def __init__(self, config_manager, client_registry):
+        self.config = config_manager
+        self.residency_config = config_manager.residency_config
+        self.client_registry = client_registry
+        self.condition = threading.Condition()  # guards the scheduling state for sync and async callers alike
+        self.loaded_model = None
+        self.running = {}  # model -> requests in flight
+        self.waiting = {}  # model -> requests queued
+        self.streak = 0
+        self.swaps = 0
+        self.model_stats = {}  # model -> {"requests", "cold_loads", "cold_load_seconds"}
+        self.cold_load_events = []
+    
+    def models(self):
+        """Return the Ollama models in use, the one used for text (and parsing) last."""
+        models = []
+        # With routing, Ollama is kept warm as the standby for OpenAI
+        routing = getattr(self.config, "routing_config", {}).get("enabled", False)
+        if routing or self.config.vision_config["vision_provider"] != "openai" or not self.config.api_key:
+            models.append(self.config.vision_config["ollama_vision_model"])
+        if routing or self.config.llm_config["llm_provider"] != "openai" or not self.config.api_key:
+            models.append(self.config.llm_config["ollama_model"])
+        return list(dict.fromkeys(models))
+    
+    def keep_alive(self, model):
+        return self.residency_config.get("model_keep_alive", {}).get(model, self.residency_config.get("keep_alive", "30m"))
+    
+    def warm_up(self, system_prompt=None):
+        """Load each configured model, optionally prefilling system_prompt so the first turn starts warm."""
+        client = self.client_registry.ollama_client()
+        for model in self.models():
+            start = time.perf_counter()
+            try:
+                with self.request(model):
+                    if system_prompt and self.residency_config.get("prime_persona", True):
+                        response = client.chat(
+                            model=model,
+                            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": "."}],
+                            options={"num_predict": 1},
+                            keep_alive=self.keep_alive(model)
+                        )
+                    else:
+                        response = client.generate(model=model, prompt="", keep_alive=self.keep_alive(model))
+                self.record_response(model, response)
+                log_event(f"Warmed up Ollama model '{model}' in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                log_event(f"Warning: Could not warm up Ollama model '{model}': {e}")
+    
+    def _enqueue(self, model):
+        self.waiting[model] = self.waiting.get(model, 0) + 1
+    
+    def _may_run(self, model):
+        if not self.residency_config.get("schedule", True):
+            return True
+        busy = [m for m, count in self.running.items() if count]
+        if busy and busy != [model]:
+            # Only requests for the model that is currently executing may join it
+            return False
+        if self.loaded_model is None:
+            return True
+        limit_reached = self.streak >= self.residency_config.get("max_consecutive", 4)
+        if model == self.loaded_model:
+            # Joining or following the loaded model counts towards its streak while another model waits
+            others_waiting = any(count for other, count in self.waiting.items() if other != model)
+            return not (others_waiting and limit_reached)
+        loaded_waiting = self.waiting.get(self.loaded_model, 0)
+        return not loaded_waiting or limit_reached
+    
+    def _start(self, model):
+        self.waiting[model] -= 1
+        self.running[model] = self.running.get(model, 0) + 1
+        if model == self.loaded_model:
+            self.streak += 1
+        else:
+            if self.loaded_model is not None:
+                self.swaps += 1
+                log_event(f"Model swap: {self.loaded_model} -> {model}")
+            self.loaded_model = model
+            self.streak = 1
+    
+    def _wait_and_start(self, model):
+        with self.condition:
+            self.condition.wait_for(lambda: self._may_run(model))
+            self._start(model)
+    
+    def _release(self, model):
+        with self.condition:
+            self.running[model] -= 1
+            self.condition.notify_all()
+    
+    @contextmanager
+    def request(self, model):
+        """Hold a scheduling slot for one Ollama request."""
+        with self.condition:
+            self._enqueue(model)
+            self._wait_and_start(model)
+        try:
+            yield
+        finally:
+            self._release(model)
+    
+    @asynccontextmanager
+    async def arequest(self, model):
+        """Async counterpart of request(), queued on the same condition as the blocking callers."""
+        with self.condition:
+            self._enqueue(model)
+            ready = self._may_run(model)
+            if ready:
+                self._start(model)
+        if not ready:
+            # Wait on a worker thread, so the event loop keeps running meanwhile
+            wait = asyncio.ensure_future(asyncio.to_thread(self._wait_and_start, model))
+            try:
+                await asyncio.shield(wait)
+            except asyncio.CancelledError:
+                # The slot is still taken once the wait ends; hand it straight back
+                wait.add_done_callback(lambda _: self._release(model))
+                raise
+        try:
+            yield
+        finally:
+            self._release(model)
+    
+    def record_response(self, model, response):
+        """Record a final Ollama response and report a cold load if the model had to be loaded."""
+        self.client_registry.prompt_cache_stats.record_ollama(model, response)
+        load_seconds = (response.get("load_duration") or 0) / 1e9
+        with self.condition:
+            stats = self.model_stats.setdefault(model, {"requests": 0, "cold_loads": 0, "cold_load_seconds": 0.0})
+            stats["requests"] += 1
+            if load_seconds < self.residency_config.get("cold_load_threshold_seconds", 0.5):
+                return
+            stats["cold_loads"] += 1
+            stats["cold_load_seconds"] += load_seconds
+            self.cold_load_events.append({"model": model, "seconds": round(load_seconds, 3), "at": datetime.now().isoformat(timespec="seconds")})
+            del self.cold_load_events[:-20]
+        log_event(f"Cold load of Ollama model '{model}' took {load_seconds:.2f}s")
+    
+    def stats(self):
+        with self.condition:
+            return {
+                "loaded_model": self.loaded_model,
+                "swaps": self.swaps,
+                "models": {model: dict(stats) for model, stats in self.model_stats.items()},
+                "recent_cold_loads": list(self.cold_load_events)
             }
-        ]
+
+class ProviderRouter:
+    """
+    Sends each LLM or VLM request to the fastest healthy backend.
+
+    Backends are "provider:model" names in order of preference, the configured provider
+    first. Every call updates the backend's EWMA latency and error rate, and requests go to
+    the backend with the lowest error-weighted latency; a backend with no measurements yet
+    is tried after the measured ones, in preference order. To keep every backend measured,
+    a healthy backend that has not been tried for explore_seconds gets the next request,
+    and a measurement that old is replaced rather than averaged, so a backend that was
+    demoted or never used can win the traffic back. A failed request is retried on the
+    next backend. After failure_threshold consecutive failures a backend's circuit opens
+    and it leaves the rotation for cooldown_seconds, then a single failure reopens it.
+
+    With hedging, a request still unanswered after its backend's p95 latency is also sent to
+    the next backend, and whichever answers first wins. Streams fail over only before their
+    first fragment and are never hedged.
+    """
+
+    def __init__(self, backends, routing_config=None):
+        self.routing_config = routing_config or {}
+        self.backends = list(backends)
+        self.alpha = self.routing_config.get("ewma_alpha", 0.3)
+        self.error_penalty = self.routing_config.get("error_penalty", 4.0)
+        self.hedge = self.routing_config.get("hedge", False)
+        self.hedge_percentile = self.routing_config.get("hedge_percentile", 0.95)
+        self.hedge_min_seconds = self.routing_config.get("hedge_min_seconds", 0.5)
+        self.min_samples = self.routing_config.get("min_samples", 5)
+        self.failure_threshold = self.routing_config.get("failure_threshold", 3)
+        self.cooldown_seconds = self.routing_config.get("cooldown_seconds", 30)
+        self.explore_seconds = self.routing_config.get("explore_seconds", 60)
+        self.lock = threading.Lock()
+        self.health = {
+            backend: {"ewma_seconds": None, "error_rate": 0.0, "calls": 0, "errors": 0, "consecutive_failures": 0,
+                      "open_until": 0.0, "hedges": 0, "hedge_wins": 0, "probes": 0,
+                      "sampled_at": float("-inf"), "tried_at": float("-inf")}  # time.monotonic() of the last latency sample / call
+            for backend in self.backends
+        }
+        self.latency = {backend: LatencyHistogram(self.routing_config.get("window", 128)) for backend in self.backends}
+    
+    @classmethod
+    def from_config(cls, config_manager, backends, create_client):
+        """
+        Router over backends, or None when routing is disabled or fewer than two backends
+        are usable. create_client(provider) must succeed for a backend to be routed to.
+        """
+        routing_config = getattr(config_manager, "routing_config", {})
+        if not routing_config.get("enabled", False):
+            return None
+        usable = []
+        for backend in backends:
+            try:
+                create_client(cls.provider(backend))
+                usable.append(backend)
+            except (ImportError, ValueError) as e:
+                log_event(f"Not routing to {backend}: {e}")
+        if len(usable) < 2:
+            log_event("Provider routing needs both OpenAI (with an API key) and Ollama; using a single provider.")
+            return None
+        log_event(f"Routing requests between {' and '.join(usable)} by latency.")
+        return cls(usable, routing_config)
+    
+    @staticmethod
+    def provider(backend):
+        return backend.split(":", 1)[0]
+    
+    def order(self):
+        """Backends to try, best first; circuits that are open are left out unless all are."""
+        now = time.monotonic()
+        with self.lock:
+            healthy = [backend for backend in self.backends if self.health[backend]["open_until"] <= now]
+            if not healthy:
+                return sorted(self.backends, key=lambda backend: self.health[backend]["open_until"])
+            return sorted(healthy, key=self._score)
+    
+    def _score(self, backend):
+        health = self.health[backend]
+        if health["ewma_seconds"] is None:
+            return (1, self.backends.index(backend))
+        return (0, health["ewma_seconds"] * (1 + self.error_penalty * health["error_rate"]))
+    
+    def route(self):
+        """order() for one request, putting first a backend due to be measured again (explore_seconds)."""
+        backends = self.order()
+        if len(backends) < 2 or not self.explore_seconds:
+            return backends
+        now = time.monotonic()
+        with self.lock:
+            if self.health[backends[0]]["ewma_seconds"] is None:
+                return backends  # nothing measured yet: preference order
+            for backend in backends[1:]:
+                health = self.health[backend]
+                if now - health["tried_at"] >= self.explore_seconds:
+                    health["tried_at"] = now
+                    health["probes"] += 1
+                    return [backend] + [other for other in backends if other != backend]
+        return backends
+    
+    def record(self, backend, seconds, ok):
+        now = time.monotonic()
+        with self.lock:
+            health = self.health[backend]
+            health["calls"] += 1
+            health["tried_at"] = now
+            health["error_rate"] += self.alpha * ((0.0 if ok else 1.0) - health["error_rate"])
+            if ok:
+                self.latency[backend].add(seconds)
+                stale = now - health["sampled_at"] >= self.explore_seconds > 0
+                health["sampled_at"] = now
+                if health["ewma_seconds"] is None or stale:
+                    health["ewma_seconds"] = seconds
+                else:
+                    health["ewma_seconds"] += self.alpha * (seconds - health["ewma_seconds"])
+                health["consecutive_failures"] = 0
+                health["open_until"] = 0.0
+                return
+            health["errors"] += 1
+            health["consecutive_failures"] += 1
+            opened = health["consecutive_failures"] >= self.failure_threshold
+            if opened:
+                health["open_until"] = time.monotonic() + self.cooldown_seconds
+        if opened:
+            log_event(f"Warning: {backend} failed {health['consecutive_failures']} times in a row; "
+                      f"out of rotation for {self.cooldown_seconds}s")
+    
+    def hedge_delay(self, backend):
+        """Seconds to wait for backend before hedging, or None when not hedging."""
+        if not self.hedge:
+            return None
+        with self.lock:
+            samples = sorted(self.latency[backend].samples)
+        if len(samples) < self.min_samples:
+            return None
+        p95 = samples[min(len(samples) - 1, int(self.hedge_percentile * len(samples)))]
+        return max(self.hedge_min_seconds, p95)
+    
+    def _count_hedge(self, backend, counter):
+        with self.lock:
+            self.health[backend][counter] += 1
+    
+    async def _atimed(self, fn, backend):
+        start = time.perf_counter()
+        try:
+            result = await fn(backend)
+        except Exception:
+            self.record(backend, time.perf_counter() - start, False)
+            raise
+        self.record(backend, time.perf_counter() - start, True)
+        return result
+    
+    async def acall(self, fn):
+        """Return await fn(backend) from the best backend, failing over and hedging as configured."""
+        backends = self.route()
+        if self.hedge and len(backends) > 1:
+            return await self._ahedged_call(fn, backends)
+        for i, backend in enumerate(backends):
+            try:
+                return await self._atimed(fn, backend)
+            except Exception as e:
+                if i == len(backends) - 1:
+                    raise
+                log_event(f"Warning: {backend} request failed ({e}); retrying on {backends[i + 1]}")
+    
+    async def _ahedged_call(self, fn, backends):
+        waiting = list(backends)
+        running = {}  # task -> backend
+        
+        def launch():
+            backend = waiting.pop(0)
+            running[asyncio.ensure_future(self._atimed(fn, backend))] = backend
+            return backend
+        
+        primary = launch()
+        timeout = self.hedge_delay(primary)
+        error = None
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                timeout = None
+                if not done:
+                    backend = launch()
+                    self._count_hedge(backend, "hedges")
+                    log_event(f"{primary} slower than its p{self.hedge_percentile * 100:.0f}; hedging on {backend}")
+                    continue
+                for task in done:
+                    backend = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        error = e
+                        if not running and waiting:
+                            log_event(f"Warning: {backend} request failed ({e}); retrying on {waiting[0]}")
+                            launch()
+                        continue
+                    if backend != primary:
+                        self._count_hedge(backend, "hedge_wins")
+                    return result
+            raise error
+        finally:
+            for task in running:
+                task.cancel()
+    
+    async def astream(self, fn):
+        """Yield the fragments of fn(backend) from the best backend, failing over before the first fragment."""
+        backends = self.route()
+        for i, backend in enumerate(backends):
+            start = time.perf_counter()
+            started = False
+            try:
+                async for fragment in fn(backend):
+                    started = True
+                    yield fragment
+            except Exception as e:
+                self.record(backend, time.perf_counter() - start, False)
+                if started or i == len(backends) - 1:
+                    raise
+                log_event(f"Warning: {backend} stream failed ({e}); retrying on {backends[i + 1]}")
+                continue
+            self.record(backend, time.perf_counter() - start, True)
+            return
+    
+    def stats(self):
+        now = time.monotonic()
+        with self.lock:
+            stats = {}
+            for backend, health in self.health.items():
+                ewma = health["ewma_seconds"]
+                stats[backend] = {
+                    "ewma_ms": round(ewma * 1000, 1) if ewma is not None else None,
+                    "error_rate": round(health["error_rate"], 3),
+                    "circuit_open": health["open_until"] > now,
+                    **{counter: health[counter] for counter in ("calls", "errors", "consecutive_failures", "hedges", "hedge_wins", "probes")},
+                    "latency": self.latency[backend].summary()
+                }
+        return stats
+    
+class AsyncLLMHandler:
+    """LLM calls on the async OpenAI/Ollama clients; LLMHandler is the blocking API over it."""
+
+    def __init__(self, config_manager, client_registry=None, residency_manager=None):
+        self.config = config_manager
+        self.client_registry = client_registry or BackendClientRegistry(config_manager)
+        self.residency_manager = residency_manager or ModelResidencyManager(config_manager, self.client_registry)
+        self.llm_config = config_manager.llm_config
+        self.client = None
+        self.clients = {}  # provider -> client
+        self.use_openai = False
+        self.streaming = bool(self.llm_config.get("streaming", False))
+        self._initialize_client()
+        self.clients[self.provider] = self.client
+        other = "ollama" if self.use_openai else "openai"
+        self.router = ProviderRouter.from_config(self.config, [self.trace_model, self._trace_model(other)], self._client)
+        self.tokenizer = create_tokenizer(self.model, config_manager.context_config.get("tokenizer", "auto"), self.use_openai)
+    
+    @property
+    def provider(self):
+        return "openai" if self.use_openai else "ollama"
+    
+    @property
+    def model(self):
+        return self._model(self.provider)
+    
+    @property
+    def trace_model(self):
+        return self._trace_model(self.provider)
+    
+    def _model(self, provider):
+        return self.llm_config["openai_model"] if provider == "openai" else self.llm_config["ollama_model"]
+    
+    def _trace_model(self, provider):
+        return f"{provider}:{self._model(provider)}"
+    
+    def _client(self, provider):
+        """Client for provider, created on first use (the router's standby provider)."""
+        if provider not in self.clients:
+            if provider == "openai" and not self.config.api_key:
+                raise ValueError("No API key available for OpenAI.")
+            self.clients[provider] = self._create_openai_client() if provider == "openai" else self._create_ollama_client()
+        return self.clients[provider]
+    
+    def _initialize_client(self):
+        # Use the configured LLM provider
+        if self.llm_config["llm_provider"] == "openai":
+            if self.config.api_key:
+                try:
+                    self.client = self._create_openai_client()
+                    self.use_openai = True
+                    log_event(f"Using OpenAI for LLM with model '{self.llm_config['openai_model']}'.")
+                except ImportError:
+                    log_event("OpenAI library not available. Falling back to Ollama.")
+                    self._initialize_ollama()
+            else:
+                log_event("No API key available. Falling back to Ollama.")
+                self._initialize_ollama()
+        else:
+            self._initialize_ollama()
+    
+    def _initialize_ollama(self):
+        try:
+            self.client = self._create_ollama_client()
+            self.use_openai = False
+            log_event(f"Using Ollama for LLM with model '{self.llm_config['ollama_model']}'.")
+        except ImportError:
+            raise ImportError("Neither OpenAI nor Ollama is available.")
+    
+    def _create_openai_client(self):
+        return self.client_registry.openai_client(is_async=True)
+    
+    def _create_ollama_client(self):
+        return self.client_registry.ollama_client(is_async=True)
+    
+    @staticmethod
+    def _safe_messages(messages):
+        """Return a copy of messages suitable for logging (base64 image data excluded)."""
+        safe_messages = []
+        for msg in messages:
+            if isinstance(msg.get('content'), list):
+                safe_content = []
+                for item in msg['content']:
+                    if item.get('type') == 'image_url':
+                        safe_content.append({'type': 'image_url', 'image_url': {'url': '[BASE64_IMAGE_DATA_EXCLUDED]'}})
+                    else:
+                        safe_content.append(item)
+                safe_messages.append({**msg, 'content': safe_content})
+            else:
+                safe_messages.append(msg)
+        return safe_messages
+
+    async def chat(self, messages):
+        log_event("LLM request messages: %s", RedactedMessages(messages), level=logging.DEBUG, category="llm_messages")
+        
+        if self.router:
+            return await self.router.acall(lambda backend: self._chat(messages, ProviderRouter.provider(backend)))
+        return await self._chat(messages, self.provider)
+    
+    async def _chat(self, messages, provider):
+        trace_model = self._trace_model(provider)
+        with tracer.stage("llm", trace_model):
+            cassette = self.client_registry.cassette
+            if cassette:
+                return await cassette.acall("llm", trace_model, messages, lambda: self._provider_chat(messages, provider))
+            return await self._provider_chat(messages, provider)
+    
+    async def _provider_chat(self, messages, provider):
+        client = self.clients[provider]
+        if provider == "openai":
+            response = await client.chat.completions.create(
+                model=self.llm_config["openai_model"],
+                messages=messages,
+                temperature=0
+            )
+            self.client_registry.prompt_cache_stats.record_openai(self.llm_config["openai_model"], response.usage)
+            return response.choices[0].message.content
+        else:
+            model = self.llm_config["ollama_model"]
+            async with self.residency_manager.arequest(model):
+                response = await client.chat(model=model, messages=messages, keep_alive=self.residency_manager.keep_alive(model))
+            self.residency_manager.record_response(model, response)
+            if "message" in response and "content" in response["message"]:
+                return response["message"]["content"]
+            else:
+                raise ValueError("Invalid response format from Ollama.")
+
+    async def chat_stream(self, messages):
+        """
+        Yield reply text fragments as they are generated by the configured provider.
+
+        Usage: AsyncConversationHandler._stream_reply() when "streaming" is enabled in the LLM config.
+        """
+        log_event("LLM streaming request messages: %s", RedactedMessages(messages), level=logging.DEBUG, category="llm_messages")
+        
+        if self.router:
+            stream = self.router.astream(lambda backend: self._stream(messages, ProviderRouter.provider(backend)))
+        else:
+            stream = self._stream(messages, self.provider)
+        async for delta in stream:
+            yield delta
+    
+    async def _stream(self, messages, provider):
+        trace_model = self._trace_model(provider)
+        cassette = self.client_registry.cassette
+        if cassette:
+            stream = cassette.astream("llm", trace_model, messages, lambda: self._provider_stream(messages, provider))
+        else:
+            stream = self._provider_stream(messages, provider)
+        start = time.perf_counter()
+        first_token = True
+        async for delta in stream:
+            if first_token:
+                tracer.record("llm_first_token", time.perf_counter() - start, trace_model)
+                first_token = False
+            yield delta
+        tracer.record("llm_stream", time.perf_counter() - start, trace_model)
+    
+    async def _provider_stream(self, messages, provider):
+        client = self.clients[provider]
+        if provider == "openai":
+            stream = await client.chat.completions.create(
+                model=self.llm_config["openai_model"],
+                messages=messages,
+                temperature=0,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                if chunk.usage:
+                    self.client_registry.prompt_cache_stats.record_openai(self.llm_config["openai_model"], chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        else:
+            model = self.llm_config["ollama_model"]
+            async with self.residency_manager.arequest(model):
+                stream = await client.chat(model=model, messages=messages, stream=True, keep_alive=self.residency_manager.keep_alive(model))
+                async for chunk in stream:
+                    if "message" not in chunk:
+                        raise ValueError("Invalid stream chunk format from Ollama.")
+                    if chunk.get("done"):
+                        self.residency_manager.record_response(model, chunk)
+                    delta = chunk["message"]["content"]
+                    if delta:
+                        yield delta
+
+class LLMHandler(AsyncLLMHandler):
+    """Blocking LLM API: each call runs AsyncLLMHandler on the shared background event loop."""
+
+    def chat(self, messages):
+        return background_loop.run(super().chat(messages))
+    
+    def chat_stream(self, messages):
+        return background_loop.iterate(super().chat_stream(messages))
+
+class SentenceSplitter:
+    """
+    Incrementally split streamed text into sentences.
+
+    Fragments are buffered until a sentence terminator followed by whitespace is seen,
+    so abbreviations and decimals split across fragments are not cut early. Sentences
+    shorter than min_chars are merged with the following one to avoid choppy speech.
+    """
+
+    _SENTENCE_END = re.compile(r'[.!?…]+["\')\]]*\s+')
+
+    def __init__(self, min_chars=20):
+        self.min_chars = min_chars
+        self.buffer = ""
+    
+    def feed(self, fragment):
+        """Add a text fragment and return any sentences completed by it."""
+        self.buffer += fragment
+        sentences = []
+        start = 0
+        for match in self._SENTENCE_END.finditer(self.buffer):
+            if match.end() - start < self.min_chars:
+                continue
+            sentence = self.buffer[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+    
+    def flush(self):
+        """Return whatever text is left in the buffer."""
+        remainder = self.buffer.strip()
+        self.buffer = ""
+        return remainder
+
+class ScreenCache:
+    """
+    Bounded LRU cache of recent screen frames keyed by a 64-bit perceptual difference hash.
+
+    A new capture whose hash is within hash_threshold bits of a cached frame reuses that
+    frame's encoded JPEG, and VLM answers are cached per frame for the same normalized
+    query, character and conversation context, so an unchanged screen needs neither
+    re-encoding nor a VLM call.
+    """
+
+    def __init__(self, max_frames=8, hash_threshold=4, max_answers_per_frame=8):
+        self.max_frames = max_frames
+        self.hash_threshold = hash_threshold
+        self.max_answers_per_frame = max_answers_per_frame
+        self.frames = OrderedDict()  # frame id -> {"hash", "jpeg", "answers"}
+        self.next_frame_id = 0
+        self.lock = threading.Lock()
+        self.counters = {"frame_hits": 0, "frame_misses": 0, "answer_hits": 0, "answer_misses": 0, "evictions": 0}
+    
+    @staticmethod
+    def difference_hash(image):
+        """64-bit dHash: brightness gradients of a 9x8 grayscale thumbnail."""
+        pixels = list(image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).getdata())
+        value = 0
+        for row in range(8):
+            offset = row * 9
+            for col in range(8):
+                value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+        return value
+    
+    @classmethod
+    def hash_jpeg(cls, jpeg):
+        image = Image.open(BytesIO(jpeg))
+        image.draft("L", (64, 64))
+        return cls.difference_hash(image)
+    
+    def match(self, frame_hash):
+        """Return the JPEG of a cached frame close enough to frame_hash, or None."""
+        with self.lock:
+            frame_id = self._find(frame_hash)
+            if frame_id is None:
+                self.counters["frame_misses"] += 1
+                return None
+            self.frames.move_to_end(frame_id)
+            self.counters["frame_hits"] += 1
+            return self.frames[frame_id]["jpeg"]
+    
+    def add(self, frame_hash, jpeg):
+        with self.lock:
+            self._add(frame_hash, jpeg)
+    
+    def _find(self, frame_hash):
+        best_id, best_distance = None, self.hash_threshold + 1
+        for frame_id, frame in self.frames.items():
+            distance = (frame["hash"] ^ frame_hash).bit_count()
+            if distance < best_distance:
+                best_id, best_distance = frame_id, distance
+        return best_id
+    
+    def _add(self, frame_hash, jpeg):
+        frame_id = self.next_frame_id
+        self.next_frame_id += 1
+        self.frames[frame_id] = {"hash": frame_hash, "jpeg": jpeg, "answers": OrderedDict()}
+        while len(self.frames) > self.max_frames:
+            self.frames.popitem(last=False)
+            self.counters["evictions"] += 1
+        return frame_id
+    
+    def _frame_for_jpeg(self, jpeg):
+        for frame_id, frame in self.frames.items():
+            if frame["jpeg"] is jpeg:
+                return frame_id
+        frame_hash = self.hash_jpeg(jpeg)
+        frame_id = self._find(frame_hash)
+        return frame_id if frame_id is not None else self._add(frame_hash, jpeg)
+    
+    @staticmethod
+    def answer_key(user_query, character, game, context_messages=None):
+        # Answers given after a conversation prefix depend on it, so the prefix is part of the key
+        context = hashlib.sha1(json.dumps(context_messages).encode("utf-8")).hexdigest() if context_messages else None
+        return (" ".join(user_query.casefold().split()).strip(" .!?"), character, game, context)
+    
+    def get_answer(self, jpeg, answer_key):
+        with self.lock:
+            frame = self.frames[self._frame_for_jpeg(jpeg)]
+            answer = frame["answers"].get(answer_key)
+            self.counters["answer_hits" if answer is not None else "answer_misses"] += 1
+            return answer
+    
+    def put_answer(self, jpeg, answer_key, answer):
+        with self.lock:
+            answers = self.frames[self._frame_for_jpeg(jpeg)]["answers"]
+            answers[answer_key] = answer
+            while len(answers) > self.max_answers_per_frame:
+                answers.popitem(last=False)
+    
+    def stats(self):
+        with self.lock:
+            return {"frames": len(self.frames), **self.counters}
+
+class ScreenCapturePipeline:
+    """
+    Screenshot capture, downscale and JPEG encode, tuned for VLM payloads.
+
+    The grabbed frame is shrunk with a fast integer reduce before an aspect-preserving
+    bilinear resize into the configured box, then encoded as JPEG. The optional debug PNG
+    is written by a background thread that drops frames while busy. With a ScreenCache,
+    frames matching a recent screen reuse its JPEG instead of being encoded again.
+    Per-stage timings of the last on-demand capture are kept in last_timings.
+    """
+
+    DEBUG_FILENAME = "loremaster_vlm.png"
+
+    def __init__(self, vision_config, image_source=None, screen_cache=None):
+        self.image_source = image_source or ImageGrab.grab
+        self.target_size = tuple(vision_config["screenshot_size"])
+        self.quality = vision_config["screenshot_quality"]
+        self.debug_screenshot = vision_config.get("debug_screenshot", False)
+        self.screen_cache = screen_cache
+        self.last_timings = {}
+        self.debug_queue = Queue(maxsize=1)
+        if self.debug_screenshot:
+            threading.Thread(target=self._debug_writer, daemon=True).start()
+    
+    def capture(self, use_cache=True, sampled=False):
+        """
+        Capture the screen and return it as JPEG bytes. Background samples (sampled=True)
+        write no debug copy and leave last_timings to the on-demand captures.
+        """
+        timings = {}
+        start = time.perf_counter()
+        image = self.image_source()
+        timings["grab"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        image = self.downscale(image)
+        timings["downscale"] = time.perf_counter() - start
+        
+        if self.debug_screenshot and not sampled:
+            self._queue_debug_copy(image)
+        
+        frame_hash = None
+        use_cache = use_cache and self.screen_cache is not None
+        if use_cache:
+            start = time.perf_counter()
+            frame_hash = ScreenCache.difference_hash(image)
+            jpeg = self.screen_cache.match(frame_hash)
+            timings["hash"] = time.perf_counter() - start
+            if jpeg is not None:
+                if not sampled:
+                    self.last_timings = timings
+                return jpeg
+        
+        start = time.perf_counter()
+        jpeg = self.encode(image)
+        timings["encode"] = time.perf_counter() - start
+        
+        if use_cache:
+            self.screen_cache.add(frame_hash, jpeg)
+        if not sampled:
+            self.last_timings = timings
+        return jpeg
+    
+    def fit_size(self, width, height):
+        """Largest size with the source aspect ratio that fits the target box (never upscaled)."""
+        target_width, target_height = self.target_size
+        scale = min(target_width / width, target_height / height, 1.0)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+    
+    def downscale(self, image):
+        size = self.fit_size(*image.size)
+        factor = min(image.width // size[0], image.height // size[1])
+        if factor >= 2:
+            image = image.reduce(factor)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        if image.size != size:
+            image = image.resize(size, Image.Resampling.BILINEAR)
+        return image
+    
+    def encode(self, image):
+        output = BytesIO()
+        image.save(output, format="JPEG", quality=self.quality)
+        return output.getvalue()
+    
+    def _queue_debug_copy(self, image):
+        try:
+            self.debug_queue.put_nowait(image)
+        except Full:
+            pass  # previous debug copy still being written; skip this one
+    
+    def _debug_writer(self):
+        while True:
+            image = self.debug_queue.get()
+            try:
+                image.save(self.DEBUG_FILENAME, format="PNG")
+            except Exception as e:
+                log_event(f"Warning: Could not save debug screenshot: {e}")
+
+class FrameRingBuffer:
+    """
+    Fixed-size ring of encoded frames in one preallocated buffer.
+
+    Every slot has room for memory_bytes // slots bytes; frames that do not fit are dropped
+    rather than growing the buffer. Readers get copies, so the sampler never waits on them.
+    """
+
+    def __init__(self, slots, memory_bytes):
+        self.slots = slots
+        self.slot_size = memory_bytes // slots
+        self.buffer = bytearray(self.slot_size * slots)
+        self.view = memoryview(self.buffer)
+        self.lengths = [0] * slots
+        self.timestamps = [0.0] * slots
+        self.next_slot = 0
+        self.count = 0
+        self.oversized = 0
+        self.lock = threading.Lock()
+    
+    def write(self, frame, timestamp):
+        if len(frame) > self.slot_size:
+            self.oversized += 1
+            return False
+        with self.lock:
+            slot = self.next_slot
+            offset = slot * self.slot_size
+            self.view[offset:offset + len(frame)] = frame
+            self.lengths[slot] = len(frame)
+            self.timestamps[slot] = timestamp
+            self.next_slot = (slot + 1) % self.slots
+            self.count = min(self.count + 1, self.slots)
+        return True
+    
+    def frames_until(self, timestamp, count=1):
+        """Return up to count frames (oldest first) ending with the one closest to timestamp."""
+        with self.lock:
+            # Slots in chronological order
+            order = [(self.next_slot - self.count + i) % self.slots for i in range(self.count)]
+            if not order:
+                return []
+            closest = min(range(len(order)), key=lambda i: abs(self.timestamps[order[i]] - timestamp))
+            return [
+                bytes(self.view[slot * self.slot_size:slot * self.slot_size + self.lengths[slot]])
+                for slot in order[max(0, closest - count + 1):closest + 1]
+            ]
+
+class FrameSampler:
+    """Background thread that captures the screen at a fixed low rate into a FrameRingBuffer."""
+
+    def __init__(self, capture_pipeline, fps=2, frames=8, memory_mb=4):
+        self.capture_pipeline = capture_pipeline
+        self.interval = 1.0 / fps
+        self.ring = FrameRingBuffer(frames, int(memory_mb * 1024 * 1024))
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.samples = 0
+        self.errors = 0
+    
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+    
+    def start(self):
+        if self.running:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        log_event(f"Frame sampler started ({1 / self.interval:g} fps, {self.ring.slots} x {self.ring.slot_size // 1024} KB slots)")
+    
+    def stop(self):
+        self.stop_event.set()
+    
+    def _run(self):
+        next_sample = time.monotonic()
+        while not self.stop_event.is_set():
+            try:
+                # Timestamp the grab, not the end of encoding
+                timestamp = time.monotonic()
+                self.ring.write(self.capture_pipeline.capture(use_cache=False, sampled=True), timestamp)
+                self.samples += 1
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1:
+                    log_event(f"Frame sampler capture failed: {e}")
+            next_sample = max(next_sample + self.interval, time.monotonic())
+            self.stop_event.wait(next_sample - time.monotonic())
+    
+    def frames_at(self, timestamp, count=1):
+        return self.ring.frames_until(timestamp, count)
+    
+    def stats(self):
+        return {"samples": self.samples, "errors": self.errors, "oversized": self.ring.oversized, "buffered": self.ring.count}
+
+class AsyncVisionHandler:
+    """VLM calls on the async OpenAI/Ollama clients; VisionHandler is the blocking API over it."""
+
+    def __init__(self, config_manager, client_registry=None, residency_manager=None, image_source=None):
+        self.config = config_manager
+        self.client_registry = client_registry or BackendClientRegistry(config_manager)
+        self.residency_manager = residency_manager or ModelResidencyManager(config_manager, self.client_registry)
+        self.vision_config = config_manager.vision_config
+        self.screen_cache = None
+        if self.vision_config.get("screen_cache_size", 8) > 0:
+            self.screen_cache = ScreenCache(
+                max_frames=self.vision_config.get("screen_cache_size", 8),
+                hash_threshold=self.vision_config.get("screen_hash_threshold", 4)
+            )
+        self.capture_pipeline = ScreenCapturePipeline(self.vision_config, image_source, self.screen_cache)
+        self.frame_sampler = None
+        if self.vision_config.get("frame_sampler", False):
+            self.frame_sampler = FrameSampler(
+                self.capture_pipeline,
+                fps=self.vision_config.get("sampler_fps", 2),
+                frames=self.vision_config.get("sampler_frames", 8),
+                memory_mb=self.vision_config.get("sampler_memory_mb", 4)
+            )
+        self.vision_clients = {}  # provider -> client
+        self._initialize_vision_client()
+        self.vision_clients[self.vision_provider] = self.vision_client
+        other = "ollama" if self.use_openai_vision else "openai"
+        self.router = ProviderRouter.from_config(self.config, [self.trace_model, self._trace_model(other)], self._vision_client)
+    
+    def _initialize_vision_client(self):
+        """Initialize the vision client based on configuration"""
+        if self.vision_config["vision_provider"] == "openai":
+            if self.config.api_key:
+                try:
+                    self.vision_client = self._create_openai_client()
+                    self.use_openai_vision = True
+                    log_event(f"Using OpenAI for vision with model '{self.vision_config['openai_vision_model']}'.")
+                except ImportError:
+                    log_event("OpenAI library not available. Falling back to Ollama for vision.")
+                    self._initialize_ollama_vision()
+            else:
+                log_event("No API key available. Falling back to Ollama for vision.")
+                self._initialize_ollama_vision()
+        else:
+            # This should be the path taken when vision_provider is "ollama"
+            self._initialize_ollama_vision()
+    
+    def _initialize_ollama_vision(self):
+        """Initialize Ollama for vision tasks"""
+        try:
+            self.vision_client = self._create_ollama_client()
+            self.use_openai_vision = False
+            log_event(f"Using Ollama for vision with model '{self.vision_config['ollama_vision_model']}'.")
+        except ImportError:
+            raise ImportError("Ollama not available for vision tasks.")
+    
+    def _create_openai_client(self):
+        return self.client_registry.openai_client(is_async=True)
+    
+    def _create_ollama_client(self):
+        return self.client_registry.ollama_client(is_async=True)
+    
+    def _vision_client(self, provider):
+        """Client for provider, created on first use (the router's standby provider)."""
+        if provider not in self.vision_clients:
+            if provider == "openai" and not self.config.api_key:
+                raise ValueError("No API key available for OpenAI.")
+            self.vision_clients[provider] = self._create_openai_client() if provider == "openai" else self._create_ollama_client()
+        return self.vision_clients[provider]
+    
+    def capture_screenshot(self):
+        """Capture a screenshot, downscale it and return it as JPEG bytes (None on failure)."""
+        try:
+            jpeg = self.capture_pipeline.capture()
+            for stage, seconds in self.capture_pipeline.last_timings.items():
+                tracer.record(f"capture_{stage}", seconds)
+            timings = ", ".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in self.capture_pipeline.last_timings.items())
+            log_event(f"Screenshot captured ({len(jpeg)} bytes JPEG): {timings}")
+            return jpeg
+        except Exception as e:
+            log_event(f"Error capturing or encoding screenshot: {e}")
+            return None
+    
+    def start_frame_sampler(self):
+        if self.frame_sampler:
+            self.frame_sampler.start()
+    
+    def stop_frame_sampler(self):
+        if self.frame_sampler:
+            self.frame_sampler.stop()
+    
+    def sampled_screenshot(self, query_time):
+        """
+        Return the sampled frame closest to query_time (a time.monotonic() value), or the
+        frames leading up to it when sampler_sequence_frames > 1. None if nothing is sampled.
+        """
+        if not self.frame_sampler or not self.frame_sampler.running:
+            return None
+        count = self.vision_config.get("sampler_sequence_frames", 1)
+        frames = self.frame_sampler.frames_at(query_time, count)
+        if not frames:
+            return None
+        log_event(f"Using {len(frames)} sampled frame(s) for the vision query")
+        return frames if count > 1 else frames[-1]
+    
+    def capture_and_encode_screenshot(self):
+        """Capture a screenshot, resize it, and encode it in Base64."""
+        jpeg = self.capture_screenshot()
+        return base64.b64encode(jpeg).decode("ascii") if jpeg else None
+    
+    async def analyze_screen(self, user_query, character_info, image=None, context_messages=None):
+        """
+        Analyze the screen (or an already captured JPEG image) using the configured vision provider.
+        With context_messages (persona system prompt and history), the question is sent as the
+        next user turn after them instead of as a standalone vision prompt.
+        """
+        if image is None:
+            # Capture runs on a worker thread, off the event loop
+            image = await asyncio.to_thread(self.capture_screenshot)
+        if not image:
+            return "Failed to capture or process the screen image."
+
+        answer_key = self._answer_key(user_query, character_info, context_messages)
+        cached_answer = self._cached_answer(self._latest_frame(image), answer_key)
+        if cached_answer is not None:
+            return cached_answer
+
+        # Use centralized prompt management
+        character_prompt = self._vision_prompt(user_query, character_info, image, context_messages)
+
+        try:
+            answer = await self._analyze(character_prompt, image, context_messages)
+        except Exception as e:
+            log_event(f"Error in analyze_screen(): {e}")
+            return "An error occurred while analyzing the screen."
+        
+        self._store_answer(self._latest_frame(image), answer_key, answer)
+        return answer
+    
+    @staticmethod
+    def _vision_prompt(user_query, character_info, image, context_messages):
+        frame_count = len(image) if isinstance(image, list) else 1
+        if context_messages:
+            return PromptManager.get_vision_turn_prompt(user_query, frame_count)
+        return PromptManager.get_vision_prompt(character_info['character'], character_info['game'], user_query, frame_count)
+    
+    @staticmethod
+    def _latest_frame(image):
+        # image is one JPEG or a chronological frame sequence
+        return image[-1] if isinstance(image, list) else image
+    
+    def _answer_key(self, user_query, character_info, context_messages=None):
+        if not self.screen_cache or not self.vision_config.get("reuse_vision_answers", True):
+            return None
+        return ScreenCache.answer_key(user_query, character_info['character'], character_info['game'], context_messages)
+    
+    def _cached_answer(self, image, answer_key):
+        if answer_key is None:
+            return None
+        try:
+            answer = self.screen_cache.get_answer(image, answer_key)
+        except Exception as e:
+            log_event(f"Warning: Screen cache lookup failed: {e}")
+            return None
+        if answer is not None:
+            log_event("Screen unchanged for a repeated vision query; reusing cached VLM answer")
+        return answer
+    
+    def _store_answer(self, image, answer_key, answer):
+        if answer_key is not None and answer:
+            self.screen_cache.put_answer(image, answer_key, answer)
+    
+    def stats(self):
+        """Return screen cache counters and the last capture's stage timings."""
+        stats = {"last_capture_ms": {stage: round(seconds * 1000, 2) for stage, seconds in self.capture_pipeline.last_timings.items()}}
+        if self.screen_cache:
+            stats["screen_cache"] = self.screen_cache.stats()
+        if self.frame_sampler:
+            stats["frame_sampler"] = self.frame_sampler.stats()
+        return stats
+    
+    @property
+    def vision_provider(self):
+        return "openai" if self.use_openai_vision else "ollama"
+    
+    @property
+    def trace_model(self):
+        return self._trace_model(self.vision_provider)
+    
+    def _trace_model(self, provider):
+        if provider == "openai":
+            return f"openai:{self.vision_config['openai_vision_model']}"
+        return f"ollama:{self.vision_config['ollama_vision_model']}"
+    
+    @staticmethod
+    def _cassette_request(prompt, image, context_messages):
+        return {"prompt": prompt, "images": image if isinstance(image, list) else [image], "context": list(context_messages or [])}
+    
+    async def _analyze(self, prompt, image, context_messages=None):
+        if self.router:
+            return await self.router.acall(lambda backend: self._analyze_on(ProviderRouter.provider(backend), prompt, image, context_messages))
+        return await self._analyze_on(self.vision_provider, prompt, image, context_messages)
+    
+    async def _analyze_on(self, provider, prompt, image, context_messages=None):
+        analyze = self._analyze_with_openai if provider == "openai" else self._analyze_with_ollama
+        trace_model = self._trace_model(provider)
+        cassette = self.client_registry.cassette
+        with tracer.stage("vlm", trace_model):
+            if cassette:
+                request = self._cassette_request(prompt, image, context_messages)
+                return await cassette.acall("vlm", trace_model, request, lambda: analyze(prompt, image, context_messages))
+            return await analyze(prompt, image, context_messages)
+    
+    async def _analyze_with_openai(self, prompt, image, context_messages=None):
+        """Analyze using OpenAI Vision API"""
+        messages = self._build_openai_messages(prompt, image, context_messages)
         
         # Log without base64 data
         log_event("Sending vision request to OpenAI (image data excluded from log)")
         
-        response = self.vision_client.chat.completions.create(
+        response = await self.vision_clients["openai"].chat.completions.create(
             model=self.vision_config["openai_vision_model"],
             messages=messages,
             temperature=0,
             max_tokens=500
         )
+        self.client_registry.prompt_cache_stats.record_openai(self.vision_config["openai_vision_model"], response.usage)
         return response.choices[0].message.content    
 
-    def _analyze_with_ollama(self, prompt, image_b64):
+    async def _analyze_with_ollama(self, prompt, image, context_messages=None):
         """Analyze using Ollama LLAVA"""
-        messages = [
+        messages = self._build_ollama_messages(prompt, image, context_messages)
+        
+        # Log without base64 data
+        log_event("Sending vision request to Ollama (image data excluded from log)")
+        
+        model = self.vision_config["ollama_vision_model"]
+        async with self.residency_manager.arequest(model):
+            response = await self.vision_clients["ollama"].chat(
+                model=model, 
+                messages=messages,
+                keep_alive=self.residency_manager.keep_alive(model)
+            )
+        self.residency_manager.record_response(model, response)
+        return response["message"]["content"]
+
+    @staticmethod
+    def _build_openai_messages(prompt, image, context_messages=None):
+        images = image if isinstance(image, list) else [image]
+        return list(context_messages or []) + [
+            {
+                "role": "user",
+                "content": [{"type": "text", "text": prompt}] + [
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{base64.b64encode(frame).decode('ascii')}",
+                            "detail": "low"
+                        }
+                    }
+                    for frame in images
+                ]
+            }
+        ]
+
+    @staticmethod
+    def _build_ollama_messages(prompt, image, context_messages=None):
+        # Raw JPEG bytes; the Ollama client serializes them for the request body itself
+        return list(context_messages or []) + [
             {
                 "role": "user", 
                 "content": prompt,
-                "images": [image_b64]
+                "images": image if isinstance(image, list) else [image]
             }
         ]
+
+class VisionHandler(AsyncVisionHandler):
+    """Blocking VLM API: each call runs AsyncVisionHandler on the shared background event loop."""
+
+    def analyze_screen(self, user_query, character_info, image=None, context_messages=None):
+        return background_loop.run(super().analyze_screen(user_query, character_info, image, context_messages))
+
+class LocalMessageParser:
+    """
+    Deterministic rule-based parser for common inputs.
+
+    Handles context continuations ("tell me more"), obvious vision phrasing ("what's on screen")
+    and "Ask X from Y ..." patterns. Returns the parsed dict together with a confidence so
+    MessageParser can fall back to the LLM parser when the rules are unsure.
+    """
+
+    _CONTINUATION = re.compile(
+        r"^(?:ok(?:ay)?,?\s+|and\s+|please\s+)*(?:tell me more|go on|continue|keep going|and then|what else|"
+        r"say more|elaborate|more please|what happened next)\b(?:\s+please)?[\s.!?]*$",
+        re.IGNORECASE
+    )
+    _VISION = re.compile(
+        r"\b(?:on|at|in) (?:the |my |this )?(?:screen|display|monitor)\b|\blook at (?:that|this|it|him|her|them|me)\b|"
+        r"\bwhat do you see\b|\bcan you see\b|\bdo you see\b|\bwhat(?:'s| is) visible\b|\bcharacter creation\b",
+        re.IGNORECASE
+    )
+    # Character names are capitalized words (case-sensitive even under IGNORECASE) and end at the
+    # first from/of/in, so "Ask Link from The Legend of Zelda" splits after "Link"
+    _ASK = re.compile(
+        r"^(?:hey,?\s+|loremaster,?\s+)?(?:ask|tell)\s+"
+        r"(?P<character>(?!(?:from|of|in)\b)(?-i:[A-Z])[\w'\-]*(?:\s+(?!(?:from|of|in)\b)(?-i:[A-Z])[\w'\-]*){0,3})\s+"
+        r"(?:from|of|in)\s+(?P<game>.+?)\s*(?:(?:,|:)\s*|\s)"
+        r"(?P<sep>about|what|why|how|where|when|who|which|if|whether)\b\s*(?P<rest>.*)$",
+        re.IGNORECASE
+    )
+    _SEX_CUES = {
+        "male": re.compile(r"\b(?:he|him|his|himself)\b", re.IGNORECASE),
+        "female": re.compile(r"\b(?:she|her|hers|herself)\b", re.IGNORECASE)
+    }
+    _SUBJECT_PRONOUN = re.compile(r"\b(?:he|she|they)\b", re.IGNORECASE)
+    _GAME_JOINER = re.compile(r"\b(?:from|of|in)\b", re.IGNORECASE)
+    _NAME = re.compile(r"\b[A-Z][\w'\-]*")
+    _VOCATIVE = re.compile(r"^(?!(?:Hey|Hi|Ok|Okay|Oh|Wow|Look|Please|So|Well|Now|LoreMaster)\b)[A-Z][\w'\-]*(?:\s+[A-Z][\w'\-]*)*,")
+    _SECOND_PERSON = [
+        (re.compile(r"\b(?:himself|herself)\b", re.IGNORECASE), "yourself"),
+        (re.compile(r"\b(?:his|her)\b", re.IGNORECASE), "your"),
+        (re.compile(r"\bhim\b", re.IGNORECASE), "you")
+    ]
+
+    def __init__(self):
+        self.known_sex = {}
+
+    def remember(self, parsed):
+        """Learn a character's sex from a parse result so later local parses can reuse it."""
+        character = parsed.get("character")
+        sex = str(parsed.get("sex", "")).lower()
+        if character and character != "Character" and sex in ("male", "female"):
+            self.known_sex[character.lower()] = sex
+
+    def parse(self, natural_input):
+        """Return (parsed, confidence), or (None, 0.0) if no rule applies."""
+        text = " ".join(natural_input.split())
+        requires_vision = bool(self._VISION.search(text))
+        
+        if self._CONTINUATION.match(text):
+            return self._result("Character", "Game", "male", text, requires_vision), 0.95
+        
+        match = self._ASK.match(text)
+        if match:
+            return self._parse_ask(match, requires_vision)
+        
+        if requires_vision and not re.search(r"\b(?:ask|tell|talk to|from)\b", text, re.IGNORECASE):
+            # "Zeus, look at that!" may address a character other than the active one
+            confidence = 0.6 if self._VOCATIVE.match(text) else 0.9
+            return self._result("Character", "Game", "male", text, True), confidence
+        
+        return None, 0.0
+
+    def _parse_ask(self, match, requires_vision):
+        character = match.group("character").strip()
+        game = match.group("game").strip(" ,:")
+        sep = match.group("sep").lower()
+        rest = match.group("rest").strip()
+        confidence = 0.9
+        
+        if self._GAME_JOINER.search(game):
+            # "Ask Kratos of Sparta from God of War": the split on the first from/of/in is a guess
+            confidence -= 0.3
+        
+        # Pronouns only clearly refer to the addressed character when nobody else is named:
+        # in "about Athena and her betrayal", "her" is Athena
+        pronouns_mean_character = not self._other_names(character, rest)
+        if not pronouns_mean_character and any(pattern.search(rest) for pattern in self._SEX_CUES.values()):
+            confidence -= 0.3
+        
+        sex = None
+        if pronouns_mean_character:
+            for candidate, pattern in self._SEX_CUES.items():
+                if pattern.search(rest):
+                    sex = candidate
+                    break
+        if sex is None:
+            sex = self.known_sex.get(character.lower())
+        if sex is None:
+            sex = "male"
+            confidence -= 0.3
+        
+        if not rest:
+            confidence -= 0.3
+        elif self._SUBJECT_PRONOUN.search(rest):
+            # Rewriting "why he holds ..." into second person needs real grammar; leave it to the LLM
+            confidence -= 0.3
+        
+        if pronouns_mean_character:
+            for pattern, replacement in self._SECOND_PERSON:
+                rest = pattern.sub(replacement, rest)
+        joiner = "" if rest.startswith("'") else " "
+        message = f"Tell me {sep}{joiner}{rest}".rstrip(" .?!")
+        message += "." if sep == "about" else "?"
+        
+        return self._result(character, game, sex, message, requires_vision), confidence
+
+    def _other_names(self, character, text):
+        """Capitalized words in text that are not part of the character's name (or "I")."""
+        own = set(character.lower().split())
+        return [
+            name for name in self._NAME.findall(text)
+            if name.lower() not in own and name != "I" and not name.startswith("I'")
+        ]
+
+    @staticmethod
+    def _result(character, game, sex, message, requires_vision):
+        return {
+            "game": game,
+            "character": character,
+            "sex": sex,
+            "message": message,
+            "requires_vision": requires_vision
+        }
+
+class ParseCache:
+    """
+    Bounded LRU/TTL cache of LLM parse results keyed on normalized input.
+
+    Results are stored exactly as the parser returned them, so inputs resolving to the
+    generic "Character"/"Game" placeholders stay valid: ConversationHandler fills those in
+    from the active context after the lookup. Lookups return copies because the
+    conversation handler updates the parsed dict in place.
+
+    With a cache_file, new entries are written by a background thread at most once per
+    save_delay_seconds, and close() writes any that are still unsaved.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=3600, cache_file=None, save_delay_seconds=5):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_file = cache_file
+        self.save_delay_seconds = save_delay_seconds
+        self.entries = OrderedDict()  # normalized input -> (stored_at, parsed)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saves = 0
+        self.dirty = False
+        self.saver = None
+        self.save_requested = threading.Event()
+        self.stop_event = threading.Event()
+        if self.cache_file:
+            self._load()
+    
+    @staticmethod
+    def normalize(text):
+        return " ".join(text.casefold().split()).strip(" .!?")
+    
+    def _expired(self, stored_at, now):
+        return bool(self.ttl_seconds) and now - stored_at > self.ttl_seconds
+    
+    def get(self, text):
+        key = self.normalize(text)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and not self._expired(entry[0], now):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            if entry:
+                del self.entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, text, parsed):
+        key = self.normalize(text)
+        with self.lock:
+            self.entries[key] = (time.time(), dict(parsed))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            if not self.cache_file:
+                return
+            self.dirty = True
+            if self.saver is None:
+                self.saver = threading.Thread(target=self._saver, daemon=True)
+                self.saver.start()
+        self.save_requested.set()
+    
+    def _saver(self):
+        while not self.stop_event.is_set():
+            self.save_requested.wait()
+            # Entries put while waiting out the delay are written with this save
+            self.stop_event.wait(self.save_delay_seconds)
+            self.save_requested.clear()
+            self.save()
+    
+    def save(self):
+        """Write the cache to disk (atomically replacing the previous file)."""
+        with self.lock:
+            data = [[key, stored_at, parsed] for key, (stored_at, parsed) in self.entries.items()]
+            self.dirty = False
+        try:
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.cache_file)
+            self.saves += 1
+        except Exception as e:
+            log_event(f"Warning: Could not save parse cache {self.cache_file}: {e}")
+    
+    def close(self):
+        """Stop the background saver and write any unsaved entries."""
+        self.stop_event.set()
+        self.save_requested.set()
+        if self.saver:
+            self.saver.join()
+        if self.dirty:
+            self.save()
+    
+    def _load(self):
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError) as e:
+            log_event(f"Warning: Could not load parse cache {self.cache_file}: {e}")
+            return
         
-        # Log without base64 data
-        log_event("Sending vision request to Ollama (image data excluded from log)")
-        
-        response = self.vision_client.chat(
-            model=self.vision_config["ollama_vision_model"], 
-            messages=messages
-        )
-        return response["message"]["content"]
+        now = time.time()
+        for key, stored_at, parsed in data[-self.max_entries:]:
+            if not self._expired(stored_at, now):
+                self.entries[key] = (stored_at, parsed)
+        log_event(f"Loaded {len(self.entries)} parse cache entries from {self.cache_file}")
+    
+    def stats(self):
+        with self.lock:
+            size = len(self.entries)
+        return {"size": size, "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "saves": self.saves}
 
-class MessageParser:
-    def __init__(self, llm_handler):
+class AsyncMessageParser:
+    """Input routing: the local fast path and parse cache, then an awaited LLM call; MessageParser is the blocking API."""
+
+    def __init__(self, llm_handler, parser_config=None):
         self.llm_handler = llm_handler
         self.system_prompt = PromptManager.get_message_parser_prompt()
+        self.parser_config = parser_config or {}
+        self.local_parser = LocalMessageParser() if self.parser_config.get("local_fast_path", True) else None
+        self.local_confidence_threshold = self.parser_config.get("local_confidence_threshold", 0.8)
+        self.cache = None
+        if self.parser_config.get("cache_size", 256) > 0:
+            self.cache = ParseCache(
+                max_entries=self.parser_config.get("cache_size", 256),
+                ttl_seconds=self.parser_config.get("cache_ttl_seconds", 3600),
+                cache_file=self.parser_config.get("cache_file"),
+                save_delay_seconds=self.parser_config.get("cache_save_delay_seconds", 5)
+            )
+        self.last_path = None
+        self.path_counts = {"empty": 0, "local": 0, "cache": 0, "llm": 0, "fallback": 0}
     
-    def parse(self, natural_input):
+    def _record_path(self, path):
+        self.last_path = path
+        self.path_counts[path] += 1
+        log_event(f"Parse path: {path}")
+    
+    def close(self):
+        if self.cache:
+            self.cache.close()
+    
+    def stats(self):
+        """Return counters for which parsing path handled each input."""
+        stats = {"last_path": self.last_path, **self.path_counts}
+        if self.cache:
+            stats["parse_cache"] = self.cache.stats()
+        return stats
+    
+    async def parse(self, natural_input):
+        parsed = self.parse_without_llm(natural_input)
+        if parsed is not None:
+            return parsed
+        return await self._parse_with_llm(natural_input)
+    
+    def parse_without_llm(self, natural_input):
+        """
+        Resolve the input from the empty-input fallback, the local fast path or the parse cache.
+
+        Returns None when an LLM routing call is needed.
+        """
         # Ensure we have valid input
         if not natural_input or not natural_input.strip():
             log_event("Empty input received, using fallback")
+            self._record_path("empty")
             return {
                 "game": "Game", 
                 "character": "Character", 
@@ -406,49 +2661,554 @@ class MessageParser:
                 "requires_vision": False
             }
         
+        if self.local_parser:
+            parsed, confidence = self.local_parser.parse(natural_input)
+            if parsed and confidence >= self.local_confidence_threshold:
+                log_event(f"Parsed locally (confidence {confidence:.2f}): {parsed}")
+                self._record_path("local")
+                return parsed
+            if parsed:
+                log_event(f"Local parse confidence {confidence:.2f} below threshold, using LLM parser")
+        
+        if self.cache:
+            cached = self.cache.get(natural_input)
+            if cached:
+                log_event(f"Parse cache hit: {cached}")
+                self._record_path("cache")
+                return cached
+        
+        return None
+    
+    async def parse_with_llm(self, natural_input):
+        """Parse the input with the LLM routing call and cache a successful result."""
+        return await self._parse_with_llm(natural_input)
+    
+    async def _parse_with_llm(self, natural_input):
+        messages = self._build_llm_messages(natural_input)
+        
+        try:
+            log_event(f"Parsing input: {natural_input}")
+            raw = await self.llm_handler.chat(messages)
+            parsed = self._parsed_from_response(raw)
+        except Exception as e:
+            log_event(f"Error in parse(): {e}")
+            return self._fallback(natural_input)
+        if self.cache:
+            self.cache.put(natural_input, parsed)
+        return parsed
+    
+    def _build_llm_messages(self, natural_input):
         user_prompt = f"Input: {natural_input}\nOutput:"
-        messages = [
+        return [
             {"role": "system", "content": self.system_prompt.strip()},
             {"role": "user", "content": user_prompt.strip()}
         ]
+    
+    def _parsed_from_response(self, raw):
+        """Extract the parse result from the raw LLM response; raises ValueError if none is found."""
+        log_event("Raw parsing response: %r", raw, level=logging.DEBUG, category="llm_messages")
         
+        match = re.search(r'{.*}', raw, re.DOTALL)
+        if not match:
+            raise ValueError("No JSON object found in response.")
+        
+        json_str = match.group(0)
+        
+        # Clean up common JSON formatting issues from LLM responses
+        json_str = json_str.replace('\\_', '_')  # Fix escaped underscores
+        json_str = json_str.replace('\\n', '')   # Remove escaped newlines that might break JSON
+        
+        parsed = json.loads(json_str)
+        log_event(f"Parsed result: {parsed}")
+        if self.local_parser:
+            self.local_parser.remember(parsed)
+        self._record_path("llm")
+        return parsed
+    
+    def _fallback(self, natural_input):
+        fallback = {
+            "game": "Game", 
+            "character": "Character", 
+            "sex": "male", 
+            "message": natural_input,
+            "requires_vision": False
+        }
+        self._record_path("fallback")
+        return fallback
+
+class MessageParser(AsyncMessageParser):
+    """
+    Blocking parser API: LLM routing calls run AsyncMessageParser on the shared background
+    event loop, so its llm_handler must be the async one (AsyncLLMHandler).
+    """
+
+    def __init__(self, llm_handler, parser_config=None):
+        if isinstance(llm_handler, LLMHandler):
+            # Its blocking calls would be made from the background loop itself and fail there
+            raise TypeError("MessageParser needs an AsyncLLMHandler, not the blocking LLMHandler")
+        super().__init__(llm_handler, parser_config)
+    
+    def parse(self, natural_input):
+        return background_loop.run(super().parse(natural_input))
+    
+    def parse_with_llm(self, natural_input):
+        return background_loop.run(super().parse_with_llm(natural_input))
+
+class ApproximateTokenizer:
+    """
+    Token estimate for models without a local tokenizer (Ollama): one token per short word
+    or punctuation mark, plus one per further 6 characters of long words.
+    """
+
+    name = "approximate"
+    _PIECES = re.compile(r"\w+|[^\w\s]")
+
+    def count(self, text):
+        return sum(1 + (len(piece) - 1) // 6 for piece in self._PIECES.findall(text))
+
+class TiktokenTokenizer:
+    """Exact token counts for OpenAI models via the optional tiktoken package."""
+
+    def __init__(self, model):
+        import tiktoken
         try:
-            log_event(f"Parsing input: {natural_input}")
-            raw = self.llm_handler.chat(messages)
-            log_event(f"Raw parsing response: {repr(raw)}")
-            
-            match = re.search(r'{.*}', raw, re.DOTALL)
-            if not match:
-                raise ValueError("No JSON object found in response.")
-            
-            json_str = match.group(0)
-            
-            # Clean up common JSON formatting issues from LLM responses
-            json_str = json_str.replace('\\_', '_')  # Fix escaped underscores
-            json_str = json_str.replace('\\n', '')   # Remove escaped newlines that might break JSON
-            
-            parsed = json.loads(json_str)
-            log_event(f"Parsed result: {parsed}")
-            return parsed
-        except Exception as e:
-            log_event(f"Error in parse(): {e}")
-            fallback = {
-                "game": "Game", 
-                "character": "Character", 
-                "sex": "male", 
-                "message": natural_input,
-                "requires_vision": False
-            }
-            return fallback
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("o200k_base")
+        self.name = f"tiktoken:{self.encoding.name}"
+    
+    def count(self, text):
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+def create_tokenizer(model, tokenizer="auto", is_openai=False):
+    """Return the tokenizer for model: tiktoken for OpenAI models when available, else the approximation."""
+    if tokenizer == "tiktoken" or (tokenizer == "auto" and is_openai):
+        try:
+            return TiktokenTokenizer(model)
+        except ImportError:
+            log_event("tiktoken not installed; using approximate token counts.")
+    return ApproximateTokenizer()
+
+class ConversationContext:
+    """
+    History of one character:game conversation with per-message token counts and a running
+    total, so budgeting never re-counts the whole history. With a ConversationStore, every
+    change is written through to it as it happens.
+    """
+
+    # Chat formats add a few tokens of framing per message
+    MESSAGE_OVERHEAD_TOKENS = 4
+
+    def __init__(self, key=None, store=None):
+        self.key = key
+        self.store = store
+        self.messages = []
+        self.token_counts = []
+        self.total_tokens = 0
+        self.summary = ""
+        self.summary_tokens = 0
+        self.evicted_tokens = 0
+    
+    def append(self, message, tokens):
+        self.messages.append(message)
+        self.token_counts.append(tokens)
+        self.total_tokens += tokens
+        if self.store:
+            self.store.append_message(self.key, message, tokens)
+    
+    def evict_oldest(self, count):
+        """Remove and return the oldest count messages."""
+        evicted = self.messages[:count]
+        evicted_tokens = sum(self.token_counts[:count])
+        self.total_tokens -= evicted_tokens
+        self.evicted_tokens += evicted_tokens
+        del self.messages[:count]
+        del self.token_counts[:count]
+        if self.store:
+            self.store.delete_oldest(self.key, count)
+            self.store.save_context(self)
+        return evicted
+    
+    def set_summary(self, summary, tokens):
+        self.summary, self.summary_tokens = summary, tokens
+        if self.store:
+            self.store.save_context(self)
+
+class ConversationStore:
+    """
+    SQLite store of conversations keyed by "character:game".
+
+    Messages are inserted one by one as they are added and deleted once evicted from the
+    window (their content lives on in the summary), so a context can be dropped from memory
+    at any time and reloaded later, including after a restart. The connection is shared
+    across threads behind a lock.
+    """
+
+    def __init__(self, path, tokenizer_name):
+        self.path = path
+        self.tokenizer_name = tokenizer_name
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, context_key TEXT NOT NULL, "
+                "role TEXT NOT NULL, content TEXT NOT NULL, tokens INTEGER NOT NULL, tokenizer TEXT NOT NULL DEFAULT '')"
+            )
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(messages)")]
+            if "tokenizer" not in columns:
+                # Stores from before per-message tokenizers: their counts are redone on load
+                self.connection.execute("ALTER TABLE messages ADD COLUMN tokenizer TEXT NOT NULL DEFAULT ''")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS messages_by_context ON messages (context_key, id)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS contexts ("
+                "context_key TEXT PRIMARY KEY, summary TEXT NOT NULL DEFAULT '', summary_tokens INTEGER NOT NULL DEFAULT 0, "
+                "evicted_tokens INTEGER NOT NULL DEFAULT 0, tokenizer TEXT NOT NULL DEFAULT '')"
+            )
+    
+    def load(self, key, count_tokens):
+        """Return the stored context for key (empty if unknown); counts made by another tokenizer are redone."""
+        context = ConversationContext(key, self)
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT role, content, tokens, tokenizer FROM messages WHERE context_key = ? ORDER BY id", (key,)
+            ).fetchall()
+            state = self.connection.execute(
+                "SELECT summary, summary_tokens, evicted_tokens, tokenizer FROM contexts WHERE context_key = ?", (key,)
+            ).fetchone()
+        for role, content, tokens, tokenizer in rows:
+            message = {"role": role, "content": json.loads(content)}
+            if tokenizer != self.tokenizer_name:
+                tokens = count_tokens(message["content"])
+            context.messages.append(message)
+            context.token_counts.append(tokens)
+            context.total_tokens += tokens
+        if state:
+            context.summary, context.summary_tokens, context.evicted_tokens = state[0], state[1], state[2]
+            if state[3] != self.tokenizer_name and context.summary:
+                context.summary_tokens = count_tokens(context.summary)
+        return context
+    
+    def append_message(self, key, message, tokens):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO messages (context_key, role, content, tokens, tokenizer) VALUES (?, ?, ?, ?, ?)",
+                (key, message["role"], json.dumps(message["content"]), tokens, self.tokenizer_name)
+            )
+    
+    def delete_oldest(self, key, count):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM messages WHERE id IN (SELECT id FROM messages WHERE context_key = ? ORDER BY id LIMIT ?)",
+                (key, count)
+            )
+    
+    def save_context(self, context):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO contexts (context_key, summary, summary_tokens, evicted_tokens, tokenizer) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (context_key) DO UPDATE SET summary = excluded.summary, summary_tokens = excluded.summary_tokens, "
+                "evicted_tokens = excluded.evicted_tokens, tokenizer = excluded.tokenizer",
+                (context.key, context.summary, context.summary_tokens, context.evicted_tokens, self.tokenizer_name)
+            )
+    
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+class ContextSummarizer:
+    """
+    Folds turns evicted from a conversation window into that context's memory block.
+
+    Evicted turns are queued per context and summarized on a background thread, so the
+    request path only pays for an append. The memory block is kept within
+    summary_token_budget tokens and replaces the evicted turns in the prompt.
+    """
+
+    def __init__(self, llm_handler, tokenizer, context_config=None):
+        context_config = context_config or {}
+        self.llm_handler = llm_handler
+        self.tokenizer = tokenizer
+        self.summary_token_budget = context_config.get("summary_token_budget", 300)
+        self.pending = {}  # context key -> (character, game, context, [turns])
+        self.lock = threading.Lock()
+        self.counters = {"summaries": 0, "failures": 0, "turns_summarized": 0}
+        self.summary_seconds = 0.0
+        self.savings = {}  # context key -> (evicted tokens, summary tokens)
+        self.resolve_context = None  # context key -> its current ConversationContext (set by CharacterManager)
+        self._start_worker()
+    
+    def _start_worker(self):
+        self.queue = Queue()
+        threading.Thread(target=self._worker, daemon=True).start()
+    
+    def submit(self, character, game, context, turns):
+        """Queue evicted turns of context for summarization."""
+        key = f"{character}:{game}"
+        with self.lock:
+            queued = key in self.pending
+            entry = self.pending.setdefault(key, (character, game, context, []))
+            entry[3].extend(turns)
+        if not queued:
+            self._schedule(key)
+    
+    def _schedule(self, key):
+        self.queue.put(key)
+    
+    def _take(self, key):
+        with self.lock:
+            return self.pending.pop(key, None)
+    
+    def _context(self, entry):
+        # The submitted context may have been dropped from memory and reloaded as a new object since
+        character, game, context, _ = entry
+        if self.resolve_context is None:
+            return context
+        return self.resolve_context(f"{character}:{game}") or context
+    
+    def _worker(self):
+        while True:
+            entry = self._take(self.queue.get())
+            if entry:
+                start = time.perf_counter()
+                try:
+                    self._apply(entry, self.llm_handler.chat(self._build_messages(entry)), time.perf_counter() - start)
+                except Exception as e:
+                    self._failed(entry, e)
+    
+    def _build_messages(self, entry):
+        character, game, _, turns = entry
+        context = self._context(entry)
+        max_words = max(20, int(self.summary_token_budget * 0.7))
+        transcript = "\n".join(
+            f"{'User' if turn['role'] == 'user' else character}: {turn['content']}"
+            for turn in turns if isinstance(turn["content"], str)
+        )
+        return [
+            {"role": "system", "content": PromptManager.get_summary_prompt(character, game, max_words)},
+            {"role": "user", "content": f"Current memory:\n{context.summary or '(none)'}\n\nNew conversation turns:\n{transcript}"}
+        ]
+    
+    def _apply(self, entry, summary, elapsed):
+        character, game, _, turns = entry
+        context = self._context(entry)
+        summary = summary.strip()
+        tokens = self.tokenizer.count(summary) + ConversationContext.MESSAGE_OVERHEAD_TOKENS
+        if tokens > self.summary_token_budget:
+            # Over budget: keep the leading words that fit
+            words = summary.split()
+            summary = " ".join(words[:max(1, len(words) * self.summary_token_budget // tokens)])
+            tokens = self.tokenizer.count(summary) + ConversationContext.MESSAGE_OVERHEAD_TOKENS
+        context.set_summary(summary, tokens)
+        with self.lock:
+            self.savings[f"{character}:{game}"] = (context.evicted_tokens, tokens)
+            self.counters["summaries"] += 1
+            self.counters["turns_summarized"] += len(turns)
+            self.summary_seconds += elapsed
+        log_event(f"Summarized {len(turns)} evicted turns for {character}/{game} into {tokens} memory tokens in {elapsed:.2f}s")
+    
+    def _failed(self, entry, error):
+        character, game, context, turns = entry
+        with self.lock:
+            self.counters["failures"] += 1
+        log_event(f"Warning: Could not summarize evicted turns for {character}/{game}: {error}")
+    
+    def stats(self):
+        with self.lock:
+            savings = list(self.savings.values())
+            counters = dict(self.counters)
+            summary_seconds = self.summary_seconds
+        evicted_tokens = sum(evicted for evicted, _ in savings)
+        summary_tokens = sum(summary for _, summary in savings)
+        return {
+            **counters,
+            "evicted_tokens": evicted_tokens,
+            "summary_tokens": summary_tokens,
+            "prompt_tokens_saved": evicted_tokens - summary_tokens,
+            "summary_seconds": round(summary_seconds, 3)
+        }
+
+class AsyncContextSummarizer(ContextSummarizer):
+    """ContextSummarizer for the asyncio core: summaries run as event loop tasks on the async LLM client."""
+
+    def _start_worker(self):
+        self.tasks = set()
+        self.summary_lock = asyncio.Lock()  # one summary at a time, so updates never race
+    
+    def _schedule(self, key):
+        task = asyncio.get_running_loop().create_task(self._summarize(key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+    
+    async def _summarize(self, key):
+        async with self.summary_lock:
+            entry = self._take(key)
+            if entry:
+                start = time.perf_counter()
+                try:
+                    self._apply(entry, await self.llm_handler.chat(self._build_messages(entry)), time.perf_counter() - start)
+                except Exception as e:
+                    self._failed(entry, e)
+
+class ContextLogWriter:
+    """
+    Background writer for the per-character context logs.
+
+    The request path only enqueues (dropping entries if the bounded queue is full); a single
+    thread formats entries, writes them in batches through a small set of reused file handles
+    and rotates files past max_bytes. detail is "none", "events" or "full", where "full" also
+    records every context sent to the LLM.
+    """
+
+    DETAIL_LEVELS = ("none", "events", "full")
+
+    def __init__(self, detail="events", max_bytes=1048576, backups=2, queue_size=1000, max_open_files=8):
+        self.detail = detail if detail in self.DETAIL_LEVELS else "events"
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_open_files = max_open_files
+        self.handles = OrderedDict()  # filename -> open file, least recently used first
+        self.counter_lock = threading.Lock()  # dropped is counted on every caller's thread
+        self.dropped = 0
+        self.written = 0
+        self.queue = Queue(maxsize=queue_size)
+        self.thread = None
+        if self.detail != "none":
+            self.thread = threading.Thread(target=self._writer, daemon=True)
+            self.thread.start()
+    
+    @property
+    def full(self):
+        return self.detail == "full"
+    
+    def write(self, filename, action, content=None):
+        """Queue an event line (content is formatted on the writer thread; a list is written as a full context)."""
+        if self.thread is None:
+            return
+        try:
+            self.queue.put_nowait((filename, time.time(), action, content))
+        except Full:
+            with self.counter_lock:
+                self.dropped += 1
+                first_drop = self.dropped == 1
+            if first_drop:
+                log_event("Warning: Context log queue is full; dropping entries")
+    
+    def close(self):
+        """Write out everything queued so far and close the files."""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join(5)
+    
+    def stats(self):
+        with self.counter_lock:
+            return {"written": self.written, "dropped": self.dropped, "queued": self.queue.qsize()}
+    
+    def _writer(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < 256:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            stop = None in batch
+            touched = set()
+            for entry in batch:
+                if entry is None:
+                    continue
+                filename = entry[0]
+                try:
+                    handle = self._handle(filename)
+                    if handle.tell() > self.max_bytes:
+                        self._rotate(filename)
+                        handle = self._handle(filename)
+                    handle.write(self._format(*entry[1:]))
+                    touched.add(filename)
+                    with self.counter_lock:
+                        self.written += 1
+                except Exception as e:
+                    log_event(f"Warning: Could not write to context log {filename}: {e}")
+            for filename in touched:
+                try:
+                    self.handles[filename].flush()
+                except Exception as e:
+                    log_event(f"Warning: Could not flush context log {filename}: {e}")
+            if stop:
+                for handle in self.handles.values():
+                    handle.close()
+                self.handles.clear()
+                return
+    
+    @staticmethod
+    def _format(timestamp, action, content):
+        stamp = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        if isinstance(content, list):
+            lines = [f"{stamp} [{action}] {len(content)} messages", "=== FULL CONTEXT SENT TO LLM ==="]
+            lines += [f"Message {i+1} [{msg['role']}]: {msg['content']}" for i, msg in enumerate(content)]
+            lines.append("=== END CONTEXT ===\n\n")
+            return "\n".join(lines)
+        return f"{stamp} [{action}] {content or ''}\n"
+    
+    def _handle(self, filename):
+        handle = self.handles.get(filename)
+        if handle is not None:
+            self.handles.move_to_end(filename)
+            return handle
+        handle = open(filename, "a", encoding="utf-8")
+        self.handles[filename] = handle
+        while len(self.handles) > self.max_open_files:
+            self.handles.popitem(last=False)[1].close()
+        return handle
+    
+    def _rotate(self, filename):
+        self.handles.pop(filename).close()
+        for index in range(self.backups, 0, -1):
+            source = filename if index == 1 else f"{filename}.{index - 1}"
+            if os.path.exists(source):
+                os.replace(source, f"{filename}.{index}")
+        if not self.backups:
+            os.remove(filename)
 
 class CharacterManager:
-    def __init__(self):
-        self.chat_histories = {}
+    def __init__(self, context_config=None, tokenizer=None, summarizer=None):
+        context_config = context_config or {}
+        self.chat_histories = OrderedDict()  # "character:game" -> ConversationContext, least recently used first
         self.active_character = None
         self.active_game = None
-        self.current_history = []
-        self.max_history = 10
-        self.max_tokens = 12000
+        self.current_context = ConversationContext()
+        self.tokenizer = tokenizer or ApproximateTokenizer()
+        self.max_resident_contexts = context_config.get("max_resident_contexts", 8)
+        self.max_memories = context_config.get("max_memories", 64)
+        self.memories = OrderedDict()  # without a store: "character:game" -> summary-only context of a dropped conversation
+        self.context_log_filename = None
+        self.context_log = ContextLogWriter(
+            context_config.get("log_detail", "events"),
+            max_bytes=context_config.get("log_max_bytes", 1048576),
+            backups=context_config.get("log_backups", 2)
+        )
+        self.store = None
+        if context_config.get("store_file"):
+            try:
+                self.store = ConversationStore(context_config["store_file"], self.tokenizer.name)
+            except sqlite3.Error as e:
+                log_event(f"Warning: Could not open conversation store {context_config['store_file']}: {e}")
+        self.prompt_token_budget = context_config.get("prompt_token_budget", 4000)
+        self.max_messages = context_config.get("max_messages")
+        self.system_prompt_tokens = 0  # of the last system prompt counted; history gets the rest of the budget
+        self._system_prompt_counts = OrderedDict()
+        self.summarizer = summarizer
+        if summarizer:
+            summarizer.resolve_context = self._summary_context
+        self.stable_prefix = context_config.get("stable_prefix", False)
+        self.compaction_target = context_config.get("compaction_target", 0.6)
+    
+    @property
+    def current_history(self):
+        return self.current_context.messages
     
     def _get_context_log_filename(self, character, game):
         """Generate filename for context logging"""
@@ -457,15 +3217,18 @@ class CharacterManager:
         return f"{safe_game}_{safe_char}_context.log"
     
     def _log_context(self, action, content=None):
-        """Log context changes to character-specific files"""
-        if self.active_character and self.active_game:
-            filename = self._get_context_log_filename(self.active_character, self.active_game)
-            try:
-                with open(filename, "a", encoding="utf-8") as f:
-                    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    f.write(f"{timestamp} [{action}] {content or ''}\n")
-            except Exception as e:
-                log_event(f"Warning: Could not write to context log {filename}: {e}")
+        """Queue a context change for the character-specific log file"""
+        if self.context_log_filename:
+            self.context_log.write(self.context_log_filename, action, content)
+    
+    def close(self):
+        self.context_log.close()
+        log_event(f"Context log stats: {self.context_log.stats()}")
+        if self.store:
+            self.store.close()
+    
+    def stats(self):
+        return {"resident_contexts": len(self.chat_histories), "memories": len(self.memories), "context_log": self.context_log.stats()}
     
     def switch_context(self, character, game):
         context_key = f"{character}:{game}"
@@ -473,152 +3236,1200 @@ class CharacterManager:
         if self.active_character != character or self.active_game != game:
             log_event(f"Context switched from {self.active_character}/{self.active_game} to {character}/{game}")
             
-            if self.active_character and self.active_game:
-                old_key = f"{self.active_character}:{self.active_game}"
-                self.chat_histories[old_key] = self.current_history.copy()
-            
-            self.current_history = self.chat_histories.get(context_key, [])
+            self.current_context = self._resident_context(context_key)
             self.active_character = character
             self.active_game = game
+            self.context_log_filename = self._get_context_log_filename(character, game)
             
             # Log context switch
             self._log_context("CONTEXT_SWITCH", f"Switched to {character} from {game}")
         else:
             log_event(f"Continuing conversation with {character} from {game}")
     
+    def _resident_context(self, key):
+        """Return the context for key, loading it from the store if it is not in memory."""
+        context = self.chat_histories.get(key)
+        if context is not None:
+            self.chat_histories.move_to_end(key)
+            return context
+        if self.store:
+            context = self.store.load(key, self.count_tokens)
+            if context.messages:
+                log_event(f"Loaded {len(context.messages)} stored messages for {key}")
+        else:
+            context = self.memories.pop(key, None) or ConversationContext(key)
+        self.chat_histories[key] = context
+        while len(self.chat_histories) > self.max_resident_contexts:
+            self._drop_context(*self.chat_histories.popitem(last=False))
+        return context
+    
+    def _drop_context(self, key, context):
+        """Without a store, fold a dropped conversation's turns into its summary and keep only that."""
+        if self.store:
+            return
+        if self.summarizer:
+            if context.messages:
+                character, game = key.split(":", 1)
+                self.summarizer.submit(character, game, context, context.evict_oldest(len(context.messages)))
+            self.memories[key] = context
+            while len(self.memories) > self.max_memories:
+                self.memories.popitem(last=False)
+    
+    def _summary_context(self, key):
+        """The context for key in memory, or a copy loaded from the store if it has been dropped from memory."""
+        context = self.chat_histories.get(key)
+        if context is None:
+            context = self.memories.get(key)
+        if context is None and self.store:
+            context = self.store.load(key, self.count_tokens)
+        return context
+    
     def add_message(self, role, content):
-        self.current_history.append({"role": role, "content": content})
+        self.current_context.append({"role": role, "content": content}, self.count_tokens(content))
         self._manage_history_size()
         
-        # Log message to context file
-        self._log_context(f"MESSAGE_{role.upper()}", content)
+        # Log message to context file
+        self._log_context(f"MESSAGE_{role.upper()}", content)
+    
+    def get_context_messages(self, system_prompt):
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(self._memory_messages())
+        messages.extend(self._select_history(self.current_context.messages, self.current_context.token_counts, system_prompt))
+        
+        # Log the context being sent to LLM (in full only at the "full" detail level; formatted on the writer thread)
+        if self.context_log.full:
+            self._log_context("LLM_CONTEXT", list(messages))
+        else:
+            self._log_context("LLM_CONTEXT", f"Sending {len(messages)} messages to LLM")
+        
+        return messages
+    
+    def preview_context_messages(self, system_prompt, pending_message):
+        """Return the context messages as they would look after pending_message is added, without side effects."""
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(self._memory_messages())
+        messages.extend(self._select_history(
+            self.current_context.messages + [pending_message],
+            self.current_context.token_counts + [self.count_tokens(pending_message["content"])],
+            system_prompt
+        ))
+        return messages
+    
+    def count_tokens(self, content):
+        if not isinstance(content, str):
+            content = json.dumps(content)
+        return self.tokenizer.count(content) + ConversationContext.MESSAGE_OVERHEAD_TOKENS
+    
+    def _count_system_prompt(self, system_prompt):
+        # Persona prompts repeat on every turn; memoize their counts
+        tokens = self._system_prompt_counts.get(system_prompt)
+        if tokens is None:
+            tokens = self.count_tokens(system_prompt)
+            self._system_prompt_counts[system_prompt] = tokens
+            if len(self._system_prompt_counts) > 32:
+                self._system_prompt_counts.popitem(last=False)
+        self.system_prompt_tokens = tokens
+        return tokens
+    
+    def _memory_messages(self):
+        if not self.current_context.summary:
+            return []
+        return [{"role": "system", "content": PromptManager.get_memory_message(self.current_context.summary)}]
+    
+    def active_system_prompt(self):
+        """Return the text system prompt for the active persona (generic assistant if none)."""
+        return PromptManager.get_character_system_prompt(
+            self.active_character or "Character", self.active_game or "Game", is_vision=False
+        )
+    
+    def _history_budget(self):
+        # Budget against the active persona's prompt, not the last one sent, which may belong to another context
+        system_tokens = self._count_system_prompt(self.active_system_prompt())
+        return self.prompt_token_budget - system_tokens - self.current_context.summary_tokens
+    
+    def _select_history(self, history, token_counts, system_prompt):
+        """Newest messages that fit in the budget left after system_prompt and memory (at least the latest one)."""
+        budget = self.prompt_token_budget - self._count_system_prompt(system_prompt) - self.current_context.summary_tokens
+        limit = len(history) if self.max_messages is None else min(len(history), self.max_messages)
+        start, used = len(history), 0
+        while start > 0 and len(history) - start < limit:
+            if used + token_counts[start - 1] > budget and start < len(history):
+                break
+            start -= 1
+            used += token_counts[start]
+        return history[start:]
+    
+    def _manage_history_size(self):
+        context = self.current_context
+        budget = self._history_budget()
+        target = budget
+        if self.stable_prefix and context.total_tokens > budget:
+            # Compact well below the budget, so history stays append-only (and its prefix
+            # cacheable by the provider) for several turns before the next eviction
+            target = int(budget * self.compaction_target)
+        evict = 0
+        remaining = context.total_tokens
+        while evict < len(context.messages) - 1 and (
+            remaining > target or (self.max_messages is not None and len(context.messages) - evict > self.max_messages)
+        ):
+            remaining -= context.token_counts[evict]
+            evict += 1
+        # Keep the window starting on a user turn
+        while evict < len(context.messages) - 1 and evict and context.messages[evict]["role"] != "user":
+            remaining -= context.token_counts[evict]
+            evict += 1
+        if evict:
+            evicted = context.evict_oldest(evict)
+            if self.summarizer and self.active_character and self.active_game:
+                self.summarizer.submit(self.active_character, self.active_game, context, evicted)
+            self._log_context("HISTORY_TRIMMED", f"Evicted {evict} oldest messages to stay within {budget} history tokens")
+        log_event("Context tokens: %s history + %s system (%s)", context.total_tokens, self.system_prompt_tokens, self.tokenizer.name, level=logging.DEBUG, category="usage")
+
+class AudioCache:
+    """
+    Content-addressed store of rendered utterances.
+
+    Each utterance is a WAV file named after the SHA-1 of its voice and text, so a line is
+    synthesized once per voice however often it is spoken. Least recently played files are
+    deleted once the directory grows past max_bytes; file modification times carry the
+    recency across restarts.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> bytes, least recently used first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".tmp"):
+                # Left behind by a render that was cut short
+                self._remove(path)
+            elif name.endswith(".wav"):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+    
+    @staticmethod
+    def key(text, voice_id):
+        return hashlib.sha1(json.dumps([voice_id, text], ensure_ascii=False).encode("utf-8")).hexdigest()
+    
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.wav")
+    
+    def temp_path(self, key):
+        """Where a render writes before put() moves the file into place."""
+        return os.path.join(self.directory, f"{key}.{threading.get_ident()}.tmp")
+    
+    def get(self, key):
+        """Path of the rendered audio for key, or None if it has not been rendered."""
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self.lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+            return None
+        return path
+    
+    def put(self, key, temp_path):
+        """Move a finished render into the cache and return its path."""
+        path = self.path(key)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+        evicted = []
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            # The new entry itself is kept even if it alone exceeds the budget
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                old_key, old_size = self.entries.popitem(last=False)
+                self.total_bytes -= old_size
+                self.evictions += 1
+                evicted.append(self.path(old_key))
+        for old_path in evicted:
+            self._remove(old_path)
+        return path
+    
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions
+            }
+    
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+class SpeechEngine:
+    """
+    Speaks replies on a background thread.
+
+    Every utterance carries the ID of the reply it belongs to (by default the current talk
+    request). With the "supersede" queue policy, queuing the first utterance of a newer
+    reply cuts off a stale utterance that is still playing, and stale utterances still
+    waiting are dropped, so a new question is not answered only after all the old answers.
+    Voices are resolved once per persona and sex.
+
+    With a render cache, utterances are rendered to WAV files by a small worker pool as soon
+    as they are queued, so the next sentence is synthesized while the current one plays and
+    repeated lines are played straight from the AudioCache. Anything that could not be
+    rendered in time is spoken live.
+    """
+
+    PLAYBACK_MARGIN = 0.05  # seconds past the computed length before the next file may start
+    RENDER_POLL_SECONDS = 0.05  # how often a wait for a render checks whether its reply was superseded
+
+    def __init__(self, speech_config=None):
+        self.speech_config = speech_config or {}
+        self.backend = self.speech_config.get("backend", "pyttsx3")
+        self.supersede = self.speech_config.get("queue_policy", "supersede") == "supersede"
+        self.render_timeout = self.speech_config.get("render_timeout_seconds", 2.0)
+        self.voice_overrides = self.speech_config.get("voices", {})
+        self.speech_queue = Queue()
+        self.lock = threading.Lock()
+        self.latest_reply = None
+        self.current_reply = None
+        self.interrupt_event = threading.Event()
+        self.engine = None
+        self.voices = {}  # (persona, is_female) -> voice id, None for the engine default
+        self.counters = {"spoken": 0, "dropped": 0, "interrupted": 0}
+        self.audio_cache = None
+        self.render_pool = None
+        self.render_local = threading.local()
+        self._start_renderer()
+        self._start_worker()
+    
+    def _start_renderer(self):
+        cache_dir = self.speech_config.get("render_cache_dir")
+        if not cache_dir:
+            return
+        if self.backend != "null" and winsound is None:
+            log_event("Pre-rendered speech needs winsound for playback; speaking live", level=logging.DEBUG)
+            return
+        try:
+            self.audio_cache = AudioCache(cache_dir, int(self.speech_config.get("render_cache_mb", 64) * 1024 * 1024))
+        except OSError as e:
+            log_event(f"Warning: Speech render cache unavailable, speaking live: {e}")
+            return
+        self.render_pool = ThreadPoolExecutor(
+            max_workers=self.speech_config.get("render_workers", 2), thread_name_prefix="speech-render"
+        )
+        self.counters.update(rendered=0, render_hits=0, render_timeouts=0)
+    
+    def _start_worker(self):
+        self.worker_thread = threading.Thread(target=self._speech_worker, daemon=True)
+        self.worker_thread.start()
+    
+    def speak(self, text, is_female=False, persona=None, reply_id=None):
+        reply_id = reply_id or tracer.request_id()
+        with self.lock:
+            if self.supersede and reply_id is not None and reply_id != self.latest_reply:
+                self.latest_reply = reply_id
+                if self.current_reply is not None and self.current_reply != reply_id:
+                    self.interrupt_event.set()
+        rendering = None
+        if self.render_pool:
+            rendering = self.render_pool.submit(self._render, text, is_female, persona, reply_id)
+        self.speech_queue.put((text, is_female, persona, reply_id, time.perf_counter(), rendering))
+    
+    def prerender(self, lines=None):
+        """Render fixed lines (the "prerender" setting by default) in the background; returns the futures."""
+        if not self.render_pool:
+            return []
+        lines = self.speech_config.get("prerender", []) if lines is None else lines
+        voices = [(None, False), (None, True)] + [(persona, False) for persona in self.voice_overrides]
+        return [self.render_pool.submit(self._render, line, is_female, persona, None)
+                for line in lines for persona, is_female in voices]
+    
+    def interrupt(self):
+        """Cut off the utterance being spoken; queued utterances still play."""
+        self.interrupt_event.set()
+    
+    def stop(self):
+        """Cut off the utterance being spoken and drop everything queued."""
+        dropped = 0
+        while True:
+            try:
+                item = self.speech_queue.get_nowait()
+            except Empty:
+                break
+            if item[-1] is not None:
+                item[-1].cancel()
+            dropped += 1
+            self.speech_queue.task_done()
+        with self.lock:
+            self.counters["dropped"] += dropped
+        self.interrupt()
+    
+    def close(self):
+        if self.render_pool:
+            self.render_pool.shutdown(wait=False, cancel_futures=True)
+    
+    def stats(self):
+        with self.lock:
+            stats = {"queued": self.speech_queue.qsize(), **self.counters}
+        if self.audio_cache:
+            stats["audio_cache"] = self.audio_cache.stats()
+        return stats
+    
+    def _stale(self, reply_id):
+        with self.lock:
+            return self.supersede and reply_id is not None and reply_id != self.latest_reply
+    
+    def _count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+    
+    def _speech_worker(self):
+        voices = []
+        if self.backend != "null":
+            try:
+                self.engine = pyttsx3.init()
+                voices = self.engine.getProperty('voices')
+                # Word boundaries are where an interrupt can stop the engine
+                self.engine.connect('started-word', self._on_word)
+            except Exception as e:
+                log_event(f"Warning: Speech engine unavailable, replies will not be spoken: {e}")
+                self.engine = None
+        current_voice = None
+        
+        while True:
+            text, is_female, persona, reply_id, queued_at, rendering = self.speech_queue.get()
+            try:
+                # A reply can be superseded while its render is still running
+                path = None if self._stale(reply_id) else self._rendered(rendering, reply_id)
+                if self._stale(reply_id):
+                    if rendering is not None:
+                        rendering.cancel()
+                    self._count("dropped")
+                    log_event(f"Dropped superseded utterance: {text}", level=logging.DEBUG)
+                    continue
+                tracer.record("speech_queue_wait", time.perf_counter() - queued_at)
+                with self.lock:
+                    self.current_reply = reply_id
+                    self.interrupt_event.clear()
+                start = time.perf_counter()
+                if path and self._play(path, text):
+                    pass  # played from the audio cache
+                elif self.engine is None:
+                    self._null_say(text)
+                else:
+                    voice_id = self._voice_for(voices, is_female, persona)
+                    if voice_id and voice_id != current_voice:
+                        self.engine.setProperty('voice', voice_id)
+                        current_voice = voice_id
+                    log_event(f"Speaking: {text}")
+                    self.engine.say(text)
+                    self.engine.runAndWait()
+                self._count("interrupted" if self.interrupt_event.is_set() else "spoken")
+                tracer.record("speech", time.perf_counter() - start)
+            except Exception as e:
+                log_event(f"Speech error: {e}")
+            finally:
+                with self.lock:
+                    self.current_reply = None
+                self.speech_queue.task_done()
+    
+    def _on_word(self, name, location, length):
+        if self.interrupt_event.is_set():
+            self.engine.stop()
+    
+    def _null_say(self, text):
+        # No audio; "null_words_per_minute" simulates playback time (interruptible)
+        words_per_minute = self.speech_config.get("null_words_per_minute", 0)
+        log_event(f"Speaking (no audio): {text}", level=logging.DEBUG)
+        if words_per_minute:
+            self.interrupt_event.wait(len(text.split()) * 60 / words_per_minute)
+    
+    def _rendered(self, rendering, reply_id):
+        """Wait for an utterance's render; None if there is none, it failed or timed out, or the reply was superseded."""
+        if rendering is None:
+            return None
+        deadline = time.perf_counter() + self.render_timeout
+        try:
+            while True:
+                try:
+                    return rendering.result(timeout=max(0, min(self.RENDER_POLL_SECONDS, deadline - time.perf_counter())))
+                except FutureTimeoutError:
+                    if self._stale(reply_id):
+                        return None
+                    if time.perf_counter() >= deadline:
+                        # The render keeps going and still fills the cache for next time
+                        self._count("render_timeouts")
+                        log_event(f"Speech render took over {self.render_timeout}s, speaking live", level=logging.DEBUG)
+                        return None
+        except Exception as e:
+            log_event(f"Warning: Could not pre-render speech, speaking live: {e}")
+            return None
+    
+    def _render(self, text, is_female, persona, reply_id):
+        """Render an utterance into the audio cache (render pool); returns the WAV path."""
+        if self._stale(reply_id):
+            return None
+        engine = self._render_engine()
+        voice_id = self._voice_for(self.render_local.voices, is_female, persona)
+        key = AudioCache.key(text, voice_id)
+        path = self.audio_cache.get(key)
+        if path:
+            self._count("render_hits")
+            return path
+        temp_path = self.audio_cache.temp_path(key)
+        start = time.perf_counter()
+        try:
+            self._synthesize(engine, text, voice_id, temp_path)
+            path = self.audio_cache.put(key, temp_path)
+        finally:
+            AudioCache._remove(temp_path)
+        self._count("rendered")
+        tracer.record("speech_render", time.perf_counter() - start)
+        return path
+    
+    def _render_engine(self):
+        """This render thread's own engine (None for the null backend)."""
+        if not hasattr(self.render_local, "engine"):
+            engine = None
+            voices = []
+            if self.backend != "null":
+                # Not pyttsx3.init(), which hands every thread the same engine instance
+                engine = pyttsx3.Engine()
+                voices = engine.getProperty('voices')
+            self.render_local.voices = voices
+            self.render_local.engine = engine
+        return self.render_local.engine
+    
+    def _synthesize(self, engine, text, voice_id, path):
+        if engine is None:
+            # Silence as long as the null backend's simulated playback
+            words_per_minute = self.speech_config.get("null_words_per_minute", 0)
+            seconds = len(text.split()) * 60 / words_per_minute if words_per_minute else 0
+            with wave.open(path, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(1)
+                wav.setframerate(8000)
+                wav.writeframes(b"\x80" * int(seconds * 8000))
+            return
+        if voice_id:
+            engine.setProperty('voice', voice_id)
+        engine.save_to_file(text, path)
+        engine.runAndWait()
+    
+    def _play(self, path, text):
+        """Play a rendered utterance, interruptibly; False if it could not be played."""
+        try:
+            seconds = self._wav_seconds(path)
+            if self.backend == "null":
+                log_event(f"Speaking (pre-rendered, no audio): {text}", level=logging.DEBUG)
+                self.interrupt_event.wait(seconds)
+                return True
+            log_event(f"Speaking (pre-rendered): {text}")
+            winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC | winsound.SND_NODEFAULT)
+        except (OSError, RuntimeError, ValueError, struct.error) as e:
+            log_event(f"Warning: Could not play pre-rendered speech, speaking live: {e}")
+            return False
+        if self.interrupt_event.wait(seconds + self.PLAYBACK_MARGIN):
+            winsound.PlaySound(None, winsound.SND_PURGE)
+        return True
+    
+    @staticmethod
+    def _wav_seconds(path):
+        """Length of a WAV file from its fmt byte rate and data chunk size."""
+        with open(path, "rb") as f:
+            riff, _, form = struct.unpack("<4sI4s", f.read(12))
+            if riff != b"RIFF" or form != b"WAVE":
+                raise ValueError(f"Not a WAV file: {path}")
+            file_size = os.fstat(f.fileno()).st_size
+            byte_rate = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"WAV file has no audio data: {path}")
+                chunk_id, size = struct.unpack("<4sI", header)
+                if chunk_id == b"data" and byte_rate:
+                    # Streamed WAVs may leave the size unset; the file size bounds it
+                    return min(size, file_size - f.tell()) / byte_rate
+                if chunk_id == b"fmt ":
+                    byte_rate = struct.unpack("<HHII", f.read(12))[3]
+                    size -= 12
+                f.seek(size + (size & 1), 1)
+    
+    def _voice_for(self, voices, is_female, persona):
+        key = (persona, is_female)
+        if key in self.voices:
+            return self.voices[key]
+        
+        selected_voice = None
+        override = self.voice_overrides.get(persona, "").lower() if persona else ""
+        if override:
+            selected_voice = next((v for v in voices if override in v.name.lower() or override in v.id.lower()), None)
+        if selected_voice is None:
+            for voice in voices:
+                vname = voice.name.lower()
+                vid = voice.id.lower()
+                
+                if is_female and ("female" in vname or "zira" in vid or "eva" in vid):
+                    selected_voice = voice
+                    break
+                elif not is_female and ("male" in vname or "david" in vid or "mark" in vid):
+                    selected_voice = voice
+                    break
+        
+        self.voices[key] = selected_voice.id if selected_voice else None
+        if selected_voice:
+            log_event(f"Using voice {selected_voice.name} for {persona or 'the narrator'}")
+        return self.voices[key]
+
+class MessageFramer:
+    """
+    Incrementally turn raw pipe bytes into JSON messages.
+
+    Bytes are decoded with an incremental UTF-8 decoder, so multi-byte characters split
+    across reads survive intact. Object boundaries are found by a scanner that only looks
+    at newly received text, and the "<<END>>" frame marker written by write_response()
+    (and any other text between objects) is skipped.
+    """
+
+    END_MARKER = "<<END>>"
+    _STRUCTURE = re.compile(r'[{}"]')
+    _STRING_BODY = re.compile(r'(?:[^"\\]+|\\.)*', re.DOTALL)
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.text = ""
+        self.scan_pos = 0
+        self.depth = 0
+        self.in_string = False
     
-    def get_context_messages(self, system_prompt):
-        messages = [{"role": "system", "content": system_prompt}]
-        messages.extend(self.current_history[-self.max_history:])
-        
-        # Log the full context being sent to LLM
-        self._log_context("LLM_CONTEXT", f"Sending {len(messages)} messages to LLM")
-        if self.active_character and self.active_game:
-            filename = self._get_context_log_filename(self.active_character, self.active_game)
+    def feed(self, data):
+        """Add received bytes (any bytes-like object) and return the messages they complete."""
+        self.text += self.decoder.decode(data)
+        messages = []
+        while True:
+            end = self._scan()
+            if end < 0:
+                break
+            frame, self.text = self.text[:end], self.text[end:]
+            self.scan_pos = 0
             try:
-                with open(filename, "a", encoding="utf-8") as f:
-                    f.write(f"=== FULL CONTEXT SENT TO LLM ===\n")
-                    for i, msg in enumerate(messages):
-                        f.write(f"Message {i+1} [{msg['role']}]: {msg['content']}\n")
-                    f.write(f"=== END CONTEXT ===\n\n")
-            except Exception as e:
-                log_event(f"Warning: Could not write full context to {filename}: {e}")
-        
+                messages.append(json.loads(frame))
+            except json.JSONDecodeError as e:
+                log_event(f"Dropping malformed message: {e}")
+        if self.depth == 0:
+            # Everything scanned so far lies between objects (whitespace, frame markers)
+            self.text = ""
+            self.scan_pos = 0
         return messages
     
-    def _manage_history_size(self):
-        token_estimate = sum(len(msg['content']) for msg in self.current_history) // 4
-        log_event(f"Estimated context tokens: {token_estimate}")
-        
-        if token_estimate > self.max_tokens:
-            self.current_history = self.current_history[len(self.current_history)//2:]
-            log_event("Context limit exceeded. Chat history halved.")
-            self._log_context("HISTORY_TRIMMED", f"Chat history halved due to token limit")
+    def _scan(self):
+        """Advance over new text; return the end index of a completed object, or -1."""
+        text = self.text
+        pos = self.scan_pos
+        while True:
+            if self.in_string:
+                pos = self._STRING_BODY.match(text, pos).end()
+                if pos >= len(text) or text[pos] != '"':
+                    # String (or an escape sequence in it) continues in the next read
+                    break
+                self.in_string = False
+                pos += 1
+                continue
+            
+            match = self._STRUCTURE.search(text, pos)
+            if not match:
+                pos = len(text)
+                break
+            token = match.group()
+            pos = match.end()
+            if token == '"':
+                self.in_string = self.depth > 0
+            elif token == "{":
+                if self.depth == 0:
+                    # Drop whatever preceded the object so the buffer starts at it
+                    text = self.text = text[match.start():]
+                    pos = 1
+                self.depth += 1
+            elif self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    return pos
+        self.scan_pos = pos
+        return -1
+
+class Kernel32PipeBackend:
+    """G-Assist pipe transport over the process stdin/stdout handles via kernel32."""
 
-class SpeechEngine:
     def __init__(self):
-        self.speech_queue = Queue()
-        self._start_worker()
+        if windll is None:
+            raise OSError("The kernel32 transport is only available on Windows.")
+        self.read_handle = windll.kernel32.GetStdHandle(-10)
+        self.write_handle = windll.kernel32.GetStdHandle(-11)
     
-    def _start_worker(self):
-        self.worker_thread = threading.Thread(target=self._speech_worker, daemon=True)
-        self.worker_thread.start()
-    
-    def speak(self, text, is_female=False):
-        self.speech_queue.put((text, is_female))
+    def readinto(self, buffer):
+        c_buffer = (ctypes.c_char * len(buffer)).from_buffer(buffer)
+        message_bytes = wintypes.DWORD()
+        success = windll.kernel32.ReadFile(self.read_handle, c_buffer, len(buffer), byref(message_bytes), None)
+        if not success:
+            return 0
+        return message_bytes.value
     
-    def _speech_worker(self):
-        engine = pyttsx3.init()
-        voices = engine.getProperty('voices')
-        
-        while True:
-            text, is_female = self.speech_queue.get()
-            try:
-                selected_voice = None
-                for voice in voices:
-                    vname = voice.name.lower()
-                    vid = voice.id.lower()
-                    
-                    if is_female and ("female" in vname or "zira" in vid or "eva" in vid):
-                        selected_voice = voice
-                        break
-                    elif not is_female and ("male" in vname or "david" in vid or "mark" in vid):
-                        selected_voice = voice
-                        break
-                
-                if selected_voice:
-                    engine.setProperty('voice', selected_voice.id)
-                    log_event(f"Using voice: {selected_voice.name}")
-                
-                log_event(f"Speaking: {text}")
-                engine.say(text)
-                engine.runAndWait()
-            except Exception as e:
-                log_event(f"Speech error: {e}")
-            self.speech_queue.task_done()
-
-class PipeHandler:
-    @staticmethod
-    def read_command():
+    def write(self, data):
+        # One ctypes view over the response (a copy only if data is read-only); partial writes resume at an offset
         try:
-            pipe = windll.kernel32.GetStdHandle(-10)
-            chunks = []
+            c_buffer = (ctypes.c_char * len(data)).from_buffer(data)
+        except TypeError:
+            c_buffer = (ctypes.c_char * len(data)).from_buffer_copy(data)
+        offset = 0
+        while offset < len(data):
+            bytes_written = wintypes.DWORD()
+            if not windll.kernel32.WriteFile(self.write_handle, byref(c_buffer, offset), len(data) - offset, byref(bytes_written), None):
+                raise OSError("WriteFile failed.")
+            offset += bytes_written.value
 
-            while True:
-                message_bytes = wintypes.DWORD()
-                buffer = bytes(4096)
-                success = windll.kernel32.ReadFile(pipe, buffer, 4096, byref(message_bytes), None)
+class StdioPipeBackend:
+    """Portable transport over the binary stdin/stdout streams."""
 
-                if not success:
-                    return None
+    def __init__(self, stdin=None, stdout=None):
+        self.stdin = stdin or sys.stdin.buffer.raw
+        self.stdout = stdout or sys.stdout.buffer
+    
+    def readinto(self, buffer):
+        return self.stdin.readinto(buffer) or 0
+    
+    def write(self, data):
+        self.stdout.write(data)
+        self.stdout.flush()
 
-                chunk = buffer.decode('utf-8', errors='ignore')[:message_bytes.value]
-                chunks.append(chunk)
+class UnixSocketPipeBackend:
+    """Transport over a Unix domain socket; waits for one client connection. Useful for load testing on Linux."""
 
-                if message_bytes.value < 4096:
-                    break
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(socket_path)
+        self.server.listen(1)
+        log_event(f"Waiting for a client on {socket_path}")
+        self.connection, _ = self.server.accept()
+    
+    def readinto(self, buffer):
+        return self.connection.recv_into(buffer)
+    
+    def write(self, data):
+        self.connection.sendall(data)
+    
+    def close(self):
+        self.connection.close()
+        self.server.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+def create_pipe_backend(transport_config):
+    """Create the transport backend selected in the transport config."""
+    backend = transport_config.get("backend", "auto")
+    if backend == "auto":
+        backend = "kernel32" if windll is not None else "stdio"
+    if backend == "kernel32":
+        return Kernel32PipeBackend()
+    if backend == "stdio":
+        return StdioPipeBackend()
+    if backend == "unix":
+        return UnixSocketPipeBackend(transport_config.get("socket_path", "loremaster.sock"))
+    raise ValueError(f"Unknown transport backend: {backend}")
 
-            raw_data = ''.join(chunks).strip()
-            log_event(f'Read raw input: {repr(raw_data)}')
+class PipeHandler:
+    """
+    Reads framed JSON commands from and writes "<<END>>"-framed responses to the host.
+
+    Reads go into one reusable buffer; a memoryview of the filled part is handed to the
+    MessageFramer without copying.
+    """
 
-            json_match = re.search(r'{.*}', raw_data, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(0))
+    def __init__(self, backend=None, buffer_size=65536):
+        self.backend = backend or create_pipe_backend({})
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.framer = MessageFramer()
+        self.pending = []
+        self.closed = False
+    
+    @classmethod
+    def from_config(cls, transport_config):
+        return cls(create_pipe_backend(transport_config), transport_config.get("buffer_size", 65536))
+    
+    def read_command(self):
+        """Return the next command, or None if nothing was read; closed is set once the pipe is unusable."""
+        try:
+            # Time from the first bytes of a command to the decoded command, not the idle wait before it
+            start = time.perf_counter() if self.pending or self.framer.text else None
+            while not self.pending:
+                bytes_read = self.backend.readinto(self.buffer)
+                if not bytes_read:
+                    log_event("Pipe closed or read failed.")
+                    self.closed = True
+                    return None
+                start = start or time.perf_counter()
+                self.pending.extend(self.framer.feed(self.view[:bytes_read]))
+            
+            command = self.pending.pop(0)
+            tracer.record("pipe_read", time.perf_counter() - start)
+            log_event("Read command: %r", command, level=logging.DEBUG, category="pipe_io")
+            return command
+        except (InterruptedError, BlockingIOError) as e:
+            # Transient: the caller simply reads again
+            log_event(f"Pipe read interrupted: {e}")
             return None
         except Exception as e:
-            log_event(f"Exception in read_command(): {e}")
+            log_event(f"Exception in read_command(): {e}; closing the pipe")
+            self.closed = True
             return None
 
-    @staticmethod
-    def write_response(response):
+    def write_response(self, response):
         try:
-            pipe = windll.kernel32.GetStdHandle(-11)
-            json_message = json.dumps(response) + '<<END>>'
-            message_bytes = json_message.encode('utf-8')
-            bytes_written = wintypes.DWORD()
-            windll.kernel32.WriteFile(pipe, message_bytes, len(message_bytes), byref(bytes_written), None)
+            with tracer.stage("pipe_write"):
+                json_message = json.dumps(response) + MessageFramer.END_MARKER
+                # Encoded straight into a writable buffer, which Kernel32PipeBackend passes to WriteFile as is
+                self.backend.write(bytearray(json_message, 'utf-8'))
         except Exception as e:
             log_event(f"Error writing response: {e}")
 
-class ConversationHandler:
-    def __init__(self, llm_handler, character_manager, speech_engine, vision_handler):
+class LoreIndex:
+    """
+    Compiled BM25 index of one lore pack, read through mmap.
+
+    File layout: a header, a doc table (text offset, text length, token count), a term table
+    sorted by term (string offset, string length, first posting, document frequency), the
+    term strings, the postings (doc id, term frequency) and the passage texts. Opening an
+    index only maps the file; lookups binary-search the term table in place, so even large
+    packs load instantly.
+    """
+
+    MAGIC = b"LMLI"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHIId20s5Q")
+    DOC = struct.Struct("<III")
+    TERM = struct.Struct("<IHII")
+    POSTING = struct.Struct("<IH")
+    K1 = 1.2
+    B = 0.75
+    _WORD = re.compile(r"[a-z0-9]+")
+    _STOPWORDS = frozenset(
+        "a an and are as at be but by do does for from has have he her his how i in is it its me my "
+        "of on or she so that the their them they this to was we were what when where which who why "
+        "will with you your about tell".split()
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.doc_count, self.term_count, self.avg_doc_len, self.signature,
+         self.docs_offset, self.terms_offset, self.strings_offset, self.postings_offset, self.texts_offset) = self.HEADER.unpack_from(self.mm, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self.close()
+            raise ValueError(f"Not a lore index (version {self.VERSION}): {path}")
+    
+    @classmethod
+    def tokenize(cls, text):
+        return [word for word in cls._WORD.findall(text.casefold()) if len(word) > 1 and word not in cls._STOPWORDS]
+    
+    @classmethod
+    def build(cls, passages, path, signature):
+        """Compile passages (a list of strings) into an index file at path, replaced atomically."""
+        postings = {}
+        doc_lens = []
+        for doc_id, text in enumerate(passages):
+            counts = {}
+            for word in cls.tokenize(text):
+                counts[word] = counts.get(word, 0) + 1
+            doc_lens.append(sum(counts.values()))
+            for word, tf in counts.items():
+                postings.setdefault(word.encode("utf-8"), []).append((doc_id, min(tf, 0xFFFF)))
+        
+        texts = bytearray()
+        docs = bytearray()
+        for text, doc_len in zip(passages, doc_lens):
+            data = text.encode("utf-8")
+            docs += cls.DOC.pack(len(texts), len(data), doc_len)
+            texts += data
+        terms = bytearray()
+        strings = bytearray()
+        posting_data = bytearray()
+        posting_count = 0
+        for term in sorted(postings):
+            entries = postings[term]
+            terms += cls.TERM.pack(len(strings), len(term), posting_count, len(entries))
+            strings += term
+            for doc_id, tf in entries:
+                posting_data += cls.POSTING.pack(doc_id, tf)
+            posting_count += len(entries)
+        
+        docs_offset = cls.HEADER.size
+        terms_offset = docs_offset + len(docs)
+        strings_offset = terms_offset + len(terms)
+        postings_offset = strings_offset + len(strings)
+        texts_offset = postings_offset + len(posting_data)
+        avg_doc_len = sum(doc_lens) / len(doc_lens) if doc_lens else 0.0
+        header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(passages), len(postings), avg_doc_len, signature,
+                                 docs_offset, terms_offset, strings_offset, postings_offset, texts_offset)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            for part in (header, docs, terms, strings, posting_data, texts):
+                f.write(part)
+        os.replace(temp_path, path)
+    
+    def _term(self, index):
+        return self.TERM.unpack_from(self.mm, self.terms_offset + index * self.TERM.size)
+    
+    def _find(self, term):
+        """Binary search the term table; returns (first posting, document frequency) or None."""
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            string_offset, string_len, first, df = self._term(middle)
+            start = self.strings_offset + string_offset
+            candidate = self.mm[start:start + string_len]
+            if candidate < term:
+                low = middle + 1
+            elif candidate > term:
+                high = middle
+            else:
+                return first, df
+        return None
+    
+    def _doc(self, doc_id):
+        return self.DOC.unpack_from(self.mm, self.docs_offset + doc_id * self.DOC.size)
+    
+    def text(self, doc_id):
+        text_offset, text_len, _ = self._doc(doc_id)
+        start = self.texts_offset + text_offset
+        return self.mm[start:start + text_len].decode("utf-8")
+    
+    def search(self, query, k=3):
+        """Return up to k (score, passage) pairs ranked by BM25."""
+        scores = {}
+        for word in set(self.tokenize(query)):
+            found = self._find(word.encode("utf-8"))
+            if found is None:
+                continue
+            first, df = found
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            start = self.postings_offset + first * self.POSTING.size
+            for doc_id, tf in self.POSTING.iter_unpack(self.mm[start:start + df * self.POSTING.size]):
+                doc_len = self._doc(doc_id)[2]
+                norm = self.K1 * (1 - self.B + self.B * doc_len / self.avg_doc_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(score, self.text(doc_id)) for doc_id, score in best]
+    
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+class LoreLibrary:
+    """
+    Per-game lore packs: each subdirectory of packs_dir is named after a game and holds
+    .txt/.md files (split into passages at blank lines, under their markdown headings) or
+    .json files (a list of strings or of {"title", "text"} objects). Each pack is compiled
+    into "<game>.index" next to its directory, and recompiled when its files change; an open
+    pack's files are checked again at most every recheck_seconds.
+    """
+
+    SOURCE_TYPES = (".txt", ".md", ".json")
+    MAX_PASSAGE_WORDS = 120
+
+    def __init__(self, packs_dir, top_k=3, min_score=0.0, recheck_seconds=10):
+        self.packs_dir = packs_dir
+        self.top_k = top_k
+        self.min_score = min_score
+        self.recheck_seconds = recheck_seconds
+        self.lock = threading.Lock()
+        self.indexes = {}  # pack directory -> LoreIndex, or None when the pack is empty
+        self.checked = {}  # pack directory -> (signature of its files, time.monotonic() of the check)
+        self.counters = {"queries": 0, "hits": 0, "passages": 0, "builds": 0}
+        self.retrieval_seconds = 0.0
+    
+    @classmethod
+    def from_config(cls, lore_config):
+        if not lore_config.get("enabled", True) or not os.path.isdir(lore_config.get("packs_dir") or ""):
+            return None
+        return cls(
+            lore_config["packs_dir"], lore_config.get("top_k", 3), lore_config.get("min_score", 0.0),
+            lore_config.get("recheck_seconds", 10)
+        )
+    
+    @staticmethod
+    def _normalize_game(game):
+        return re.sub(r"[^0-9a-z]+", "", game.casefold())
+    
+    def packs(self):
+        """Map of normalized game name -> pack directory."""
+        try:
+            names = os.listdir(self.packs_dir)
+        except OSError:
+            return {}
+        return {
+            self._normalize_game(name): os.path.join(self.packs_dir, name)
+            for name in names if os.path.isdir(os.path.join(self.packs_dir, name))
+        }
+    
+    def _sources(self, pack_dir):
+        sources = []
+        for root, _, files in os.walk(pack_dir):
+            for name in files:
+                if name.lower().endswith(self.SOURCE_TYPES):
+                    sources.append(os.path.join(root, name))
+        return sorted(sources)
+    
+    def _signature(self, sources):
+        material = [(os.path.relpath(path, self.packs_dir), os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in sources]
+        return hashlib.sha1(json.dumps(material).encode("utf-8")).digest()
+    
+    def _passages(self, path):
+        if path.lower().endswith(".json"):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entries = data.get("passages", []) if isinstance(data, dict) else data
+            for entry in entries:
+                if isinstance(entry, str):
+                    yield entry
+                elif entry.get("text"):
+                    yield f"{entry['title']}: {entry['text']}" if entry.get("title") else entry["text"]
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            blocks = re.split(r"\n\s*\n", f.read())
+        heading = None
+        for block in blocks:
+            lines = block.strip().splitlines()
+            while lines and lines[0].startswith("#"):
+                heading = lines.pop(0).lstrip("#").strip()
+            words = " ".join(lines).split()
+            for start in range(0, len(words), self.MAX_PASSAGE_WORDS):
+                text = " ".join(words[start:start + self.MAX_PASSAGE_WORDS])
+                yield f"{heading}: {text}" if heading else text
+    
+    def _open(self, pack_dir, sources, signature):
+        """Return the pack's index, compiling it first if missing or stale; None for an empty pack."""
+        if not sources:
+            return None
+        index_path = f"{pack_dir.rstrip(os.sep)}.index"
+        try:
+            index = LoreIndex(index_path)
+            if index.signature == signature:
+                return index
+            index.close()
+        except (OSError, ValueError, struct.error):
+            pass
+        start = time.perf_counter()
+        passages = [passage for path in sources for passage in self._passages(path)]
+        LoreIndex.build(passages, index_path, signature)
+        self.counters["builds"] += 1
+        log_event(f"Compiled lore pack {pack_dir}: {len(passages)} passages in {time.perf_counter() - start:.2f}s")
+        return LoreIndex(index_path)
+    
+    def index_for(self, game):
+        pack_dir = self.packs().get(self._normalize_game(game))
+        if pack_dir is None:
+            return None
+        with self.lock:
+            now = time.monotonic()
+            signature, checked_at = self.checked.get(pack_dir, (None, None))
+            if pack_dir in self.indexes and now - checked_at < self.recheck_seconds:
+                return self.indexes[pack_dir]
+            try:
+                sources = self._sources(pack_dir)
+                current = self._signature(sources)
+                if pack_dir not in self.indexes or current != signature:
+                    old_index = self.indexes.pop(pack_dir, None)
+                    if old_index:
+                        # Closed before the rebuild replaces its file (which Windows refuses while it is mapped)
+                        old_index.close()
+                    self.indexes[pack_dir] = self._open(pack_dir, sources, current)
+                self.checked[pack_dir] = (current, now)
+            except Exception as e:
+                log_event(f"Warning: Could not load lore pack {pack_dir}: {e}")
+                old_index = self.indexes.get(pack_dir)
+                if old_index:
+                    old_index.close()
+                self.indexes[pack_dir] = None
+                self.checked[pack_dir] = (None, now)
+            return self.indexes[pack_dir]
+    
+    def build_all(self):
+        """Open (compiling where needed) every pack, so the first question does not wait for it."""
+        for pack_dir in self.packs().values():
+            self.index_for(os.path.basename(pack_dir))
+    
+    def retrieve(self, game, query):
+        """Return the top passages for query from the game's pack, best first."""
+        index = self.index_for(game)
+        if index is None:
+            return []
+        start = time.perf_counter()
+        passages = [text for score, text in index.search(query, self.top_k) if score > self.min_score]
+        with self.lock:
+            self.counters["queries"] += 1
+            self.counters["hits"] += bool(passages)
+            self.counters["passages"] += len(passages)
+            self.retrieval_seconds += time.perf_counter() - start
+        return passages
+    
+    def stats(self):
+        with self.lock:
+            return {
+                "packs": {os.path.basename(pack_dir): index.doc_count if index else 0 for pack_dir, index in self.indexes.items()},
+                **self.counters,
+                "retrieval_seconds": round(self.retrieval_seconds, 3)
+            }
+    
+    def close(self):
+        with self.lock:
+            for index in self.indexes.values():
+                if index:
+                    index.close()
+            self.indexes.clear()
+            self.checked.clear()
+
+class ReplyCache:
+    """
+    Disk-backed cache of text replies, which are generated at temperature 0.
+
+    Keyed on the model, character, game, normalized question, the persona system prompt, the
+    lore passages retrieved for the question and the last context_turns messages before it,
+    so a repeated lore question in the same situation gets the same answer without a
+    generation. Replies live in SQLite; least recently used entries are evicted once they
+    exceed max_bytes. Hit rates are kept per persona.
+    """
+
+    def __init__(self, path, max_bytes=8 * 1024 * 1024, context_turns=2):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.context_turns = context_turns
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS replies ("
+                "key TEXT PRIMARY KEY, persona TEXT NOT NULL, reply TEXT NOT NULL, "
+                "bytes INTEGER NOT NULL, used_at REAL NOT NULL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS replies_by_use ON replies (used_at)")
+            self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(bytes), 0) FROM replies").fetchone()[0]
+        self.personas = {}  # "character:game" -> {"hits", "misses"}
+        self.evictions = 0
+    
+    @classmethod
+    def from_config(cls, reply_cache_config):
+        if not reply_cache_config.get("enabled", False):
+            return None
+        return cls(
+            reply_cache_config.get("file", "loremaster_replies.db"),
+            int(reply_cache_config.get("max_mb", 8) * 1024 * 1024),
+            reply_cache_config.get("context_turns", 2)
+        )
+    
+    def key(self, model, character, game, question, messages, lore=None):
+        """Key for a text turn; messages are the LLM context messages ending with the question, lore the passages added to them."""
+        context = messages[:-1]
+        system_prompt = context[0]["content"] if context else ""
+        recent = context[1:][-self.context_turns:] if self.context_turns else []
+        material = json.dumps([model, character, game, ParseCache.normalize(question), system_prompt, recent, lore], ensure_ascii=False)
+        return hashlib.sha1(material.encode("utf-8")).hexdigest()
+    
+    def _count(self, persona, counter):
+        counters = self.personas.setdefault(persona, {"hits": 0, "misses": 0})
+        counters[counter] += 1
+    
+    def get(self, key, persona):
+        with self.lock:
+            row = self.connection.execute("SELECT reply FROM replies WHERE key = ?", (key,)).fetchone()
+            self._count(persona, "hits" if row else "misses")
+            if row:
+                with self.connection:
+                    self.connection.execute("UPDATE replies SET used_at = ? WHERE key = ?", (time.time(), key))
+        return row[0] if row else None
+    
+    def put(self, key, persona, reply):
+        size = len(reply.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self.lock, self.connection:
+            previous = self.connection.execute("SELECT bytes FROM replies WHERE key = ?", (key,)).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO replies (key, persona, reply, bytes, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, persona, reply, size, time.time())
+            )
+            self.total_bytes += size - (previous[0] if previous else 0)
+            while self.total_bytes > self.max_bytes:
+                oldest = self.connection.execute("SELECT key, bytes FROM replies ORDER BY used_at LIMIT 32").fetchall()
+                for old_key, old_size in oldest:
+                    self.connection.execute("DELETE FROM replies WHERE key = ?", (old_key,))
+                    self.total_bytes -= old_size
+                    self.evictions += 1
+                    if self.total_bytes <= self.max_bytes:
+                        break
+    
+    def stats(self):
+        with self.lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM replies").fetchone()[0]
+            personas = {persona: dict(counters) for persona, counters in self.personas.items()}
+            stats = {"entries": entries, "bytes": self.total_bytes, "evictions": self.evictions}
+        for counters in personas.values():
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+        hits = sum(counters["hits"] for counters in personas.values())
+        lookups = hits + sum(counters["misses"] for counters in personas.values())
+        return {**stats, "hits": hits, "hit_rate": hits / lookups if lookups else 0.0, "personas": personas}
+    
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+class AsyncConversationHandler:
+    """Text and vision turns for the active character; ConversationHandler is the blocking API over it."""
+
+    def __init__(self, llm_handler, character_manager, speech_engine, vision_handler, reply_cache=None,
+                 lore_library=None, lore_token_budget=400):
         self.llm_handler = llm_handler
         self.character_manager = character_manager
         self.speech_engine = speech_engine
         self.vision_handler = vision_handler
+        self.reply_cache = reply_cache
+        self.lore_library = lore_library
+        self.lore_token_budget = lore_token_budget
     
-    def handle_conversation(self, parsed_input):
+    def resolve_context(self, parsed_input):
+        """Resolve generic "Character"/"Game" placeholders against the active context.
+
+        Returns a (character, game, is_female) tuple.
+        """
         character = parsed_input["character"]
         game = parsed_input["game"]
-        message = parsed_input["message"]
         is_female = parsed_input.get("sex", "").lower() == "female"
-        requires_vision = parsed_input.get("requires_vision", False)
         
         # Enhanced context maintaining logic
         if character == "Character" and game == "Game":
@@ -651,6 +4462,13 @@ class ConversationHandler:
             # Specific character and game provided - use as is
             log_event(f"Using specified context: {character} from {game}")
         
+        return character, game, is_female
+    
+    async def handle_conversation(self, parsed_input, screenshot=None):
+        message = parsed_input["message"]
+        requires_vision = parsed_input.get("requires_vision", False)
+        character, game, is_female = self.resolve_context(parsed_input)
+        
         log_event(f"Handling conversation - Character: {character}, Game: {game}, Vision required: {requires_vision}")
         
         if requires_vision:
@@ -659,8 +4477,30 @@ class ConversationHandler:
             parsed_input["character"] = character
             parsed_input["game"] = game
             parsed_input["sex"] = "female" if is_female else "male"
-            return self._handle_vision_query(parsed_input)
+            return await self._handle_vision_query(parsed_input, screenshot)
+        
+        messages = self._begin_text_turn(character, game, is_female, message)
+        # Retrieved before the cache lookup: a reply is only reused for the same lore passages
+        lore_message = self._lore_message(character, game, message)
+        cache_key, cached_reply = self._cached_reply(character, game, message, messages, lore_message)
+        if cached_reply is not None:
+            return self._complete_text_turn(cached_reply, is_female)
+        messages = self._with_lore(messages, lore_message)
         
+        try:
+            log_event(f"Generating text response for {character} from {game}")
+            if self.llm_handler.streaming:
+                reply = await self._stream_reply(messages, is_female)
+            else:
+                reply = await self.llm_handler.chat(messages)
+            self._store_reply(cache_key, character, game, reply)
+            return self._complete_text_turn(reply, is_female, spoken=self.llm_handler.streaming)
+        except Exception as e:
+            log_event(f"Error in conversation: {e}")
+            return {"success": False, "message": "An error occurred."}
+    
+    def _begin_text_turn(self, character, game, is_female, message):
+        """Switch to the turn's context, record the user message and return the LLM context messages."""
         # Handle regular conversation
         log_event("Regular text conversation detected.")
         self.character_manager.switch_context(character, game)
@@ -672,23 +4512,118 @@ class ConversationHandler:
         
         # Use centralized prompt management
         system_prompt = PromptManager.get_character_system_prompt(character, game, is_vision=False)
-        messages = self.character_manager.get_context_messages(system_prompt)
-        
+        with tracer.stage("context"):
+            return self.character_manager.get_context_messages(system_prompt)
+    
+    def _lore_message(self, character, game, message):
+        """Return a system message with the game's best matching lore passages within the lore token budget, or None."""
+        if not self.lore_library or not game or game == "Game":
+            return None
         try:
-            log_event(f"Generating text response for {character} from {game}")
-            reply = self.llm_handler.chat(messages)
-            
-            self.character_manager.add_message("assistant", reply)
-            self.speech_engine.speak(reply, is_female)
-            
-            log_event(f"Generated reply: {reply}")
-            return {"success": True, "message": reply}
+            with tracer.stage("lore"):
+                query = message if character == "Character" else f"{character} {message}"
+                passages = []
+                tokens = 0
+                for passage in self.lore_library.retrieve(game, query):
+                    tokens += self.character_manager.count_tokens(passage)
+                    if tokens > self.lore_token_budget:
+                        break
+                    passages.append(passage)
         except Exception as e:
-            log_event(f"Error in conversation: {e}")
-            return {"success": False, "message": "An error occurred."}
+            log_event(f"Warning: Lore retrieval failed: {e}")
+            return None
+        if not passages:
+            return None
+        log_event(f"Adding {len(passages)} lore passage(s) for {game}")
+        return {"role": "system", "content": PromptManager.get_lore_message(game, passages)}
+    
+    @staticmethod
+    def _with_lore(messages, lore_message):
+        """Insert lore_message (if any) before the question."""
+        if lore_message is None:
+            return messages
+        return messages[:-1] + [lore_message, messages[-1]]
+    
+    def _speak(self, text, is_female):
+        self.speech_engine.speak(text, is_female, self.character_manager.active_character)
+    
+    def _cached_reply(self, character, game, message, messages, lore_message=None):
+        """Return (cache key, cached reply) for a text turn; both None without a reply cache."""
+        if not self.reply_cache:
+            return None, None
+        try:
+            with tracer.stage("reply_cache"):
+                lore = lore_message["content"] if lore_message else None
+                key = self.reply_cache.key(self.llm_handler.trace_model, character, game, message, messages, lore)
+                reply = self.reply_cache.get(key, f"{character}:{game}")
+        except Exception as e:
+            log_event(f"Warning: Reply cache lookup failed: {e}")
+            return None, None
+        if reply is not None:
+            log_event(f"Reply cache hit for {character} from {game}")
+        return key, reply
+    
+    def _store_reply(self, key, character, game, reply):
+        if key is None:
+            return
+        try:
+            self.reply_cache.put(key, f"{character}:{game}", reply)
+        except Exception as e:
+            log_event(f"Warning: Could not store reply in cache: {e}")
+    
+    def _complete_text_turn(self, reply, is_female, spoken=False):
+        """Record the reply in history and queue it for speech unless it was already spoken while streaming."""
+        self.character_manager.add_message("assistant", reply)
+        if not spoken:
+            self._speak(reply, is_female)
+        
+        log_event(f"Generated reply: {reply}")
+        return {"success": True, "message": reply}
+    
+    def active_system_prompt(self):
+        """Return the text system prompt for the active persona (generic assistant if none)."""
+        return self.character_manager.active_system_prompt()
+    
+    def build_speculative_messages(self, message):
+        """Build the text-reply messages for the active context as if message were added, without touching history."""
+        character = self.character_manager.active_character
+        game = self.character_manager.active_game
+        system_prompt = PromptManager.get_character_system_prompt(character, game, is_vision=False)
+        messages = self.character_manager.preview_context_messages(system_prompt, {"role": "user", "content": message})
+        return self._with_lore(messages, self._lore_message(character, game, message))
+    
+    def complete_speculative_reply(self, character, game, is_female, message, reply):
+        """Record and speak a text reply that was generated speculatively for the active context."""
+        self.character_manager.switch_context(character, game)
+        self.character_manager.active_character_sex = is_female
+        self.character_manager.add_message("user", message)
+        self.character_manager.add_message("assistant", reply)
+        self._speak(reply, is_female)
+        
+        log_event(f"Generated reply (speculative): {reply}")
+        return {"success": True, "message": reply}
       
-    def _handle_vision_query(self, parsed_input):
-        """Handle vision-related queries"""
+    async def _stream_reply(self, messages, is_female):
+        """Stream the reply from the LLM, queueing each completed sentence for speech right away."""
+        splitter = SentenceSplitter()
+        fragments = []
+        
+        async for fragment in self.llm_handler.chat_stream(messages):
+            fragments.append(fragment)
+            for sentence in splitter.feed(fragment):
+                self._speak(sentence, is_female)
+        
+        remainder = splitter.flush()
+        if remainder:
+            self._speak(remainder, is_female)
+        
+        reply = "".join(fragments).strip()
+        if not reply:
+            raise ValueError("Empty streamed response from LLM.")
+        return reply
+
+    async def _handle_vision_query(self, parsed_input, screenshot=None):
+        """Handle vision-related queries, optionally using an already captured screenshot"""
         character = parsed_input["character"]
         game = parsed_input["game"]
         message = parsed_input["message"]
@@ -699,33 +4634,219 @@ class ConversationHandler:
         
         try:
             # Analyze the screen with character context
-            vision_response = self.vision_handler.analyze_screen(message, parsed_input)
-            
-            # Add to conversation history
-            self.character_manager.add_message("user", message)
-            self.character_manager.add_message("assistant", vision_response)
-            
-            self.speech_engine.speak(vision_response, is_female)
-            
-            log_event(f"Generated vision response: {vision_response}")
-            return {"success": True, "message": vision_response}
+            vision_response = await self.vision_handler.analyze_screen(
+                message, parsed_input, image=screenshot, context_messages=self._vision_context_messages()
+            )
+            return self._complete_vision_turn(message, vision_response, is_female)
         except Exception as e:
             log_event(f"Error in vision query: {e}")
             return {"success": False, "message": "An error occurred while analyzing the screen."}
+    
+    def _vision_context_messages(self):
+        """With stable_prefix, vision turns reuse the text turns' persona prompt and history as their prefix."""
+        if not self.character_manager.stable_prefix:
+            return None
+        with tracer.stage("context"):
+            return self.character_manager.get_context_messages(self.active_system_prompt())
+    
+    def _complete_vision_turn(self, message, vision_response, is_female):
+        # Add to conversation history
+        self.character_manager.add_message("user", message)
+        self.character_manager.add_message("assistant", vision_response)
+        
+        self._speak(vision_response, is_female)
+        
+        log_event(f"Generated vision response: {vision_response}")
+        return {"success": True, "message": vision_response}
 
-class LoreMasterPlugin:
-    def __init__(self):
-        self.config = ConfigManager()
-        self.llm_handler = LLMHandler(self.config)
-        self.vision_handler = VisionHandler(self.config)
-        self.character_manager = CharacterManager()
-        self.speech_engine = SpeechEngine()
-        self.message_parser = MessageParser(self.llm_handler)
-        self.conversation_handler = ConversationHandler(
-            self.llm_handler, self.character_manager, self.speech_engine, self.vision_handler
+class ConversationHandler(AsyncConversationHandler):
+    """
+    Blocking conversation API: each turn runs AsyncConversationHandler on the shared background
+    event loop, so its handlers must be the async ones (AsyncLLMHandler, AsyncVisionHandler).
+    """
+
+    def __init__(self, llm_handler, character_manager, speech_engine, vision_handler, reply_cache=None,
+                 lore_library=None, lore_token_budget=400):
+        if isinstance(llm_handler, LLMHandler) or isinstance(vision_handler, VisionHandler):
+            # Their blocking calls would be made from the background loop itself and fail there
+            raise TypeError("ConversationHandler needs AsyncLLMHandler and AsyncVisionHandler, not the blocking handlers")
+        super().__init__(llm_handler, character_manager, speech_engine, vision_handler, reply_cache,
+                         lore_library, lore_token_budget)
+    
+    def handle_conversation(self, parsed_input, screenshot=None):
+        return background_loop.run(super().handle_conversation(parsed_input, screenshot))
+
+class SpeculativeExecutor:
+    """
+    Opt-in execution mode that overlaps the LLM parse with the work most likely to follow it.
+
+    While MessageParser waits for its routing call, a screenshot is captured and a text reply
+    is generated for the currently active character/game. When the parse result arrives the
+    matching branch is kept and the other is cancelled, or its result discarded. Inputs the
+    parser resolves without an LLM call are handled directly since there is nothing to overlap.
+
+    A speculative reply is only kept when the parser extracts the same message (after
+    ParseCache normalization) for the same context, so the history records exactly what the
+    reply answered. With streaming enabled only the screenshot is speculated: a streamed
+    reply is spoken as it arrives, before the parse could confirm it.
+    """
+
+    def __init__(self, message_parser, conversation_handler):
+        self.message_parser = message_parser
+        self.conversation_handler = conversation_handler
+        self.character_manager = conversation_handler.character_manager
+        self.llm_handler = conversation_handler.llm_handler
+        self.vision_handler = conversation_handler.vision_handler
+        self.lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "skipped": 0,
+            "reply_hits": 0,
+            "reply_misses": 0,
+            "screenshot_hits": 0,
+            "screenshot_misses": 0,
+            "cancelled": 0,
+            "discarded": 0
+        }
+        self.wasted_seconds = 0.0
+    
+    @staticmethod
+    async def _timed(fn, *args):
+        start = time.perf_counter()
+        result = await fn(*args)
+        return result, time.perf_counter() - start
+    
+    def _count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+    
+    def _discard(self, task):
+        """Cancel a speculative branch, or account for its work as wasted if it already finished."""
+        if not task.done():
+            task.cancel()
+            self._count("cancelled")
+            return
+        self._count("discarded")
+        if task.cancelled() or task.exception():
+            return
+        _, elapsed = task.result()
+        with self.lock:
+            self.wasted_seconds += elapsed
+    
+    def _start(self, fn, *args):
+        # Tasks run in a copy of the caller's context, so stages are attributed to its trace
+        return asyncio.ensure_future(self._timed(fn, *args))
+    
+    async def talk(self, user_input, received_at=None):
+        with tracer.stage("parse"):
+            parsed = self.message_parser.parse_without_llm(user_input)
+        if parsed is not None:
+            self._count("skipped")
+            sampled = self.vision_handler.sampled_screenshot(received_at) if received_at and parsed.get("requires_vision") else None
+            return await self.conversation_handler.handle_conversation(parsed, screenshot=sampled)
+        
+        self._count("requests")
+        # A sampled frame from when the query arrived beats a speculative capture taken now
+        sampled = self.vision_handler.sampled_screenshot(received_at) if received_at else None
+        screenshot_task = None if sampled else self._start(asyncio.to_thread, self.vision_handler.capture_screenshot)
+        
+        reply_task = None
+        message = user_input.strip()
+        speculative_context = (self.character_manager.active_character, self.character_manager.active_game)
+        if all(speculative_context) and not self.llm_handler.streaming:
+            messages = self.conversation_handler.build_speculative_messages(message)
+            reply_task = self._start(self.llm_handler.chat, messages)
+            log_event(f"Speculating text reply for {speculative_context[0]} from {speculative_context[1]}")
+        
+        with tracer.stage("parse"):
+            parsed = await self.message_parser.parse_with_llm(user_input)
+        
+        if parsed.get("requires_vision", False):
+            if reply_task:
+                self._count("reply_misses")
+                self._discard(reply_task)
+            if sampled:
+                return await self.conversation_handler.handle_conversation(parsed, screenshot=sampled)
+            screenshot, elapsed = await screenshot_task
+            self._count("screenshot_hits")
+            log_event(f"Speculative screenshot used (captured in {elapsed:.3f}s)")
+            return await self.conversation_handler.handle_conversation(parsed, screenshot=screenshot)
+        
+        if screenshot_task:
+            self._count("screenshot_misses")
+            self._discard(screenshot_task)
+        
+        if reply_task:
+            character, game, is_female = self.conversation_handler.resolve_context(dict(parsed))
+            same_message = ParseCache.normalize(parsed["message"]) == ParseCache.normalize(message)
+            if (character, game) == speculative_context and same_message:
+                try:
+                    reply, elapsed = await reply_task
+                    self._count("reply_hits")
+                    log_event(f"Speculative reply used (generated in {elapsed:.3f}s)")
+                    return self.conversation_handler.complete_speculative_reply(character, game, is_female, message, reply)
+                except Exception as e:
+                    log_event(f"Speculative reply failed, generating normally: {e}")
+            self._count("reply_misses")
+            self._discard(reply_task)
+        
+        return await self.conversation_handler.handle_conversation(parsed)
+    
+    def stats(self):
+        """Return speculation hit rates and the amount of discarded work."""
+        with self.lock:
+            counters = dict(self.counters)
+            wasted_seconds = self.wasted_seconds
+        reply_total = counters["reply_hits"] + counters["reply_misses"]
+        screenshot_total = counters["screenshot_hits"] + counters["screenshot_misses"]
+        return {
+            **counters,
+            "reply_hit_rate": counters["reply_hits"] / reply_total if reply_total else 0.0,
+            "screenshot_hit_rate": counters["screenshot_hits"] / screenshot_total if screenshot_total else 0.0,
+            "wasted_seconds": round(wasted_seconds, 3)
+        }
+
+class AsyncLoreMasterPlugin:
+    """
+    Asyncio plugin core. Independent tool_calls run concurrently: parsing overlaps freely,
+    while conversation turns are serialized because they share the active character context.
+    LoreMasterPlugin is the blocking API over it.
+    """
+
+    def __init__(self, config_manager=None):
+        self.config = config_manager or ConfigManager()
+        self.client_registry = BackendClientRegistry(self.config)
+        self.residency_manager = ModelResidencyManager(self.config, self.client_registry)
+        self.llm_handler = AsyncLLMHandler(self.config, self.client_registry, self.residency_manager)
+        self.vision_handler = AsyncVisionHandler(self.config, self.client_registry, self.residency_manager)
+        self.summarizer = None
+        if self.config.context_config.get("summarize_evicted", True):
+            self.summarizer = AsyncContextSummarizer(self.llm_handler, self.llm_handler.tokenizer, self.config.context_config)
+        self.character_manager = CharacterManager(self.config.context_config, self.llm_handler.tokenizer, self.summarizer)
+        self.speech_engine = SpeechEngine(self.config.speech_config)
+        self.message_parser = AsyncMessageParser(self.llm_handler, self.config.parser_config)
+        self.reply_cache = ReplyCache.from_config(self.config.reply_cache_config)
+        self.lore_library = LoreLibrary.from_config(self.config.lore_config)
+        self.conversation_handler = AsyncConversationHandler(
+            self.llm_handler, self.character_manager, self.speech_engine, self.vision_handler, self.reply_cache,
+            self.lore_library, self.config.lore_config.get("token_budget", 400)
         )
+        self.speculative_executor = None
+        if self.config.execution_config.get("speculative", False):
+            self.speculative_executor = SpeculativeExecutor(self.message_parser, self.conversation_handler)
+            log_event("Speculative execution enabled.")
+        self.conversation_lock = asyncio.Lock()
+        self.preconnect_task = None
+        self.metrics_reporter = self._create_metrics_reporter()
     
-    def talk(self, params):
+    def _create_metrics_reporter(self):
+        metrics_config = self.config.metrics_config
+        if not metrics_config.get("file"):
+            return None
+        return MetricsReporter(self.stats, metrics_config["file"], metrics_config.get("flush_interval_seconds", 30))
+    
+    @staticmethod
+    def _get_user_input(params):
         # Handle both direct input and properties.input formats
         user_input = params.get("input", "")
         if not user_input:
@@ -735,30 +4856,217 @@ class LoreMasterPlugin:
                 user_input = properties
             else:
                 user_input = properties.get("input", "")
-        
-        log_event(f"Input received: {user_input}")
-        
-        parsed = self.message_parser.parse(user_input)
-        result = self.conversation_handler.handle_conversation(parsed)
-        
-        return result
+        return user_input
     
-    def initialize(self):
+    @asynccontextmanager
+    async def _conversation_turn(self):
+        with tracer.stage("conversation_lock_wait"):
+            await self.conversation_lock.acquire()
+        try:
+            yield
+        finally:
+            self.conversation_lock.release()
+    
+    async def talk(self, params):
+        with tracer.request("talk"):
+            user_input = self._get_user_input(params)
+            received_at = time.monotonic()
+            log_event(f"Input received: {user_input}")
+            if self.client_registry.cassette:
+                self.client_registry.cassette.record_input(user_input)
+            
+            if self.speculative_executor:
+                # The speculative reply is built from the active context, so the whole turn holds the lock
+                async with self._conversation_turn():
+                    return await self.speculative_executor.talk(user_input, received_at)
+            
+            with tracer.stage("parse"):
+                parsed = await self.message_parser.parse(user_input)
+            screenshot = self.vision_handler.sampled_screenshot(received_at) if parsed.get("requires_vision") else None
+            async with self._conversation_turn():
+                return await self.conversation_handler.handle_conversation(parsed, screenshot=screenshot)
+    
+    def stats(self):
+        """Latency percentiles per stage and model, plus the counters of every component."""
+        stats = {
+            "latency": tracer.stats(),
+            "parser": self.message_parser.stats(),
+            "vision": self.vision_handler.stats(),
+            "connections": self.client_registry.stats(),
+            "residency": self.residency_manager.stats(),
+            "prompt_cache": self.client_registry.prompt_cache_stats.stats(),
+            "speech": self.speech_engine.stats(),
+            "context": self.character_manager.stats()
+        }
+        if self.speculative_executor:
+            stats["speculation"] = self.speculative_executor.stats()
+        if self.summarizer:
+            stats["context_summary"] = self.summarizer.stats()
+        if self.client_registry.cassette:
+            stats["cassette"] = self.client_registry.cassette.stats()
+        if self.reply_cache:
+            stats["reply_cache"] = self.reply_cache.stats()
+        if self.lore_library:
+            stats["lore"] = self.lore_library.stats()
+        routing = {name: handler.router.stats() for name, handler in (("llm", self.llm_handler), ("vlm", self.vision_handler)) if handler.router}
+        if routing:
+            stats["routing"] = routing
+        return stats
+    
+    @staticmethod
+    def format_latency(stats):
+        """One line per stage: 'llm: p50 812ms, p95 1490ms (23 calls)'"""
+        lines = [
+            f"{name}: p50 {summary['p50_ms']:.0f}ms, p95 {summary['p95_ms']:.0f}ms ({summary['count']} calls)"
+            for name, summary in stats["latency"]["stages"].items()
+        ]
+        return "\n".join(lines) or "No requests timed yet."
+    
+    def stats_call(self):
+        stats = self.stats()
+        return {"success": True, "message": self.format_latency(stats), "stats": stats}
+    
+    def stop_speech(self):
+        self.speech_engine.stop()
+        log_event("Speech stopped by request")
+        return {"success": True, "message": "Stopped speaking."}
+    
+    async def initialize(self):
+        if self.config.http_config.get("preconnect", True):
+            self.preconnect_task = asyncio.create_task(self.client_registry.apreconnect())
+        if self.config.residency_config.get("warm_up", True) and self.residency_manager.models():
+            # Warm-up uses the sync client on a worker thread; its requests are scheduled like any other
+            threading.Thread(
+                target=self.residency_manager.warm_up,
+                args=(self.conversation_handler.active_system_prompt(),),
+                daemon=True
+            ).start()
+        self.vision_handler.start_frame_sampler()
+        if self.lore_library:
+            threading.Thread(target=self.lore_library.build_all, daemon=True).start()
+        self.speech_engine.prerender()
+        if self.metrics_reporter:
+            self.metrics_reporter.start()
         log_event("LoreMaster plugin initialized")
         return {"success": True, "message": "LoreMaster plugin initialized successfully"}
     
-    def shutdown(self):
+    async def shutdown(self):
         log_event("Shutting down plugin")
+        self.vision_handler.stop_frame_sampler()
+        if self.speculative_executor:
+            log_event(f"Speculation stats: {self.speculative_executor.stats()}")
+        if self.summarizer:
+            log_event(f"Context summary stats: {self.summarizer.stats()}")
+        log_event(f"Prompt cache stats: {self.client_registry.prompt_cache_stats.stats()}")
+        if self.metrics_reporter:
+            await asyncio.to_thread(self.metrics_reporter.stop)
+        await asyncio.to_thread(self.message_parser.close)
+        if self.client_registry.cassette:
+            self.client_registry.cassette.close()
+        if self.reply_cache:
+            log_event(f"Reply cache stats: {self.reply_cache.stats()}")
+            self.reply_cache.close()
+        if self.lore_library:
+            self.lore_library.close()
+        log_event(f"Speech stats: {self.speech_engine.stats()}")
+        self.speech_engine.close()
+        for handler in (self.llm_handler, self.vision_handler):
+            if handler.router:
+                log_event(f"Routing stats: {handler.router.stats()}")
+        await asyncio.to_thread(self.character_manager.close)
+
+class LoreMasterPlugin(AsyncLoreMasterPlugin):
+    """Blocking plugin API for the synchronous pipe loop: tool calls run AsyncLoreMasterPlugin on the shared background event loop."""
+
+    def talk(self, params):
+        return background_loop.run(super().talk(params))
+    
+    def initialize(self):
+        return background_loop.run(super().initialize())
+    
+    def shutdown(self):
+        background_loop.run(super().shutdown())
         sys.exit(0)
 
+async def main_async(config_manager=None):
+    """Protocol loop for the asyncio core: pipe I/O runs on worker threads, responses are written as calls complete."""
+    plugin = AsyncLoreMasterPlugin(config_manager)
+    pipe_handler = PipeHandler.from_config(plugin.config.transport_config)
+    loop = asyncio.get_running_loop()
+    commands = asyncio.Queue()
+    write_lock = asyncio.Lock()
+    pending = set()
+    log_event("LoreMaster plugin started (async core)")
+    
+    def read_commands():
+        # Dedicated daemon thread: a blocking pipe read must not hold up interpreter exit
+        while not pipe_handler.closed:
+            cmd = pipe_handler.read_command()
+            loop.call_soon_threadsafe(commands.put_nowait, cmd)
+    
+    threading.Thread(target=read_commands, daemon=True).start()
+    
+    async def write_response(resp):
+        async with write_lock:
+            await asyncio.to_thread(pipe_handler.write_response, resp)
+    
+    async def run_call(call):
+        try:
+            if call["func"] == "talk":
+                resp = await plugin.talk(call["params"])
+            elif call["func"] == "initialize":
+                resp = await plugin.initialize()
+            elif call["func"] == "stats":
+                resp = plugin.stats_call()
+            elif call["func"] == "stop_speech":
+                resp = plugin.stop_speech()
+            else:
+                return
+            if resp:
+                await write_response(resp)
+        except Exception as e:
+            log_event(f"Error handling tool call {call.get('func')}: {e}")
+    
+    while True:
+        cmd = await commands.get()
+        if not cmd:
+            if pipe_handler.closed:
+                return
+            continue
+        
+        tool_calls = cmd.get("tool_calls", [])
+        if not tool_calls:
+            continue
+        
+        for call in tool_calls:
+            if call["func"] == "shutdown":
+                await plugin.shutdown()
+                return
+            task = asyncio.create_task(run_call(call))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
 def main():
-    plugin = LoreMasterPlugin()
-    pipe_handler = PipeHandler()
+    config = ConfigManager()
+    logging_config = dict(config.logging_config)
+    if config.transport_config.get("backend") == "stdio":
+        # stdout carries the protocol
+        logging_config["console"] = False
+    configure_logging(logging_config)
+    tracer.window = config.metrics_config.get("window", 512)
+    if config.execution_config.get("async_core", False):
+        asyncio.run(main_async(config))
+        sys.exit(0)
+    
+    plugin = LoreMasterPlugin(config)
+    pipe_handler = PipeHandler.from_config(config.transport_config)
     log_event("LoreMaster plugin started")
     
     while True:
         cmd = pipe_handler.read_command()
         if not cmd:
+            if pipe_handler.closed:
+                break
             continue
         
         tool_calls = cmd.get("tool_calls", [])
@@ -773,6 +5081,10 @@ def main():
             elif call["func"] == "initialize":
                 resp = plugin.initialize()
                 pipe_handler.write_response(resp)
+            elif call["func"] == "stats":
+                pipe_handler.write_response(plugin.stats_call())
+            elif call["func"] == "stop_speech":
+                pipe_handler.write_response(plugin.stop_speech())
             elif call["func"] == "shutdown":
                 plugin.shutdown()
 
@@ -806,6 +5118,7 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         # Run test with command line argument
         test_input = " ".join(sys.argv[1:])
+        configure_logging({**ConfigManager().logging_config, "console": True})
         log_event(f"Command line test argument detected: {test_input}")
         run_test(test_input)
         sys.exit(0)
@@ -35,6 +35,9 @@ if exist %VENV% (
     if exist config.json (
         copy /y config.json "%PLUGIN_DIR%\config.json"
     )
+    if exist lore_packs (
+        xcopy /e /i /y lore_packs "%PLUGIN_DIR%\lore_packs" >nul
+    )
 
     call %VENV%\Scripts\deactivate.bat
     echo ✅ Build complete. Executable in "%PLUGIN_DIR%"
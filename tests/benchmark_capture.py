@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Screenshot Pipeline Benchmark
+Measures each stage of the VLM screenshot pipeline using a synthetic image source,
+so it runs without a real display.
+
+Compares:
+1. Legacy pipeline - full-frame resize to the configured size, synchronous debug PNG, JPEG, base64
+2. ScreenCapturePipeline - reduce + aspect-preserving resize, no base64 (Ollama path)
+"""
+
+import base64
+import os
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import make_synthetic_source
+
+from plugin import ScreenCapturePipeline
+
+SOURCE_SIZE = (2560, 1440)
+VISION_CONFIG = {"screenshot_size": [512, 512], "screenshot_quality": 85, "debug_screenshot": False}
+
+
+def legacy_capture(grab, stage_times):
+    """The pre-pipeline implementation, instrumented per stage"""
+    start = time.perf_counter()
+    screenshot = grab()
+    stage_times["grab"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    width, height = VISION_CONFIG["screenshot_size"]
+    resized = screenshot.resize((width, height))
+    stage_times["downscale"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    resized.save(os.path.join(tempfile.gettempdir(), "loremaster_vlm_bench.png"), format="PNG")
+    stage_times["debug_png"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    buffer = BytesIO()
+    resized.save(buffer, format="JPEG", quality=VISION_CONFIG["screenshot_quality"])
+    stage_times["encode"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    base64.b64encode(buffer.getvalue()).decode("utf-8")
+    stage_times["base64"].append(time.perf_counter() - start)
+
+
+def pipeline_capture(pipeline, stage_times):
+    pipeline.capture()
+    for stage, seconds in pipeline.last_timings.items():
+        stage_times[stage].append(seconds)
+
+
+def report(name, stage_times):
+    print(f"\n[RESULTS] {name}")
+    total = [sum(values) for values in zip(*stage_times.values())]
+    for stage, values in list(stage_times.items()) + [("total", total)]:
+        values = sorted(values)
+        p95 = values[int(len(values) * 0.95) - 1] if len(values) > 1 else values[0]
+        print(f"  {stage:<10} mean {statistics.mean(values) * 1000:7.2f}ms   p95 {p95 * 1000:7.2f}ms")
+    return statistics.mean(total)
+
+
+def run_benchmark(iterations=30):
+    grab = make_synthetic_source(SOURCE_SIZE)
+
+    legacy_times = {stage: [] for stage in ("grab", "downscale", "debug_png", "encode", "base64")}
+    for _ in range(iterations):
+        legacy_capture(grab, legacy_times)
+
+    pipeline = ScreenCapturePipeline(VISION_CONFIG, image_source=grab)
+    pipeline_times = {stage: [] for stage in ("grab", "downscale", "encode")}
+    for _ in range(iterations):
+        pipeline_capture(pipeline, pipeline_times)
+
+    legacy_mean = report("Legacy pipeline", legacy_times)
+    pipeline_mean = report("ScreenCapturePipeline", pipeline_times)
+    print(f"\nSpeedup: {legacy_mean / pipeline_mean:.1f}x (source {SOURCE_SIZE[0]}x{SOURCE_SIZE[1]}, {iterations} iterations)")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
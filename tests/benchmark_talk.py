@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Talk Pipeline Benchmark
+Drives LoreMasterPlugin.talk end to end against the local fake OpenAI/Ollama server,
+with a synthetic screen and the null speech backend, so it runs offline and repeatably.
+
+Workloads:
+1. text - lore questions and follow-ups to one character
+2. vision - screen questions answered from the synthetic screenshot
+3. context_switch - alternating between characters and games
+4. cassette - the talk inputs of a recorded session, with --replay (model replies come from the cassette)
+
+For each workload it reports throughput, talk latency percentiles, the per-stage breakdown
+from the plugin's tracer, and the plugin overhead (talk time not spent waiting on models).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_model_server import FakeModelServer
+from fixtures import make_config, make_synthetic_source, work_dir
+
+from plugin import Cassette, LoreMasterPlugin, configure_logging, tracer
+
+MODEL_STAGES = ("llm", "llm_stream", "vlm")
+
+WORKLOADS = {
+    "text": lambda i: [
+        "Ask Zeus from Ancient Mythology about thunder",
+        "Ask Zeus from Ancient Mythology why he rules Olympus",
+        "tell me more"
+    ][i % 3],
+    "vision": lambda i: f"What do you see on screen? Question {i}",
+    "context_switch": lambda i: [
+        "Ask Zeus from Ancient Mythology about thunder",
+        "Ask Aphrodite from Ancient Mythology about love",
+        "Ask Geralt from The Witcher about monster contracts",
+        "Ask Athena from Ancient Mythology about strategy"
+    ][i % 4]
+}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def run_workload(lore_master, make_input, iterations):
+    tracer.reset()
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        response = lore_master.talk({"input": make_input(i)})
+        latencies.append(time.perf_counter() - call_start)
+        assert response and response.get("success"), f"talk failed: {response}"
+    elapsed = time.perf_counter() - start
+    lore_master.speech_engine.speech_queue.join()
+    return elapsed, latencies, tracer.stats()["stages"]
+
+
+def report(name, elapsed, latencies, stages, overhead=True):
+    print(f"\n[RESULTS] {name}: {len(latencies)} calls in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} calls/s)")
+    print(f"  {'talk':<20} p50 {percentile(latencies, 0.50) * 1000:7.1f}ms   p95 {percentile(latencies, 0.95) * 1000:7.1f}ms   "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.1f}ms")
+    for stage, summary in sorted(stages.items()):
+        if stage != "talk" and summary.get("count"):
+            print(f"  {stage:<20} p50 {summary['p50_ms']:7.1f}ms   p95 {summary['p95_ms']:7.1f}ms   ({summary['count']} calls)")
+    if not overhead:
+        return
+    model_seconds = sum(stages[s]["mean_ms"] * stages[s]["count"] for s in MODEL_STAGES if stages.get(s, {}).get("count")) / 1000
+    overhead = (sum(latencies) - model_seconds) / len(latencies)
+    print(f"  plugin overhead      {overhead * 1000:7.1f}ms per call (talk time outside LLM/VLM calls)")
+
+
+def run_benchmark(iterations=30, workloads=tuple(WORKLOADS), provider="ollama", latency=0.05, tokens_per_second=200,
+                  streaming=False, speculative=False, replay=None, replay_latency=False):
+    server = FakeModelServer(latency=latency, tokens_per_second=tokens_per_second).start()
+    if replay:
+        replay = os.path.abspath(replay)
+        inputs = Cassette(replay, "replay").inputs()
+        workloads = {"cassette": (inputs.__getitem__, len(inputs))}
+    else:
+        workloads = {name: (WORKLOADS[name], iterations) for name in workloads}
+    try:
+        with work_dir() as directory:
+            config = make_config(server, provider, streaming, speculative, replay, replay_latency)
+            configure_logging(config.logging_config)
+            lore_master = LoreMasterPlugin(config)
+            lore_master.vision_handler.capture_pipeline.image_source = make_synthetic_source()
+            print(f"[START] Talk benchmark: {provider}, {latency * 1000:.0f}ms to first token, {tokens_per_second} tokens/s, "
+                  f"streaming={streaming}, speculative={speculative}")
+            for name, (make_input, count) in workloads.items():
+                # Speculative calls overlap model time with the rest of the turn, so overhead is not meaningful
+                report(name, *run_workload(lore_master, make_input, count), overhead=not speculative)
+            print(f"\nFake server requests: {server.stats()}")
+            if replay:
+                print(f"Cassette: {lore_master.client_registry.cassette.stats()}")
+            lore_master.character_manager.close()
+            print(f"Logs and conversation store: {directory}")
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("iterations", nargs="?", type=int, default=30)
+    parser.add_argument("--workload", action="append", choices=list(WORKLOADS), help="run only these workloads")
+    parser.add_argument("--provider", choices=["ollama", "openai"], default="ollama")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake time to first token in seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--speculative", action="store_true")
+    parser.add_argument("--replay", metavar="CASSETTE", help="replay the talk inputs and model replies of a recorded session")
+    parser.add_argument("--replay-latency", action="store_true", help="reproduce the recorded model timings")
+    args = parser.parse_args()
+    run_benchmark(args.iterations, tuple(args.workload or WORKLOADS), args.provider, args.latency,
+                  args.tokens_per_second, args.streaming, args.speculative, args.replay, args.replay_latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Fake Model Server
+A local stand-in for the OpenAI chat-completions and Ollama chat endpoints, so the plugin
+can be driven end to end without real models.
+
+Supports:
+1. OpenAI POST /v1/chat/completions - plain and streamed (SSE, with include_usage)
+2. Ollama POST /api/chat - plain and streamed (NDJSON), and /api/generate for warm-up
+3. Configurable time to first token, tokens/sec and canned responses
+4. An error status for every chat request, to stand in for a failing backend
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PARSER_PROMPT_MARKER = "Extract structured data"
+VISION_WORDS = re.compile(r"\b(?:screen|display|see|look|visible)\b", re.IGNORECASE)
+
+
+class FakeModelServer:
+    """
+    Serves canned replies with simulated model timing.
+
+    latency is the time to first token, tokens_per_second the generation speed (replies are
+    split into word tokens). responses maps a substring of the last user message to a reply;
+    parser requests get a JSON routing answer and requests carrying images get vision_response.
+    With error_status, chat requests are answered with that HTTP status instead.
+    """
+
+    def __init__(self, latency=0.05, tokens_per_second=200, responses=None,
+                 default_response="By the old laws, that is a tale worth telling, traveler.",
+                 vision_response="I see a misty landscape and a path leading north.", error_status=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.responses = responses or {}
+        self.default_response = default_response
+        self.vision_response = vision_response
+        self.error_status = error_status
+        self.lock = threading.Lock()
+        self.request_counts = {}
+        self.httpd = None
+
+    def start(self, port=0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    @property
+    def openai_base_url(self):
+        return f"{self.url}/v1"
+
+    def stats(self):
+        with self.lock:
+            return dict(self.request_counts)
+
+    def _count(self, endpoint):
+        with self.lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def reply_for(self, messages, images=False):
+        """Pick the canned reply for a chat request"""
+        system = " ".join(_text(m.get("content")) for m in messages if m.get("role") == "system")
+        user = next((_text(m.get("content")) for m in reversed(messages) if m.get("role") == "user"), "")
+        if PARSER_PROMPT_MARKER in system:
+            return json.dumps(_parse_answer(user))
+        for pattern, reply in self.responses.items():
+            if pattern in user:
+                return reply
+        return self.vision_response if images else self.default_response
+
+    def tokens(self, reply):
+        return re.findall(r"\S+\s*", reply) or [reply]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server._count("GET")
+                self._send_json({"status": "ok"})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if server.error_status and self.path.endswith(("/chat/completions", "/api/chat")):
+                    server._count("errors")
+                    self.send_error(server.error_status)
+                elif self.path.endswith("/chat/completions"):
+                    server._count("openai_chat")
+                    self._openai_chat(body)
+                elif self.path.endswith("/api/chat"):
+                    server._count("ollama_chat")
+                    self._ollama_chat(body)
+                elif self.path.endswith("/api/generate"):
+                    server._count("ollama_generate")
+                    self._send_json({"model": body.get("model"), "created_at": _now(), "response": "", "done": True, "load_duration": 0})
+                else:
+                    self.send_error(404)
+
+            def _openai_chat(self, body):
+                messages = body.get("messages", [])
+                has_images = any(isinstance(m.get("content"), list) and any(p.get("type") == "image_url" for p in m["content"]) for m in messages)
+                tokens = server.tokens(server.reply_for(messages, has_images))
+                usage = {
+                    "prompt_tokens": _prompt_tokens(messages),
+                    "completion_tokens": len(tokens),
+                    "total_tokens": _prompt_tokens(messages) + len(tokens),
+                    "prompt_tokens_details": {"cached_tokens": 0}
+                }
+                chunk = {"id": "fake", "created": int(time.time()), "model": body.get("model")}
+                if not body.get("stream"):
+                    time.sleep(server.latency + len(tokens) / server.tokens_per_second)
+                    self._send_json({
+                        **chunk, "object": "chat.completion", "usage": usage,
+                        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "".join(tokens)}}]
+                    })
+                    return
+                self._start_stream("text/event-stream")
+                chunk["object"] = "chat.completion.chunk"
+                for data in self._paced(tokens):
+                    self._write_chunk(f"data: {json.dumps({**chunk, 'choices': [{'index': 0, 'delta': {'content': data}}]})}\n\n")
+                if body.get("stream_options", {}).get("include_usage"):
+                    self._write_chunk(f"data: {json.dumps({**chunk, 'choices': [], 'usage': usage})}\n\n")
+                self._write_chunk("data: [DONE]\n\n")
+                self._write_chunk("")
+
+            def _ollama_chat(self, body):
+                messages = body.get("messages", [])
+                tokens = server.tokens(server.reply_for(messages, any(m.get("images") for m in messages)))
+                final = {
+                    "model": body.get("model"), "created_at": _now(), "done": True, "done_reason": "stop",
+                    "load_duration": 0, "prompt_eval_count": _prompt_tokens(messages), "prompt_eval_duration": 0,
+                    "eval_count": len(tokens)
+                }
+                if not body.get("stream", False):
+                    time.sleep(server.latency + len(tokens) / server.tokens_per_second)
+                    self._send_json({**final, "message": {"role": "assistant", "content": "".join(tokens)}})
+                    return
+                self._start_stream("application/x-ndjson")
+                for data in self._paced(tokens):
+                    part = {"model": body.get("model"), "created_at": _now(), "message": {"role": "assistant", "content": data}, "done": False}
+                    self._write_chunk(json.dumps(part) + "\n")
+                self._write_chunk(json.dumps({**final, "message": {"role": "assistant", "content": ""}}) + "\n")
+                self._write_chunk("")
+
+            def _paced(self, tokens):
+                time.sleep(server.latency)
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(1 / server.tokens_per_second)
+                    yield token
+
+            def _send_json(self, obj):
+                data = json.dumps(obj).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _start_stream(self, content_type):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+            def _write_chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def _text(content):
+    """Text of a message content, which OpenAI vision requests send as a list of parts"""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+    return content or ""
+
+
+def _prompt_tokens(messages):
+    return sum(len(_text(m.get("content"))) for m in messages) // 4
+
+
+def _parse_answer(user_prompt):
+    """Routing answer for MessageParser's LLM path: generic speaker, vision by keyword"""
+    message = user_prompt.removeprefix("Input:").removesuffix("Output:").strip()
+    return {"game": "Game", "character": "Character", "sex": "male", "message": message,
+            "requires_vision": bool(VISION_WORDS.search(message))}
+
+
+def _now():
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+if __name__ == "__main__":
+    fake = FakeModelServer().start(11435)
+    print(f"[START] Fake model server on {fake.url} (OpenAI base URL {fake.openai_base_url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,50 @@
+"""
+Test Fixtures
+Shared helpers for the tests that drive the plugin against the local fake model server.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+from PIL import Image
+
+from plugin import ConfigManager
+
+
+@contextmanager
+def work_dir():
+    """Run in a fresh directory, which keeps the log, store and context log files for inspection"""
+    cwd = os.getcwd()
+    directory = tempfile.mkdtemp(prefix="loremaster_")
+    os.chdir(directory)
+    try:
+        yield directory
+    finally:
+        os.chdir(cwd)
+
+
+def make_config(server, provider="ollama", streaming=False, speculative=False, replay=None, replay_latency=False):
+    """ConfigManager pointed at the fake server; config.json values are overridden where they matter"""
+    config = ConfigManager()
+    config.api_key = "fake-key" if provider == "openai" else None
+    config.llm_config.update(llm_provider=provider, streaming=streaming)
+    config.vision_config.update(vision_provider=provider, debug_screenshot=False, frame_sampler=False)
+    config.http_config.update(openai_base_url=server.openai_base_url, ollama_host=server.url, preconnect=False)
+    config.residency_config["warm_up"] = False
+    config.execution_config["speculative"] = speculative
+    config.context_config["store_file"] = "conversations.db"
+    config.logging_config.update(file="loremaster.log", console=False)
+    config.metrics_config["file"] = None
+    config.speech_config["backend"] = "null"
+    if replay:
+        config.cassette_config.update(mode="replay", file=replay, replay_latency=replay_latency)
+    return config
+
+
+def make_synthetic_source(size=(2560, 1440)):
+    """Return an ImageGrab.grab() stand-in producing a detailed RGB frame"""
+    frame = Image.linear_gradient("L").resize(size).convert("RGB")
+    noise = Image.effect_noise(size, 64).convert("RGB")
+    frame = Image.blend(frame, noise, 0.5)
+    return lambda: frame.copy()
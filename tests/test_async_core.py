@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Async Core Tests
+Drives AsyncLoreMasterPlugin and its blocking wrappers against the local fake model server.
+
+Test Cases:
+1. Concurrent talk calls overlap their parse calls while conversation turns stay serialized
+2. The blocking API runs the async core on the background loop, keeping trace stages and streamed fragments
+3. A blocking call made from the background loop itself is refused instead of deadlocking
+4. The blocking MessageParser and ConversationHandler refuse the blocking handlers up front
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_model_server import FakeModelServer
+from fixtures import make_config, work_dir
+
+from plugin import (AsyncLLMHandler, AsyncLoreMasterPlugin, AsyncVisionHandler, ConversationHandler, LLMHandler,
+                    LoreMasterPlugin, MessageParser, VisionHandler, background_loop, tracer)
+
+QUESTIONS = ["Why is the sky angry?", "Where do heroes rest?", "Who forged the first blade?", "When does winter end?"]
+
+
+def with_server(test, latency=0.2):
+    server = FakeModelServer(latency=latency).start()
+    try:
+        with work_dir():
+            config = make_config(server)
+            config.parser_config["cache_size"] = 0
+            config.context_config["summarize_evicted"] = False
+            test(server, config)
+    finally:
+        server.stop()
+
+
+def test_concurrent_talk():
+    def test(server, config):
+        async def run():
+            tracer.reset()
+            plugin = AsyncLoreMasterPlugin(config)
+            try:
+                start = time.perf_counter()
+                responses = await asyncio.gather(*(plugin.talk({"input": question}) for question in QUESTIONS))
+                return responses, time.perf_counter() - start, plugin.character_manager.current_history
+            finally:
+                plugin.character_manager.close()
+
+        responses, elapsed, history = asyncio.run(run())
+        assert all(response["success"] for response in responses)
+        # 4 parse calls in parallel, then 4 serialized replies: about 5 model calls' time instead of 8
+        llm = tracer.stats()["stages"]["llm"]
+        assert llm["count"] == 8
+        assert elapsed < 0.8 * llm["count"] * llm["mean_ms"] / 1000, elapsed
+        assert server.stats() == {"ollama_chat": 8}
+        assert [message["role"] for message in history] == ["user", "assistant"] * 4
+        assert sorted(message["content"] for message in history[::2]) == sorted(QUESTIONS)
+
+    with_server(test)
+
+
+def test_blocking_api():
+    def test(server, config):
+        tracer.reset()
+        lore_master = LoreMasterPlugin(config)
+        try:
+            assert lore_master.talk({"input": QUESTIONS[0]}) == {"success": True, "message": server.default_response}
+            stages = tracer.stats()["stages"]
+            # Stages timed on the background loop are attributed to the caller's request
+            assert stages["llm"]["count"] == 2 and stages["talk"]["count"] == 1
+
+            handler = LLMHandler(config)
+            fragments = list(handler.chat_stream([{"role": "user", "content": "Tell me a tale."}]))
+            assert len(fragments) > 1 and "".join(fragments) == server.default_response
+        finally:
+            lore_master.character_manager.close()
+
+    with_server(test, latency=0.01)
+
+
+def test_blocking_call_on_loop_refused():
+    def test(server, config):
+        handler = LLMHandler(config)
+
+        async def nested():
+            handler.chat([{"role": "user", "content": "Hello?"}])
+
+        try:
+            background_loop.run(nested())
+        except RuntimeError as e:
+            assert "background event loop" in str(e)
+        else:
+            raise AssertionError("blocking call on the background loop was not refused")
+
+    with_server(test, latency=0.01)
+
+
+def test_blocking_wrappers_need_async_handlers():
+    def test(server, config):
+        builds = [
+            lambda: MessageParser(LLMHandler(config)),
+            lambda: ConversationHandler(LLMHandler(config), None, None, AsyncVisionHandler(config)),
+            lambda: ConversationHandler(AsyncLLMHandler(config), None, None, VisionHandler(config))
+        ]
+        for build in builds:
+            try:
+                build()
+            except TypeError as e:
+                assert "not the blocking" in str(e)
+            else:
+                raise AssertionError("blocking wrapper accepted a blocking handler")
+
+        parser = MessageParser(AsyncLLMHandler(config))
+        assert parser.parse("Why is the sky angry?")["message"] == "Why is the sky angry?"
+        assert server.stats() == {"ollama_chat": 1}
+
+    with_server(test, latency=0.01)
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Async Core Tests")
+    print("=" * 60)
+    for test in [test_concurrent_talk, test_blocking_api, test_blocking_call_on_loop_refused,
+                 test_blocking_wrappers_need_async_handlers]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Cassette Tests
+Records and replays model exchanges without any LLM backend.
+
+Test Cases:
+1. Replayed calls return the recorded responses in order, and repeats keep the last one
+2. Streamed replies replay fragment by fragment; images are stored once by hash and not used for matching
+3. Requests that were never recorded raise CassetteMissError
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugin import Cassette, CassetteMissError
+
+MESSAGES = [{"role": "system", "content": "You are Zeus."}, {"role": "user", "content": "Tell me about thunder."}]
+
+
+def record(path, exchanges):
+    cassette = Cassette(path, "record")
+    for request, response in exchanges:
+        cassette.call("llm", "ollama:test", request, lambda: response)
+    cassette.close()
+
+
+def test_replay_in_recorded_order():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.jsonl")
+        record(path, [(MESSAGES, "First answer"), (MESSAGES, "Second answer")])
+
+        cassette = Cassette(path, "replay")
+        replies = [cassette.call("llm", "ollama:test", MESSAGES, None) for _ in range(3)]
+        assert replies == ["First answer", "Second answer", "Second answer"]
+        assert cassette.stats()["hits"] == 3
+
+
+def test_stream_and_images():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.jsonl")
+        request = {"prompt": "What do you see?", "images": [b"\xff\xd8 first screen"], "context": []}
+        cassette = Cassette(path, "record")
+        cassette.record_input("What do you see on screen?")
+        assert list(cassette.stream("vlm", "ollama:test", request, lambda: iter(["A misty ", "path."]))) == ["A misty ", "path."]
+        cassette.close()
+        assert len(os.listdir(os.path.join(directory, "session_images"))) == 1
+
+        cassette = Cassette(path, "replay")
+        assert cassette.inputs() == ["What do you see on screen?"]
+        recaptured = {**request, "images": [b"\xff\xd8 re-encoded screen"]}
+        assert list(cassette.stream("vlm", "ollama:test", recaptured, None)) == ["A misty ", "path."]
+        assert cassette.call("vlm", "ollama:test", recaptured, None) == "A misty path."
+
+
+def test_unrecorded_request_misses():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.jsonl")
+        record(path, [(MESSAGES, "First answer")])
+        cassette = Cassette(path, "replay")
+        try:
+            cassette.call("llm", "ollama:test", MESSAGES[:1], None)
+        except CassetteMissError:
+            pass
+        else:
+            raise AssertionError("Expected CassetteMissError")
+        assert cassette.stats()["misses"] == 1
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Cassette Tests")
+    print("=" * 60)
+    for test in [test_replay_in_recorded_order, test_stream_and_images, test_unrecorded_request_misses]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Client Registry Tests
+Exercises BackendClientRegistry's pooled HTTP clients against the local fake model server.
+
+Test Cases:
+1. The LLM and vision handlers share one client and keep-alive connection per backend
+2. OpenAI and Ollama clients get separate pools, each counted in stats()
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_model_server import FakeModelServer
+from fixtures import make_config, make_synthetic_source
+
+from plugin import BackendClientRegistry, LLMHandler, VisionHandler
+
+MESSAGES = [{"role": "user", "content": "Tell me about thunder."}]
+ZEUS = {"character": "Zeus", "game": "Ancient Mythology"}
+
+
+def test_handlers_share_pooled_connections():
+    server = FakeModelServer(latency=0.01).start()
+    try:
+        config = make_config(server)
+        config.vision_config["screen_cache_size"] = 0
+        registry = BackendClientRegistry(config)
+        llm_handler = LLMHandler(config, registry)
+        vision_handler = VisionHandler(config, registry, image_source=make_synthetic_source())
+        for _ in range(3):
+            assert llm_handler.chat(MESSAGES) == server.default_response
+            assert vision_handler.analyze_screen("What do you see?", ZEUS) == server.vision_response
+        assert registry.ollama_client(is_async=True) is registry.ollama_client(is_async=True)
+        stats = registry.stats()["ollama"]
+        assert stats["requests"] == 6 and stats["new_connections"] == 1
+        assert stats["reuse_ratio"] == 5 / 6
+    finally:
+        server.stop()
+
+
+def test_separate_pools_per_backend():
+    server = FakeModelServer(latency=0.01).start()
+    try:
+        config = make_config(server, provider="openai")
+        registry = BackendClientRegistry(config)
+        openai_handler = LLMHandler(config, registry)
+        for _ in range(2):
+            assert openai_handler.chat(MESSAGES) == server.default_response
+        config.llm_config["llm_provider"] = "ollama"
+        ollama_handler = LLMHandler(config, registry)
+        assert ollama_handler.chat(MESSAGES) == server.default_response
+        stats = registry.stats()
+        assert stats["openai"]["requests"] == 2 and stats["openai"]["new_connections"] == 1
+        assert stats["ollama"]["requests"] == 1 and stats["ollama"]["new_connections"] == 1
+        assert server.stats() == {"openai_chat": 2, "ollama_chat": 1}
+    finally:
+        server.stop()
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Client Registry Tests")
+    print("=" * 60)
+    for test in [test_handlers_share_pooled_connections, test_separate_pools_per_backend]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Context Log Tests
+Exercises ContextLogWriter, the background writer of the per-character context logs.
+
+Test Cases:
+1. Files are rotated past max_bytes, keeping at most the configured number of backups
+2. Entries dropped by a full queue are counted across threads and reported in CharacterManager stats
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugin import CharacterManager, ContextLogWriter
+
+
+def test_rotation():
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "Ancient_Mythology_Zeus_context.log")
+        writer = ContextLogWriter("events", max_bytes=1000, backups=2)
+        for i in range(200):
+            writer.write(filename, "MESSAGE_USER", f"Question {i} about the temple beyond the northern ridge")
+        writer.close()
+        assert sorted(os.listdir(directory)) == [os.path.basename(filename) + suffix for suffix in ("", ".1", ".2")]
+        for name in os.listdir(directory):
+            assert os.path.getsize(os.path.join(directory, name)) < 1200
+        with open(filename, encoding="utf-8") as f:
+            assert f.read().rstrip().endswith("Question 199 about the temple beyond the northern ridge")
+        assert writer.stats() == {"written": 200, "dropped": 0, "queued": 0}
+
+
+def test_dropped_entries_are_counted():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            manager = CharacterManager({"prompt_token_budget": 100000})
+            manager.context_log.close()
+            writer = manager.context_log = ContextLogWriter("events", queue_size=4)
+            format_line = writer._format
+
+            def slow_format(*entry):
+                time.sleep(0.001)
+                return format_line(*entry)
+
+            writer._format = slow_format
+            manager.switch_context("Zeus", "Ancient Mythology")
+
+            def log_turns():
+                for i in range(200):
+                    manager.add_message("user", f"Question {i}")
+
+            threads = [threading.Thread(target=log_turns) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            manager.close()
+            stats = manager.stats()["context_log"]
+            # Every entry is either written or counted as dropped (plus the context switch line)
+            assert stats["dropped"] > 0
+            assert stats["written"] + stats["dropped"] == 8 * 200 + 1
+        finally:
+            os.chdir(cwd)
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Context Log Tests")
+    print("=" * 60)
+    for test in [test_rotation, test_dropped_entries_are_counted]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
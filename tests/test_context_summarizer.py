@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Context Summarizer Tests
+Exercises ContextSummarizer with CharacterManager and a stand-in summarizing LLM.
+
+Test Cases:
+1. Evicted turns are summarized in the background into a memory block sent after the system prompt
+2. Turns evicted while a summary is running are folded in by one follow-up call, which sees the current memory
+3. A summary over summary_token_budget is cut to fit
+4. Without a store, conversations past max_resident_contexts are summarized and kept as a memory block only
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import work_dir
+
+from plugin import ApproximateTokenizer, CharacterManager, ContextSummarizer
+
+SYSTEM_PROMPT = "You are Zeus from Ancient Mythology."
+TURN = "Tell me about the old temple beyond the northern ridge."
+
+
+class StubLLM:
+    """Summarizing LLM that records its requests and may hold its replies until released"""
+
+    def __init__(self, reply="The mortal asked about the temple.", blocked=False):
+        self.reply = reply
+        self.requests = []
+        self.release = threading.Event()
+        if not blocked:
+            self.release.set()
+
+    def chat(self, messages):
+        self.requests.append(messages)
+        self.release.wait(5)
+        return self.reply
+
+
+def make_manager(llm, **context_config):
+    summarizer = ContextSummarizer(llm, ApproximateTokenizer(), context_config)
+    manager = CharacterManager({"prompt_token_budget": 120, **context_config}, summarizer=summarizer)
+    manager.switch_context("Zeus", "Ancient Mythology")
+    return manager, summarizer
+
+
+def talk(manager, turns):
+    for i in range(turns):
+        manager.add_message("user" if i % 2 == 0 else "assistant", TURN)
+
+
+def wait_for(summarizer, summaries):
+    deadline = time.monotonic() + 5
+    while summarizer.stats()["summaries"] < summaries and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert summarizer.stats()["summaries"] == summaries
+
+
+def test_evicted_turns_become_memory():
+    llm = StubLLM()
+    with work_dir():
+        manager, summarizer = make_manager(llm)
+        try:
+            talk(manager, 8)
+            wait_for(summarizer, 1)
+            messages = manager.get_context_messages(SYSTEM_PROMPT)
+            assert messages[1] == {"role": "system", "content": "Memory of your earlier conversation with the user:\n"
+                                                                "The mortal asked about the temple."}
+            assert "Zeus: " + TURN in llm.requests[0][1]["content"]
+            stats = summarizer.stats()
+            assert stats["prompt_tokens_saved"] > 0 and stats["turns_summarized"] == manager.current_context.evicted_tokens // manager.count_tokens(TURN)
+        finally:
+            manager.close()
+
+
+def test_turns_evicted_meanwhile_are_batched():
+    llm = StubLLM(blocked=True)
+    with work_dir():
+        manager, summarizer = make_manager(llm)
+        try:
+            talk(manager, 8)
+            deadline = time.monotonic() + 5
+            while not llm.requests and time.monotonic() < deadline:
+                time.sleep(0.01)
+            talk(manager, 12)  # several more evictions while the first summary is running
+            llm.release.set()
+            wait_for(summarizer, 2)
+            assert len(llm.requests) == 2
+            assert "The mortal asked about the temple." in llm.requests[1][1]["content"]
+        finally:
+            manager.close()
+
+
+def test_summary_cut_to_budget():
+    llm = StubLLM(reply=" ".join(f"word{i}" for i in range(200)))
+    with work_dir():
+        manager, summarizer = make_manager(llm, summary_token_budget=40)
+        try:
+            talk(manager, 8)
+            wait_for(summarizer, 1)
+            context = manager.current_context
+            assert context.summary.startswith("word0 word1") and context.summary_tokens <= 40
+            assert context.summary_tokens == manager.count_tokens(context.summary)
+        finally:
+            manager.close()
+
+
+def test_dropped_conversations_keep_only_memory():
+    llm = StubLLM()
+    with work_dir():
+        manager, summarizer = make_manager(llm, prompt_token_budget=400, max_resident_contexts=2, max_memories=1)
+        try:
+            talk(manager, 2)
+            manager.switch_context("Hera", "Ancient Mythology")
+            talk(manager, 2)
+            manager.switch_context("Athena", "Ancient Mythology")
+            manager.switch_context("Apollo", "Ancient Mythology")
+            # Zeus, then Hera, were dropped from memory and summarized; only Hera's memory is kept
+            wait_for(summarizer, 2)
+            assert list(manager.chat_histories) == ["Athena:Ancient Mythology", "Apollo:Ancient Mythology"]
+            assert list(manager.memories) == ["Hera:Ancient Mythology"]
+            assert "Zeus: " + TURN in llm.requests[0][1]["content"]
+            manager.switch_context("Hera", "Ancient Mythology")
+            assert manager.current_history == [] and manager.current_context.summary == llm.reply
+            manager.switch_context("Zeus", "Ancient Mythology")
+            assert manager.current_history == [] and manager.current_context.summary == ""
+        finally:
+            manager.close()
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Context Summarizer Tests")
+    print("=" * 60)
+    for test in [test_evicted_turns_become_memory, test_turns_evicted_meanwhile_are_batched, test_summary_cut_to_budget,
+                 test_dropped_conversations_keep_only_memory]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Conversation Store Tests
+Exercises CharacterManager with the SQLite conversation store, without any LLM backend.
+
+Test Cases:
+1. Conversations survive a restart (a new CharacterManager on the same store file)
+2. Only max_resident_contexts conversations stay in memory; the rest reload on demand
+3. Evicted turns are removed from the store along with the window
+4. Token counts stored by another tokenizer are redone on load, also for conversations never trimmed
+5. A summary finishing after its context was dropped and reloaded lands on the reloaded context
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugin import CharacterManager, ContextSummarizer
+
+
+@contextmanager
+def temp_dir():
+    """Run in a temporary directory, which also receives the per-character context logs"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(cwd)
+
+
+def make_manager(store_file, **overrides):
+    context_config = {"store_file": store_file, "max_resident_contexts": 2, "prompt_token_budget": 4000, **overrides}
+    return CharacterManager(context_config)
+
+
+def talk(manager, character, game, turns):
+    manager.switch_context(character, game)
+    for i in range(turns):
+        manager.add_message("user", f"Question {i} for {character}")
+        manager.add_message("assistant", f"Answer {i} from {character}")
+
+
+def test_conversations_survive_restart():
+    with temp_dir() as directory:
+        store_file = os.path.join(directory, "conversations.db")
+        manager = make_manager(store_file)
+        talk(manager, "Zeus", "Ancient Mythology", 3)
+        manager.close()
+
+        restarted = make_manager(store_file)
+        restarted.switch_context("Zeus", "Ancient Mythology")
+        assert len(restarted.current_history) == 6
+        assert restarted.current_history[-1] == {"role": "assistant", "content": "Answer 2 from Zeus"}
+        restarted.close()
+
+
+def test_resident_contexts_are_bounded():
+    with temp_dir() as directory:
+        manager = make_manager(os.path.join(directory, "conversations.db"))
+        for character in ["Zeus", "Hera", "Ares", "Athena"]:
+            talk(manager, character, "Ancient Mythology", 2)
+        assert list(manager.chat_histories) == ["Ares:Ancient Mythology", "Athena:Ancient Mythology"]
+
+        manager.switch_context("Zeus", "Ancient Mythology")
+        assert len(manager.current_history) == 4
+        assert len(manager.chat_histories) == 2
+        manager.close()
+
+
+def test_evicted_turns_leave_the_store():
+    with temp_dir() as directory:
+        store_file = os.path.join(directory, "conversations.db")
+        manager = make_manager(store_file, prompt_token_budget=160)
+        talk(manager, "Zeus", "Ancient Mythology", 10)
+        kept = list(manager.current_history)
+        assert len(kept) < 20
+
+        restarted = make_manager(store_file, prompt_token_budget=160)
+        restarted.switch_context("Zeus", "Ancient Mythology")
+        assert restarted.current_history == kept
+        assert restarted.current_context.evicted_tokens == manager.current_context.evicted_tokens
+        manager.close()
+        restarted.close()
+
+
+class WordTokenizer:
+    name = "words"
+
+    def count(self, text):
+        return len(text.split())
+
+
+class BlockingLLM:
+    """Summarizer LLM whose replies wait until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def chat(self, messages):
+        self.release.wait(5)
+        return "Zeus remembers the mortal's questions."
+
+
+def test_tokenizer_change_recounts():
+    with temp_dir() as directory:
+        store_file = os.path.join(directory, "conversations.db")
+        manager = make_manager(store_file)
+        talk(manager, "Zeus", "Ancient Mythology", 2)
+        approximate = manager.current_context.total_tokens
+        manager.close()
+
+        restarted = CharacterManager({"store_file": store_file}, tokenizer=WordTokenizer())
+        restarted.switch_context("Zeus", "Ancient Mythology")
+        expected = sum(restarted.count_tokens(message["content"]) for message in restarted.current_history)
+        assert restarted.current_context.total_tokens == expected != approximate
+        restarted.close()
+
+
+def test_summary_lands_on_reloaded_context():
+    with temp_dir() as directory:
+        llm = BlockingLLM()
+        summarizer = ContextSummarizer(llm, WordTokenizer())
+        manager = CharacterManager(
+            {"store_file": os.path.join(directory, "conversations.db"), "max_resident_contexts": 1, "prompt_token_budget": 140},
+            summarizer=summarizer
+        )
+        talk(manager, "Zeus", "Ancient Mythology", 6)
+        assert manager.current_context.evicted_tokens
+        talk(manager, "Hera", "Ancient Mythology", 1)  # drops Zeus from memory while his summary is pending
+        manager.switch_context("Zeus", "Ancient Mythology")
+        llm.release.set()
+        deadline = time.monotonic() + 5
+        while summarizer.stats()["summaries"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert manager.current_context.summary == "Zeus remembers the mortal's questions."
+        manager.close()
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Conversation Store Tests")
+    print("=" * 60)
+    for test in [test_conversations_survive_restart, test_resident_contexts_are_bounded, test_evicted_turns_leave_the_store,
+                 test_tokenizer_change_recounts, test_summary_lands_on_reloaded_context]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
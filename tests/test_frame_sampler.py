@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Frame Sampler Tests
+Exercises FrameRingBuffer and the background FrameSampler with a synthetic screen source.
+
+Test Cases:
+1. The ring buffer returns frames oldest first up to the one closest in time, wraps around, and drops oversized frames
+2. Sampled frames write no debug screenshot and leave last_timings to on-demand captures
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import make_synthetic_source, work_dir
+
+from plugin import FrameRingBuffer, FrameSampler, ScreenCapturePipeline
+
+
+def test_ring_buffer():
+    ring = FrameRingBuffer(slots=3, memory_bytes=30)
+    assert ring.frames_until(1.0) == []
+    for i in range(4):
+        assert ring.write(bytes([i]) * (i + 1), float(i))
+    # Frame 0 was overwritten by frame 3
+    assert ring.frames_until(2.2, count=5) == [b"\x01" * 2, b"\x02" * 3]
+    assert ring.frames_until(10.0, count=2) == [b"\x02" * 3, b"\x03" * 4]
+    assert ring.frames_until(0.0) == [b"\x01" * 2]
+
+    assert not ring.write(b"x" * 11, 4.0)
+    assert ring.oversized == 1 and ring.count == 3
+    assert ring.frames_until(4.0) == [b"\x03" * 4]
+
+
+def test_sampled_frames_skip_debug_output():
+    with work_dir():
+        config = {"screenshot_size": [320, 180], "screenshot_quality": 70, "debug_screenshot": True}
+        pipeline = ScreenCapturePipeline(config, make_synthetic_source())
+        sampler = FrameSampler(pipeline, fps=20, frames=4)
+        sampler.start()
+        try:
+            deadline = time.monotonic() + 2
+            while sampler.samples < 5 and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            sampler.stop()
+            sampler.thread.join()
+        assert sampler.stats()["samples"] >= 5 and sampler.stats()["buffered"] == 4
+        time.sleep(0.1)
+        assert not os.path.exists(ScreenCapturePipeline.DEBUG_FILENAME)
+        assert pipeline.last_timings == {}
+
+        pipeline.capture()
+        assert "encode" in pipeline.last_timings
+        deadline = time.monotonic() + 2
+        while not os.path.exists(ScreenCapturePipeline.DEBUG_FILENAME) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert os.path.exists(ScreenCapturePipeline.DEBUG_FILENAME)
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Frame Sampler Tests")
+    print("=" * 60)
+    for test in [test_ring_buffer, test_sampled_frames_skip_debug_output]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
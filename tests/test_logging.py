@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Logging Tests
+Exercises log_event and the queued logging pipeline built by configure_logging.
+
+Test Cases:
+1. Log arguments are only formatted for records that are written, and RedactedMessages drops image data
+2. Messages starting with "Warning" or "Error" are logged at that level
+3. A sampled category keeps the configured fraction of its records, unformatted when dropped
+4. The JSON format writes one object per record with its category
+5. Non-scalar arguments are logged as they were when logged, not as the listener finds them later
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugin import RedactedMessages, configure_logging, log_event
+
+
+class CountingArg:
+    """Log argument that counts how often it is formatted"""
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "expensive value"
+
+
+def written_lines(logging_config, emit):
+    """Run emit() with logging_config and return the lines written to its log file"""
+    path = os.path.join(tempfile.mkdtemp(), "test.log")
+    root = logging.getLogger()
+    # Other handlers (such as pytest's log capture) would format every record themselves
+    other_handlers = [handler for handler in root.handlers if not isinstance(handler, logging.handlers.QueueHandler)]
+    for handler in other_handlers:
+        root.removeHandler(handler)
+    configure_logging({**logging_config, "file": path})
+    try:
+        emit()
+    finally:
+        configure_logging()  # stopping the listener writes out the queued records
+        for handler in other_handlers:
+            root.addHandler(handler)
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_arguments_formatted_only_when_written():
+    arg = CountingArg()
+    messages = [{"role": "user", "content": [{"type": "text", "text": "What is this?"},
+                                             {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}}]}]
+
+    def emit():
+        log_event("Debug value: %s", arg, level=logging.DEBUG)
+        log_event("Request messages: %s", RedactedMessages(messages), level=logging.DEBUG)
+
+    assert written_lines({"level": "INFO"}, emit) == []
+    assert arg.formatted == 0
+
+    lines = written_lines({"level": "DEBUG"}, emit)
+    assert arg.formatted == 1
+    assert lines[0].endswith("[DEBUG] Debug value: expensive value")
+    assert "[BASE64_IMAGE_DATA_EXCLUDED]" in lines[1] and "AAAA" not in lines[1]
+
+
+def test_warning_and_error_promoted():
+    def emit():
+        log_event("Warning: disk almost full")
+        log_event("Error: could not reach the model")
+        log_event("Warning sign ahead", level=logging.DEBUG)  # an explicit level is kept
+
+    lines = written_lines({"level": "INFO"}, emit)
+    assert len(lines) == 2
+    assert "[WARNING] Warning: disk almost full" in lines[0]
+    assert "[ERROR] Error: could not reach the model" in lines[1]
+
+
+def test_category_sampling():
+    arg = CountingArg()
+
+    def emit():
+        for _ in range(20):
+            log_event("Dropped %s", arg, category="llm_messages")
+            log_event("Kept", category="timing")
+            log_event("Unsampled")
+
+    lines = written_lines({"sampling": {"llm_messages": 0.0, "timing": 1.0}}, emit)
+    assert arg.formatted == 0
+    assert sum(line.endswith("Kept") for line in lines) == 20
+    assert sum(line.endswith("Unsampled") for line in lines) == 20
+    assert len(lines) == 40
+
+
+def test_json_lines():
+    lines = written_lines({"format": "json"}, lambda: log_event("Speech took %dms", 120, category="speech"))
+    entry = json.loads(lines[0])
+    assert (entry["level"], entry["message"], entry["category"]) == ("INFO", "Speech took 120ms", "speech")
+    assert "request_id" not in entry
+
+
+def test_mutable_arguments_logged_as_they_were():
+    history = [{"role": "user", "content": "Hello"}]
+    options = {"temperature": 0.5}
+
+    def emit():
+        log_event("History: %s", history)
+        log_event("Options: %(temperature)s", options)
+        history.append({"role": "assistant", "content": "Greetings, mortal"})
+        options["temperature"] = 1.0
+
+    lines = written_lines({}, emit)
+    assert lines[0].endswith("History: [{'role': 'user', 'content': 'Hello'}]")
+    assert lines[1].endswith("Options: 0.5")
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Logging Tests")
+    print("=" * 60)
+    for test in [test_arguments_formatted_only_when_written, test_warning_and_error_promoted, test_category_sampling,
+                 test_json_lines, test_mutable_arguments_logged_as_they_were]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
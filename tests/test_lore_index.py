@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Lore Pack Tests
+Compiles small lore packs and queries them, without any LLM backend.
+
+Test Cases:
+1. BM25 ranks the passage about the asked subject first, for markdown and JSON packs
+2. Game names match loosely, and a pack is recompiled when its files change
+3. An open pack is recompiled once its files change, checked at most every recheck_seconds
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugin import LoreLibrary
+
+
+def write_pack(packs_dir, game, name, content):
+    os.makedirs(os.path.join(packs_dir, game), exist_ok=True)
+    with open(os.path.join(packs_dir, game, name), "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def test_bm25_ranking():
+    with tempfile.TemporaryDirectory() as packs_dir:
+        write_pack(packs_dir, "Ancient Mythology", "gods.md",
+                   "# Zeus\nKing of the gods, armed with the thunderbolt.\n\n"
+                   "# Hades\nRuler of the underworld, guarded by Cerberus.\n\n"
+                   "# Hera\nQueen of the gods; the peacock is her bird.\n")
+        write_pack(packs_dir, "The Witcher", "places.json", json.dumps([
+            {"title": "Kaer Morhen", "text": "The old keep where witchers are trained."},
+            "Novigrad is the largest free city of the North."
+        ]))
+        library = LoreLibrary(packs_dir, top_k=2)
+        passages = library.retrieve("Ancient Mythology", "Who guards the underworld?")
+        assert passages[0] == "Hades: Ruler of the underworld, guarded by Cerberus."
+        assert library.retrieve("The Witcher", "where are witchers trained")[0].startswith("Kaer Morhen:")
+        assert library.retrieve("Ancient Mythology", "spaceships") == []
+        library.close()
+
+
+def test_loose_game_names_and_rebuild():
+    with tempfile.TemporaryDirectory() as packs_dir:
+        write_pack(packs_dir, "Ancient Mythology", "gods.txt", "Zeus wields the thunderbolt.\n")
+        library = LoreLibrary(packs_dir)
+        assert library.retrieve("ancient-mythology", "thunderbolt") == ["Zeus wields the thunderbolt."]
+        library.close()
+
+        time.sleep(0.01)
+        write_pack(packs_dir, "Ancient Mythology", "gods.txt", "Poseidon wields the trident.\n")
+        library = LoreLibrary(packs_dir)
+        assert library.retrieve("Ancient Mythology", "trident") == ["Poseidon wields the trident."]
+        assert library.stats()["builds"] == 1
+        library.close()
+
+
+def test_open_pack_recheck():
+    with tempfile.TemporaryDirectory() as packs_dir:
+        write_pack(packs_dir, "Ancient Mythology", "gods.txt", "Zeus wields the thunderbolt.\n")
+        library = LoreLibrary(packs_dir, recheck_seconds=0.2)
+        assert library.retrieve("Ancient Mythology", "thunderbolt") == ["Zeus wields the thunderbolt."]
+
+        time.sleep(0.01)
+        write_pack(packs_dir, "Ancient Mythology", "gods.txt", "Poseidon wields the trident.\n")
+        assert library.retrieve("Ancient Mythology", "trident") == []  # not checked again yet
+        time.sleep(0.3)
+        assert library.retrieve("Ancient Mythology", "trident") == ["Poseidon wields the trident."]
+        assert library.retrieve("Ancient Mythology", "thunderbolt") == []
+        assert library.stats()["builds"] == 2
+        library.close()
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Lore Pack Tests")
+    print("=" * 60)
+    for test in [test_bm25_ranking, test_loose_game_names_and_rebuild, test_open_pack_recheck]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Message Parser Tests
+Exercises the local fast path of MessageParser, and its fallback to the LLM parser against the local fake model server.
+
+Test Cases:
+1. Local rules parse continuations, obvious vision phrasing and "Ask X from Y about ..." with a confidence
+2. A character's sex learned from an earlier parse raises the confidence of later local parses
+3. Game titles containing from/of/in, and pronouns that may mean another named character, are left to the LLM
+4. Confident local parses never call the LLM; unsure ones go to the LLM parser once and then hit the parse cache
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_model_server import FakeModelServer
+from fixtures import make_config
+
+from plugin import AsyncLLMHandler, LocalMessageParser, MessageParser
+
+
+def test_local_rules():
+    parser = LocalMessageParser()
+    parsed, confidence = parser.parse("Ask Athena from Ancient Mythology about her owl")
+    assert parsed == {"game": "Ancient Mythology", "character": "Athena", "sex": "female",
+                      "message": "Tell me about your owl.", "requires_vision": False}
+    assert confidence == 0.9
+
+    parsed, confidence = parser.parse("Okay,  tell me more")
+    assert (parsed["character"], parsed["game"], confidence) == ("Character", "Game", 0.95)
+
+    parsed, confidence = parser.parse("What do you see on the screen?")
+    assert parsed["requires_vision"] and confidence == 0.9
+    # May address another character than the active one
+    assert parser.parse("Zeus, look at that!")[1] < 0.8
+
+    assert parser.parse("And what about lightning?") == (None, 0.0)
+
+
+def test_known_sex_raises_confidence():
+    parser = LocalMessageParser()
+    parsed, confidence = parser.parse("Ask Zeus from Ancient Mythology about thunder")
+    assert parsed["message"] == "Tell me about thunder." and confidence < 0.8
+    parser.remember({"character": "Zeus", "sex": "male"})
+    assert parser.parse("Ask Zeus from Ancient Mythology about thunder")[1] == 0.9
+
+
+def test_ambiguous_inputs_left_to_llm():
+    parser = LocalMessageParser()
+    parsed, confidence = parser.parse("Ask Link from The Legend of Zelda about his sword")
+    assert (parsed["character"], parsed["game"]) == ("Link", "The Legend of Zelda")
+    assert parsed["message"] == "Tell me about your sword."
+    assert confidence < 0.8
+
+    parsed, confidence = parser.parse("Ask Jin from Ghost of Tsushima about honor")
+    assert (parsed["character"], parsed["game"]) == ("Jin", "Ghost of Tsushima") and confidence < 0.8
+
+    # "her" is Athena, not Kratos: neither the sex nor the message may be taken from it
+    parser.remember({"character": "Kratos", "sex": "male"})
+    parsed, confidence = parser.parse("Ask Kratos from God of War about Athena and her betrayal")
+    assert (parsed["character"], parsed["sex"]) == ("Kratos", "male")
+    assert parsed["message"] == "Tell me about Athena and her betrayal."
+    assert confidence < 0.8
+
+    # "me" is not a character name, whatever the letter case of the rest of the pattern
+    assert parser.parse("Tell me about Zeus from Ancient Mythology, why is he angry?") == (None, 0.0)
+
+
+def test_fast_path_and_llm_fallback():
+    server = FakeModelServer(latency=0.01).start()
+    try:
+        config = make_config(server)
+        parser = MessageParser(AsyncLLMHandler(config), {"cache_size": 16})
+        assert parser.parse("Ask Athena from Ancient Mythology about her owl")["character"] == "Athena"
+        assert parser.parse("tell me more")["message"] == "tell me more"
+        assert server.stats() == {}
+
+        for _ in range(2):
+            parsed = parser.parse("Ask Zeus from Ancient Mythology about thunder")
+        assert server.stats() == {"ollama_chat": 1}
+        assert parsed["message"] == "Ask Zeus from Ancient Mythology about thunder"
+        stats = parser.stats()
+        assert (stats["local"], stats["llm"], stats["cache"], stats["last_path"]) == (2, 1, 1, "cache")
+        parser.close()
+    finally:
+        server.stop()
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Message Parser Tests")
+    print("=" * 60)
+    for test in [test_local_rules, test_known_sex_raises_confidence, test_ambiguous_inputs_left_to_llm,
+                 test_fast_path_and_llm_fallback]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Parse Cache Tests
+Exercises the MessageParser result cache without any LLM backend.
+
+Test Cases:
+1. Lookups match normalized input, return copies, and drop expired and least recently used entries
+2. Writes to the cache file are batched on a background thread, and close() flushes unsaved entries
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugin import ParseCache
+
+PARSED = {"character": "Zeus", "game": "Ancient Mythology", "sex": "male", "message": "Who are you?", "requires_vision": False}
+
+
+def test_lookup_eviction_and_expiry():
+    cache = ParseCache(max_entries=2, ttl_seconds=0.2)
+    cache.put("Ask Zeus from Ancient Mythology who he is.", PARSED)
+    hit = cache.get("  ask zeus FROM ancient mythology who he is ")
+    assert hit == PARSED
+    hit["character"] = "Athena"
+    assert cache.get("Ask Zeus from Ancient Mythology who he is")["character"] == "Zeus"
+
+    cache.put("second", PARSED)
+    cache.get("Ask Zeus from Ancient Mythology who he is")  # now the most recently used
+    cache.put("third", PARSED)
+    assert cache.get("second") is None
+    assert cache.get("Ask Zeus from Ancient Mythology who he is") is not None
+    time.sleep(0.3)
+    assert cache.get("third") is None
+    assert cache.stats() == {"size": 1, "hits": 4, "misses": 2, "evictions": 1, "saves": 0}
+
+
+def test_saves_are_batched_and_flushed_on_close():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "parse_cache.json")
+        cache = ParseCache(cache_file=path, save_delay_seconds=0.2)
+        for i in range(3):
+            cache.put(f"question {i}", PARSED)
+        assert not os.path.exists(path)  # put() never writes on the caller's thread
+        time.sleep(0.5)
+        assert cache.stats()["saves"] == 1
+        with open(path, encoding="utf-8") as f:
+            assert len(json.load(f)) == 3
+
+        cache.save_delay_seconds = 60
+        cache.put("question 3", PARSED)
+        start = time.perf_counter()
+        cache.close()
+        assert time.perf_counter() - start < 1
+        assert ParseCache(cache_file=path).get("question 3") == PARSED
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Parse Cache Tests")
+    print("=" * 60)
+    for test in [test_lookup_eviction_and_expiry, test_saves_are_batched_and_flushed_on_close]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
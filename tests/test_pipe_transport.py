@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Pipe Transport Tests
+Exercises the framed pipe transport without G-Assist, using the Unix-domain-socket backend.
+
+Test Cases:
+1. Multi-byte UTF-8 characters split across reads
+2. Several "<<END>>"-framed messages in one read
+3. Load test - large payloads echoed through PipeHandler over a Unix socket
+4. A failing backend closes the pipe, so the command loop ends
+"""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugin import MessageFramer, PipeHandler, UnixSocketPipeBackend
+
+
+def test_split_multibyte_characters():
+    """Feed a message one byte at a time; no character may be lost or replaced"""
+    message = {"tool_calls": [{"func": "talk", "params": {"input": "Ask Æsir Þór from Edda about Mjölnir ⚡"}}]}
+    framer = MessageFramer()
+    received = []
+    for byte in json.dumps(message, ensure_ascii=False).encode("utf-8"):
+        received.extend(framer.feed(bytes([byte])))
+    assert received == [message]
+
+
+def test_multiple_framed_messages_in_one_read():
+    """Frame markers, whitespace and braces inside strings must not confuse the framer"""
+    messages = [{"n": i, "text": "curly } and { \"quoted\" \\ braces"} for i in range(3)]
+    payload = "".join(json.dumps(m) + MessageFramer.END_MARKER + "\r\n" for m in messages)
+    framer = MessageFramer()
+    assert framer.feed(payload.encode("utf-8")) == messages
+    assert framer.text == ""
+
+
+def run_socket_load_test(message_count=20, payload_size=1024 * 1024):
+    """Echo large messages through PipeHandler over a Unix socket; returns (seconds, MB/s)"""
+    socket_path = os.path.join(tempfile.mkdtemp(), "loremaster-test.sock")
+
+    def serve():
+        backend = UnixSocketPipeBackend(socket_path)
+        handler = PipeHandler(backend)
+        while True:
+            cmd = handler.read_command()
+            if not cmd:
+                break
+            handler.write_response({"success": True, "message": cmd["payload"]})
+        backend.close()
+
+    server = threading.Thread(target=serve, daemon=True)
+    server.start()
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    for _ in range(100):
+        try:
+            client.connect(socket_path)
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            time.sleep(0.05)
+    payload = ("lore ✦ " * (payload_size // 7))[:payload_size]
+    framer = MessageFramer()
+    buffer = bytearray(65536)
+    start = time.perf_counter()
+
+    def send_all():
+        for i in range(message_count):
+            client.sendall((json.dumps({"id": i, "payload": payload}) + MessageFramer.END_MARKER).encode("utf-8"))
+
+    sender = threading.Thread(target=send_all, daemon=True)
+    sender.start()
+
+    responses = []
+    while len(responses) < message_count:
+        bytes_read = client.recv_into(buffer)
+        assert bytes_read, "Server closed the connection early"
+        responses.extend(framer.feed(memoryview(buffer)[:bytes_read]))
+    elapsed = time.perf_counter() - start
+
+    client.shutdown(socket.SHUT_WR)
+    server.join(5)
+    client.close()
+
+    assert all(r["message"] == payload for r in responses)
+    megabytes = 2 * message_count * len(payload.encode("utf-8")) / (1024 * 1024)
+    return elapsed, megabytes / elapsed
+
+
+def test_socket_load():
+    if not hasattr(socket, "AF_UNIX"):
+        return
+    run_socket_load_test(message_count=5, payload_size=256 * 1024)
+
+
+def test_backend_failure_closes_pipe():
+    class BrokenBackend:
+        reads = 0
+
+        def readinto(self, buffer):
+            self.reads += 1
+            raise OSError("The pipe has been ended.")
+
+    backend = BrokenBackend()
+    handler = PipeHandler(backend)
+    commands = []
+    while not handler.closed:
+        commands.append(handler.read_command())
+        assert backend.reads < 5, "read loop did not stop on a broken pipe"
+    assert commands == [None]
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Pipe Transport Tests")
+    print("=" * 60)
+    test_split_multibyte_characters()
+    print("[SUCCESS] Split multi-byte characters")
+    test_multiple_framed_messages_in_one_read()
+    print("[SUCCESS] Multiple framed messages in one read")
+    test_backend_failure_closes_pipe()
+    print("[SUCCESS] Backend failure closes the pipe")
+    if hasattr(socket, "AF_UNIX"):
+        elapsed, throughput = run_socket_load_test()
+        print(f"[SUCCESS] Socket load test: {elapsed:.2f}s, {throughput:.1f} MB/s")
+    else:
+        print("[SKIP] Unix domain sockets are not available on this platform")
+
+
+if __name__ == "__main__":
+    main()
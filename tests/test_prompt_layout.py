@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Prompt Layout Tests
+Drives LoreMasterPlugin against the local fake model server and checks the prompts it sends
+and the prompt cache counters.
+
+Test Cases:
+1. With stable_prefix, a vision turn repeats the text turns' system prompt and history as its prefix
+2. Without it, vision turns get a standalone persona prompt
+3. Prompt token counters are kept per provider/model, with OpenAI's cached tokens as a ratio
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_model_server import FakeModelServer
+from fixtures import make_config, make_synthetic_source, work_dir
+
+from plugin import LoreMasterPlugin, PromptCacheStats
+
+TEXT_TURNS = ["Ask Athena from Ancient Mythology about her owl", "tell me more"]
+VISION_TURN = "What do you see on the screen?"
+
+
+def run_turns(stable_prefix):
+    """Talk through TEXT_TURNS and VISION_TURN; return the text requests' messages and the vision request"""
+    server = FakeModelServer(latency=0.01).start()
+    try:
+        with work_dir():
+            config = make_config(server)
+            config.context_config["stable_prefix"] = stable_prefix
+            lore_master = LoreMasterPlugin(config)
+            lore_master.vision_handler.capture_pipeline.image_source = make_synthetic_source()
+            text_requests, vision_requests = [], []
+            llm_handler, vision_handler = lore_master.llm_handler, lore_master.vision_handler
+            chat, analyze = llm_handler.chat, vision_handler._analyze
+
+            async def recording_chat(messages):
+                text_requests.append(messages)
+                return await chat(messages)
+
+            async def recording_analyze(prompt, image, context_messages=None):
+                vision_requests.append((prompt, context_messages))
+                return await analyze(prompt, image, context_messages)
+
+            llm_handler.chat, vision_handler._analyze = recording_chat, recording_analyze
+            try:
+                for user_input in TEXT_TURNS + [VISION_TURN]:
+                    assert lore_master.talk({"input": user_input})["success"]
+                stats = lore_master.stats()["prompt_cache"]
+            finally:
+                lore_master.character_manager.close()
+        return text_requests, vision_requests[0], stats
+    finally:
+        server.stop()
+
+
+def test_stable_prefix_layout():
+    text_requests, (prompt, context_messages), stats = run_turns(stable_prefix=True)
+    last_text = text_requests[-1]
+    # The vision context is the last text request plus its reply, and the question follows as a user turn
+    assert context_messages[:len(last_text)] == last_text
+    assert [message["role"] for message in context_messages[len(last_text):]] == ["assistant"]
+    assert prompt.endswith(f"User asks: {VISION_TURN}") and "Athena" not in prompt
+    # Two text replies and one vision answer (both text inputs are parsed locally)
+    assert sum(model["requests"] for model in stats.values()) == 3
+    assert all(model["prompt_tokens"] > 0 for model in stats.values())
+
+
+def test_standalone_vision_prompt():
+    text_requests, (prompt, context_messages), _ = run_turns(stable_prefix=False)
+    assert context_messages is None
+    assert prompt.startswith("You are Athena from Ancient Mythology.")
+    assert text_requests[0][0]["content"] == text_requests[1][0]["content"]
+
+
+def test_prompt_cache_counters():
+    stats = PromptCacheStats()
+    usage = SimpleNamespace(prompt_tokens=1200, prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+    stats.record_openai("gpt-4o", usage)
+    stats.record_openai("gpt-4o", SimpleNamespace(prompt_tokens=800, prompt_tokens_details=None))
+    stats.record_ollama("llama3.2", {"prompt_eval_count": 40, "prompt_eval_duration": 25_000_000})
+    assert stats.stats() == {
+        "openai:gpt-4o": {"requests": 2, "prompt_tokens": 2000, "cached_tokens": 1024, "prompt_eval_seconds": 0.0,
+                          "cached_ratio": 0.512},
+        "ollama:llama3.2": {"requests": 1, "prompt_tokens": 40, "cached_tokens": 0, "prompt_eval_seconds": 0.025,
+                            "cached_ratio": 0.0}
+    }
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Prompt Layout Tests")
+    print("=" * 60)
+    for test in [test_stable_prefix_layout, test_standalone_vision_prompt, test_prompt_cache_counters]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
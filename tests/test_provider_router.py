@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Provider Router Tests
+Exercises latency-aware routing with stand-in backends, and LLMHandler routing between the
+OpenAI and Ollama endpoints of local fake model servers.
+
+Test Cases:
+1. Requests go to the backend with the lowest error-weighted EWMA latency
+2. A failed request is retried on the next backend, and repeated failures open the circuit
+3. A request slower than its backend's p95 is hedged, and the first answer wins
+4. Streams fail over before their first fragment
+5. LLMHandler retries a failing OpenAI endpoint on Ollama and routes to Ollama from then on
+6. A never-measured standby is probed and wins the traffic when it is faster
+7. A demoted backend is measured again after explore_seconds and wins the traffic back once it recovers
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_model_server import FakeModelServer
+
+from plugin import ConfigManager, LLMHandler, ProviderRouter
+
+BACKENDS = ["openai:gpt-4o", "ollama:llama3.2"]
+
+
+def make_router(**overrides):
+    return ProviderRouter(BACKENDS, {"min_samples": 3, "hedge_min_seconds": 0.01, **overrides})
+
+
+def warm(router, backend, seconds, count=5):
+    for _ in range(count):
+        router.record(backend, seconds, True)
+
+
+def call(router, fn):
+    return asyncio.run(router.acall(fn))
+
+
+async def collect(fragments):
+    return [fragment async for fragment in fragments]
+
+
+def test_routes_to_the_fastest_backend():
+    router = make_router()
+    assert router.order() == BACKENDS  # nothing measured: configured provider first
+    warm(router, "openai:gpt-4o", 0.8)
+    warm(router, "ollama:llama3.2", 0.3)
+    assert router.order() == ["ollama:llama3.2", "openai:gpt-4o"]
+    for _ in range(2):
+        router.record("ollama:llama3.2", 0.3, False)
+    assert router.order() == ["openai:gpt-4o", "ollama:llama3.2"]
+
+
+def test_failover_and_circuit_breaker():
+    router = make_router(failure_threshold=2, cooldown_seconds=0.2)
+    warm(router, "openai:gpt-4o", 0.05)
+    warm(router, "ollama:llama3.2", 0.5)
+    calls = []
+
+    async def request(backend):
+        calls.append(backend)
+        if backend == "openai:gpt-4o":
+            raise ConnectionError("backend down")
+        return f"answer from {backend}"
+
+    assert call(router, request) == "answer from ollama:llama3.2"
+    assert call(router, request) == "answer from ollama:llama3.2"
+    assert router.stats()["openai:gpt-4o"]["circuit_open"]
+    calls.clear()
+    assert call(router, request) == "answer from ollama:llama3.2"
+    assert calls == ["ollama:llama3.2"]
+    time.sleep(0.25)
+    # After the cooldown the backend is tried again, and one more failure reopens the circuit
+    calls.clear()
+    call(router, request)
+    assert calls == ["openai:gpt-4o", "ollama:llama3.2"]
+    assert router.stats()["openai:gpt-4o"]["circuit_open"]
+
+
+async def slow_primary(backend):
+    await asyncio.sleep(0.5 if backend == "openai:gpt-4o" else 0.02)
+    return backend
+
+
+def test_hedged_requests():
+    router = make_router(hedge=True, explore_seconds=0)
+    warm(router, "openai:gpt-4o", 0.05)
+    start = time.perf_counter()
+    assert call(router, slow_primary) == "ollama:llama3.2"
+    assert time.perf_counter() - start < 0.3
+    assert router.stats()["ollama:llama3.2"]["hedge_wins"] == 1
+    # The hedge measured the other backend, which is now routed to first and not hedged
+    assert router.order()[0] == "ollama:llama3.2"
+    assert call(router, slow_primary) == "ollama:llama3.2"
+    # The losing request was cancelled, so it was never recorded
+    assert router.stats()["openai:gpt-4o"]["calls"] == 5
+
+
+def test_stream_failover():
+    router = make_router()
+
+    async def stream(backend):
+        if backend == "openai:gpt-4o":
+            raise ConnectionError("backend down")
+        yield "By the old laws, "
+        yield "yes."
+
+    assert asyncio.run(collect(router.astream(stream))) == ["By the old laws, ", "yes."]
+    assert router.stats()["openai:gpt-4o"]["errors"] == 1
+
+
+def test_llm_handler_routes_around_failing_openai():
+    failing = FakeModelServer(error_status=400).start()
+    working = FakeModelServer(latency=0.01).start()
+    try:
+        config = ConfigManager()
+        config.api_key = "fake-key"
+        config.llm_config.update(llm_provider="openai")
+        config.http_config.update(openai_base_url=failing.openai_base_url, ollama_host=working.url)
+        config.residency_config["schedule"] = False
+        config.routing_config["enabled"] = True
+        config.cassette_config["mode"] = None
+        handler = LLMHandler(config)
+        assert handler.router.backends == ["openai:gpt-4o", f"ollama:{config.llm_config['ollama_model']}"]
+        messages = [{"role": "user", "content": "Tell me about thunder."}]
+        for _ in range(3):
+            assert handler.chat(messages) == working.default_response
+        assert failing.stats() == {"errors": 1}
+        assert handler.router.order()[0].startswith("ollama:")
+    finally:
+        failing.stop()
+        working.stop()
+
+
+def served_by(router, latencies, count):
+    """Make count requests whose backends answer after the given latencies; return who answered each"""
+    async def request(backend):
+        await asyncio.sleep(latencies[backend])
+        return backend
+    return [call(router, request) for _ in range(count)]
+
+
+def test_unmeasured_standby_is_probed():
+    router = make_router()
+    latencies = {"openai:gpt-4o": 0.1, "ollama:llama3.2": 0.01}
+    # The preferred backend first, then one probe of the standby, which is faster from then on
+    assert served_by(router, latencies, 4) == ["openai:gpt-4o"] + ["ollama:llama3.2"] * 3
+    assert router.stats()["ollama:llama3.2"]["probes"] == 1
+
+
+def test_recovered_backend_wins_traffic_back():
+    router = make_router(explore_seconds=0.3)
+    warm(router, "openai:gpt-4o", 2.0)
+    warm(router, "ollama:llama3.2", 0.05)
+    latencies = {"openai:gpt-4o": 0.01, "ollama:llama3.2": 0.05}
+    start = time.monotonic()
+    while time.monotonic() - start < 0.3:
+        assert served_by(router, latencies, 1) == ["ollama:llama3.2"]
+    # The probe replaces OpenAI's stale average instead of averaging it with one fast call
+    assert served_by(router, latencies, 3) == ["openai:gpt-4o"] * 3
+    assert router.stats()["openai:gpt-4o"]["probes"] == 1
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Provider Router Tests")
+    print("=" * 60)
+    for test in [test_routes_to_the_fastest_backend, test_failover_and_circuit_breaker, test_hedged_requests,
+                 test_stream_failover, test_llm_handler_routes_around_failing_openai, test_unmeasured_standby_is_probed,
+                 test_recovered_backend_wins_traffic_back]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
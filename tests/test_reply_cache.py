@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Reply Cache Tests
+Exercises the disk-backed text reply cache without any LLM backend.
+
+Test Cases:
+1. Cached replies survive a restart; the question is normalized, the recent context and lore passages are not
+2. Least recently used replies are evicted once the cache exceeds its size
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugin import ReplyCache
+
+SYSTEM = {"role": "system", "content": "You are Zeus from Ancient Mythology."}
+
+
+def turn(question, *history):
+    return [SYSTEM, *history, {"role": "user", "content": question}]
+
+
+def test_replies_survive_restart():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "replies.db")
+        cache = ReplyCache(path)
+        key = cache.key("ollama:test", "Zeus", "Ancient Mythology", "What is the vault code?", turn("What is the vault code?"))
+        cache.put(key, "Zeus:Ancient Mythology", "The code is 1234.")
+        cache.close()
+
+        cache = ReplyCache(path)
+        same = cache.key("ollama:test", "Zeus", "Ancient Mythology", "what is the  vault code", turn("what is the  vault code"))
+        assert cache.get(same, "Zeus:Ancient Mythology") == "The code is 1234."
+        other_context = cache.key("ollama:test", "Zeus", "Ancient Mythology", "What is the vault code?",
+                                  turn("What is the vault code?", {"role": "assistant", "content": "Greetings."}))
+        assert cache.get(other_context, "Zeus:Ancient Mythology") is None
+        other_lore = cache.key("ollama:test", "Zeus", "Ancient Mythology", "What is the vault code?",
+                               turn("What is the vault code?"), "Lore about Ancient Mythology:\nThe vault code is 4321.")
+        assert cache.get(other_lore, "Zeus:Ancient Mythology") is None
+        stats = cache.stats()
+        persona = stats["personas"]["Zeus:Ancient Mythology"]
+        assert persona["hits"] == 1 and persona["misses"] == 2
+        cache.close()
+
+
+def test_lru_eviction_by_size():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ReplyCache(os.path.join(directory, "replies.db"), max_bytes=250)
+        for i in range(3):
+            cache.put(f"key{i}", "Zeus:Ancient Mythology", "x" * 100)
+        assert cache.get("key0", "Zeus:Ancient Mythology") is None
+        assert cache.get("key2", "Zeus:Ancient Mythology") is not None
+        assert cache.stats()["bytes"] <= 250
+        cache.close()
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Reply Cache Tests")
+    print("=" * 60)
+    for test in [test_replies_survive_restart, test_lru_eviction_by_size]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Model Residency Scheduling Tests
+Exercises ModelResidencyManager's request scheduling and cold-load accounting without Ollama.
+
+Test Cases:
+1. Requests for the loaded model go first, but at most max_consecutive of them while another model waits,
+   including requests joining a model that is still executing
+2. Blocking and asyncio callers queue on the same schedule
+3. Warm-up requests are scheduled and accounted like any other request
+4. Cold loads are detected from load_duration and per-model keep_alive overrides apply
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugin import BackendClientRegistry, ConfigManager, ModelResidencyManager
+
+TEXT_MODEL = "llama3.2"
+VISION_MODEL = "llava"
+
+
+def make_manager(**residency):
+    config = ConfigManager()
+    config.residency_config.update(schedule=True, **residency)
+    return ModelResidencyManager(config, BackendClientRegistry(config))
+
+
+def test_streak_limit_bounds_joining_requests():
+    async def run():
+        manager = make_manager(max_consecutive=2)
+        order = []
+        release = asyncio.Event()
+
+        async def request(model, name):
+            async with manager.arequest(model):
+                order.append(name)
+                await release.wait()
+
+        tasks = [asyncio.create_task(request(VISION_MODEL, "v1"))]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(request(TEXT_MODEL, "t1")))
+        tasks += [asyncio.create_task(request(VISION_MODEL, f"v{i}")) for i in (2, 3, 4)]
+        await asyncio.sleep(0.01)
+        # v2 joins the executing vision model; v3 and v4 would exceed the streak while t1 waits
+        assert order == ["v1", "v2"]
+        release.set()
+        await asyncio.gather(*tasks)
+        # v3 and v4 both join the vision model once t1 is done, in either order
+        assert order[:3] == ["v1", "v2", "t1"] and sorted(order[3:]) == ["v3", "v4"]
+        assert manager.stats()["swaps"] == 2
+
+    asyncio.run(run())
+
+
+def test_sync_and_async_callers_share_the_schedule():
+    manager = make_manager(max_consecutive=4)
+    order = []
+    held = threading.Event()
+    release = threading.Event()
+
+    def sync_request():
+        with manager.request(VISION_MODEL):
+            order.append("sync vision")
+            held.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=sync_request)
+    thread.start()
+    assert held.wait(5)
+
+    async def run():
+        async def text_request():
+            async with manager.arequest(TEXT_MODEL):
+                order.append("async text")
+
+        task = asyncio.create_task(text_request())
+        await asyncio.sleep(0.05)
+        # The text request waits for the vision request held by the other thread
+        assert order == ["sync vision"]
+        release.set()
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(run())
+    thread.join()
+    assert order == ["sync vision", "async text"]
+    stats = manager.stats()
+    assert stats["loaded_model"] == TEXT_MODEL and stats["swaps"] == 1
+
+
+def test_warm_up_is_scheduled():
+    manager = make_manager(cold_load_threshold_seconds=0.5)
+    manager.config.llm_config["ollama_model"] = TEXT_MODEL
+    manager.config.vision_config["ollama_vision_model"] = VISION_MODEL
+
+    class Client:
+        def chat(self, **kwargs):
+            return {"load_duration": int(2e9)}
+
+        generate = chat
+
+    manager.client_registry.ollama_client = Client
+    manager.warm_up("You are Zeus.")
+    stats = manager.stats()
+    assert stats["loaded_model"] == TEXT_MODEL
+    assert stats["swaps"] == 1  # loading the first model is not a swap
+    assert stats["models"][VISION_MODEL]["cold_loads"] == stats["models"][TEXT_MODEL]["cold_loads"] == 1
+
+
+def test_cold_loads_and_keep_alive():
+    manager = make_manager(keep_alive="30m", model_keep_alive={VISION_MODEL: "5m"}, cold_load_threshold_seconds=0.5)
+    assert manager.keep_alive(TEXT_MODEL) == "30m"
+    assert manager.keep_alive(VISION_MODEL) == "5m"
+    manager.record_response(TEXT_MODEL, {"load_duration": int(0.01e9)})
+    manager.record_response(TEXT_MODEL, {"load_duration": int(2.5e9)})
+    stats = manager.stats()["models"][TEXT_MODEL]
+    assert stats["requests"] == 2 and stats["cold_loads"] == 1
+    assert manager.stats()["recent_cold_loads"][0]["seconds"] == 2.5
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Model Residency Scheduling Tests")
+    print("=" * 60)
+    for test in [
+        test_streak_limit_bounds_joining_requests,
+        test_sync_and_async_callers_share_the_schedule,
+        test_warm_up_is_scheduled,
+        test_cold_loads_and_keep_alive
+    ]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Screen Cache Tests
+Exercises perceptual-hash frame reuse and VLM answer reuse, against the local fake model server.
+
+Test Cases:
+1. A slightly changed screen reuses the cached JPEG; a different screen does not
+2. A repeated vision query on an unchanged screen reuses the VLM answer, unless the conversation context differs
+"""
+
+import os
+import sys
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_model_server import FakeModelServer
+from fixtures import make_config, make_synthetic_source, work_dir
+
+from plugin import ScreenCache, ScreenCapturePipeline, VisionHandler
+
+VISION_CONFIG = {"screenshot_size": [640, 360], "screenshot_quality": 80}
+ZEUS = {"character": "Zeus", "game": "Ancient Mythology"}
+
+
+def with_cursor(source):
+    """The same screen with a small mouse cursor drawn on it"""
+    def grab():
+        frame = source()
+        ImageDraw.Draw(frame).rectangle((100, 100, 112, 118), fill="white")
+        return frame
+    return grab
+
+
+def test_frame_reuse():
+    source = make_synthetic_source()
+    cache = ScreenCache(max_frames=2)
+    pipeline = ScreenCapturePipeline(VISION_CONFIG, source, cache)
+    first = pipeline.capture()
+    pipeline.image_source = with_cursor(source)
+    assert pipeline.capture() is first
+    pipeline.image_source = lambda: source().transpose(Image.Transpose.ROTATE_270)
+    assert pipeline.capture() is not first
+    assert cache.stats() == {"frames": 2, "frame_hits": 1, "frame_misses": 2, "answer_hits": 0,
+                             "answer_misses": 0, "evictions": 0}
+
+
+def test_answer_reuse():
+    server = FakeModelServer(latency=0.01).start()
+    try:
+        with work_dir():
+            handler = VisionHandler(make_config(server), image_source=make_synthetic_source())
+            context = [{"role": "system", "content": "You are Zeus from Ancient Mythology."}]
+            for _ in range(2):
+                assert handler.analyze_screen("What do you see?", ZEUS, context_messages=context) == server.vision_response
+            assert server.stats() == {"ollama_chat": 1}
+            handler.analyze_screen("what do you see", ZEUS, context_messages=context)
+            assert server.stats() == {"ollama_chat": 1}
+
+            later = context + [{"role": "user", "content": "Where is the temple?"},
+                               {"role": "assistant", "content": "Beyond the northern ridge."}]
+            handler.analyze_screen("What do you see?", ZEUS, context_messages=later)
+            assert server.stats() == {"ollama_chat": 2}
+            assert handler.stats()["screen_cache"]["answer_hits"] == 2
+    finally:
+        server.stop()
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Screen Cache Tests")
+    print("=" * 60)
+    for test in [test_frame_reuse, test_answer_reuse]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Sentence Splitter Tests
+Exercises SentenceSplitter and streamed replies spoken sentence by sentence, against the local fake model server.
+
+Test Cases:
+1. Sentences end at a terminator followed by whitespace, also when it arrives in a later fragment
+2. Short sentences are merged with the next one, and flush() returns the unfinished rest
+3. With streaming, the first sentence is queued for speech before the reply has finished generating
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_model_server import FakeModelServer
+from fixtures import make_config, work_dir
+
+from plugin import LoreMasterPlugin, SentenceSplitter
+
+REPLY = "The storm gathers over Olympus tonight. Zeus is angry with the mortals again! Hide your ships, sailor."
+
+
+def test_split_across_fragments():
+    splitter = SentenceSplitter(min_chars=0)
+    assert splitter.feed("It costs 3.") == []
+    assert splitter.feed("5 drachmae. Really?") == ["It costs 3.5 drachmae."]
+    assert splitter.feed('" he') == ['Really?"']  # a closing quote stays with its sentence
+    assert splitter.feed(" asked") == []
+    assert splitter.feed("... Yes! ") == ["he asked...", "Yes!"]
+    assert splitter.flush() == ""
+
+
+def test_short_sentences_merged_and_flush():
+    splitter = SentenceSplitter(min_chars=20)
+    assert splitter.feed("Yes. No. ") == []
+    assert splitter.feed("Perhaps the gods will decide. And then") == ["Yes. No. Perhaps the gods will decide."]
+    assert splitter.flush() == "And then"
+    assert splitter.flush() == ""
+
+
+def test_streamed_reply_spoken_early():
+    server = FakeModelServer(latency=0.02, tokens_per_second=40, default_response=REPLY).start()
+    try:
+        with work_dir():
+            lore_master = LoreMasterPlugin(make_config(server, streaming=True))
+            spoken = []
+            lore_master.speech_engine.speak = lambda text, *args, **kwargs: spoken.append((time.perf_counter(), text))
+            try:
+                assert lore_master.talk({"input": "Ask Zeus from Ancient Mythology about thunder"}) == {"success": True, "message": REPLY}
+                finished = time.perf_counter()
+            finally:
+                lore_master.character_manager.close()
+        assert [text for _, text in spoken] == [
+            "The storm gathers over Olympus tonight.", "Zeus is angry with the mortals again!", "Hide your ships, sailor."
+        ]
+        # About 20 tokens at 40 per second: the first sentence is queued well before the end
+        assert finished - spoken[0][0] > 0.2
+    finally:
+        server.stop()
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Sentence Splitter Tests")
+    print("=" * 60)
+    for test in [test_split_across_fragments, test_short_sentences_merged_and_flush, test_streamed_reply_spoken_early]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
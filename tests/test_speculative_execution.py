@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Speculative Execution Tests
+Drives LoreMasterPlugin with "speculative" execution against the local fake model server.
+
+Test Cases:
+1. A reply speculated for the active context is used when the parser extracts the same message
+2. A reply speculated for a message the parser rephrased is discarded and the turn is generated normally
+3. A vision query uses the speculative screenshot; with streaming, replies are not speculated
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_model_server import FakeModelServer
+from fixtures import make_config, make_synthetic_source, work_dir
+
+from plugin import LoreMasterPlugin
+
+
+def run_plugin(test, streaming=False):
+    server = FakeModelServer(latency=0.02, responses={"lightning": "Lightning is my spear, mortal."}).start()
+    try:
+        with work_dir():
+            config = make_config(server, streaming=streaming, speculative=True)
+            config.parser_config.update(local_confidence_threshold=0.5, cache_size=0)
+            lore_master = LoreMasterPlugin(config)
+            lore_master.vision_handler.capture_pipeline.image_source = make_synthetic_source()
+            try:
+                # Handled by the local parser: sets the active context, nothing to speculate on
+                assert lore_master.talk({"input": "Ask Zeus from Ancient Mythology about thunder"})["success"]
+                test(lore_master)
+            finally:
+                lore_master.character_manager.close()
+    finally:
+        server.stop()
+
+
+def last_user_message(lore_master):
+    return [m["content"] for m in lore_master.character_manager.current_history if m["role"] == "user"][-1]
+
+
+def test_speculative_reply_used():
+    def test(lore_master):
+        response = lore_master.talk({"input": "  And what about lightning?  "})
+        assert response == {"success": True, "message": "Lightning is my spear, mortal."}
+        stats = lore_master.speculative_executor.stats()
+        assert stats["skipped"] == 1 and stats["reply_hits"] == 1 and stats["reply_misses"] == 0
+        # History records the message the reply was generated for
+        assert last_user_message(lore_master) == "And what about lightning?"
+
+    run_plugin(test)
+
+
+def test_rephrased_message_not_used():
+    def test(lore_master):
+        parser = lore_master.message_parser
+
+        async def rephrasing_parse(natural_input):
+            return {"game": "Game", "character": "Character", "sex": "male",
+                    "message": "Tell me about the lightning bolt.", "requires_vision": False}
+
+        parser._parse_with_llm = rephrasing_parse
+        response = lore_master.talk({"input": "lightning?"})
+        assert response["success"]
+        stats = lore_master.speculative_executor.stats()
+        assert stats["reply_hits"] == 0 and stats["reply_misses"] == 1
+        assert stats["cancelled"] + stats["discarded"] == 2  # the reply and the screenshot
+        assert last_user_message(lore_master) == "Tell me about the lightning bolt."
+
+    run_plugin(test)
+
+
+def test_vision_and_streaming():
+    def test(lore_master):
+        response = lore_master.talk({"input": "Does the display show a map?"})
+        assert response["message"] == "I see a misty landscape and a path leading north."
+        stats = lore_master.speculative_executor.stats()
+        assert stats["screenshot_hits"] == 1
+        assert stats["reply_hits"] + stats["reply_misses"] == 0  # streaming: no reply was speculated
+
+    run_plugin(test, streaming=True)
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Speculative Execution Tests")
+    print("=" * 60)
+    for test in [test_speculative_reply_used, test_rephrased_message_not_used, test_vision_and_streaming]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
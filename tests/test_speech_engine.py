@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Speech Engine Tests
+Exercises the speech queue with the null backend (simulated playback time, no audio).
+
+Test Cases:
+1. A newer reply cuts off the utterance playing and drops the queued ones of older replies
+2. With the "queue" policy every utterance is played in order
+3. stop() drops everything queued and cuts off the current utterance
+4. Voices are resolved once per persona and sex, honoring per-character overrides
+"""
+
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugin import SpeechEngine
+
+# 600 words per minute: each ten-word sentence plays for one second
+SENTENCE = "one two three four five six seven eight nine ten"
+
+
+def make_engine(**overrides):
+    return SpeechEngine({"backend": "null", "null_words_per_minute": 600, **overrides})
+
+
+def wait_until_playing(engine):
+    for _ in range(100):
+        if engine.current_reply is not None:
+            return
+        time.sleep(0.01)
+
+
+def test_newer_reply_supersedes_older():
+    engine = make_engine()
+    for _ in range(3):
+        engine.speak(SENTENCE, reply_id="old")
+    wait_until_playing(engine)
+    start = time.perf_counter()
+    engine.speak("Short answer.", reply_id="new")
+    engine.speech_queue.join()
+    assert time.perf_counter() - start < 0.5
+    assert engine.stats() == {"queued": 0, "spoken": 1, "dropped": 2, "interrupted": 1}
+
+
+def test_queue_policy_plays_everything():
+    engine = make_engine(null_words_per_minute=60000, queue_policy="queue")
+    engine.speak(SENTENCE, reply_id="old")
+    engine.speak(SENTENCE, reply_id="new")
+    engine.speech_queue.join()
+    assert engine.stats()["spoken"] == 2
+
+
+def test_stop_clears_the_queue():
+    engine = make_engine()
+    for _ in range(3):
+        engine.speak(SENTENCE, reply_id="only")
+    wait_until_playing(engine)
+    engine.stop()
+    engine.speech_queue.join()
+    assert engine.stats() == {"queued": 0, "spoken": 0, "dropped": 2, "interrupted": 1}
+
+
+def test_voice_resolution_is_cached():
+    engine = make_engine(voices={"Zeus": "mark"})
+    voices = [
+        SimpleNamespace(name="Microsoft David", id="TTS_MS_EN-US_DAVID"),
+        SimpleNamespace(name="Microsoft Zira", id="TTS_MS_EN-US_ZIRA"),
+        SimpleNamespace(name="Microsoft Mark", id="TTS_MS_EN-US_MARK")
+    ]
+    assert engine._voice_for(voices, True, "Hera") == "TTS_MS_EN-US_ZIRA"
+    assert engine._voice_for(voices, False, "Zeus") == "TTS_MS_EN-US_MARK"
+    assert engine._voice_for(voices, False, "Ares") == "TTS_MS_EN-US_DAVID"
+    assert engine._voice_for([], True, "Hera") == "TTS_MS_EN-US_ZIRA"
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Speech Engine Tests")
+    print("=" * 60)
+    for test in [test_newer_reply_supersedes_older, test_queue_policy_plays_everything, test_stop_clears_the_queue,
+                 test_voice_resolution_is_cached]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Speech Render Tests
+Exercises pre-rendered speech with the null backend, which renders silent WAV files as long
+as its simulated playback.
+
+Test Cases:
+1. The audio cache is content-addressed by voice and text and evicts least recently used files
+2. The next sentence is rendered while the current one plays, so playback has no render gaps
+3. Repeated and pre-rendered lines are played from the cache without rendering again
+4. Utterances of a superseded reply are not rendered
+5. A failed render falls back to live speech
+6. A render that is not ready in time is spoken live, and a wait for a superseded reply's render ends early
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugin import AudioCache, SpeechEngine
+
+# 600 words per minute: each five-word sentence plays for half a second
+SENTENCES = ["one two three four five", "six seven eight nine ten", "eleven twelve thirteen fourteen fifteen"]
+RENDER_SECONDS = 0.3
+
+
+def make_engine(cache_dir, **overrides):
+    return SpeechEngine({"backend": "null", "null_words_per_minute": 600, "render_cache_dir": cache_dir,
+                         "render_workers": 2, **overrides})
+
+
+def slow_synthesis(engine):
+    """Make every render take RENDER_SECONDS, like a real TTS engine"""
+    synthesize = engine._synthesize
+
+    def slow(*args):
+        time.sleep(RENDER_SECONDS)
+        synthesize(*args)
+    engine._synthesize = slow
+
+
+def write_file(path, size):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+
+
+def test_audio_cache_eviction():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = AudioCache(cache_dir, max_bytes=250)
+        assert AudioCache.key("Hello", "david") != AudioCache.key("Hello", "zira")
+        keys = [AudioCache.key(f"line {i}", None) for i in range(3)]
+        for key in keys[:2]:
+            write_file(cache.temp_path(key), 100)
+            cache.put(key, cache.temp_path(key))
+        assert cache.get(keys[0])  # keys[1] is now the least recently used
+        write_file(cache.temp_path(keys[2]), 100)
+        cache.put(keys[2], cache.temp_path(keys[2]))
+        assert cache.get(keys[1]) is None
+        assert sorted(os.listdir(cache_dir)) == sorted(f"{key}.wav" for key in (keys[0], keys[2]))
+        assert cache.stats()["evictions"] == 1
+        # A restart picks the files up again
+        assert AudioCache(cache_dir).stats()["bytes"] == 200
+
+
+def test_rendering_overlaps_playback():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        engine = make_engine(cache_dir)
+        slow_synthesis(engine)
+        start = time.perf_counter()
+        for sentence in SENTENCES:
+            engine.speak(sentence, reply_id="reply")
+        engine.speech_queue.join()
+        elapsed = time.perf_counter() - start
+        # Serial rendering would take 3 * (0.3 + 0.5) = 2.4s; overlapped it is the first render plus playback
+        assert elapsed < 2.0, elapsed
+        assert engine.stats()["rendered"] == 3
+        assert engine.stats()["spoken"] == 3
+        engine.close()
+
+
+def test_repeated_and_prerendered_lines_hit_the_cache():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        engine = make_engine(cache_dir, prerender=["An error occurred while analyzing the screen."])
+        for future in engine.prerender():
+            future.result()
+        slow_synthesis(engine)
+        rendered = engine.stats()["rendered"]
+        engine.speak("An error occurred while analyzing the screen.", is_female=True, reply_id="first")
+        engine.speech_queue.join()
+        assert engine.stats()["rendered"] == rendered
+        # One after the other, so the repeat cannot race the first render
+        for _ in range(2):
+            engine.speak(SENTENCES[0], reply_id="second")
+            engine.speech_queue.join()
+        stats = engine.stats()
+        assert stats["rendered"] == rendered + 1
+        assert stats["render_hits"] >= 2
+        assert stats["spoken"] == 3
+        assert stats["audio_cache"]["entries"] == 2
+        engine.close()
+
+
+def test_superseded_utterances_are_not_rendered():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        engine = make_engine(cache_dir, render_workers=1)
+        slow_synthesis(engine)
+        for sentence in SENTENCES:
+            engine.speak(sentence, reply_id="old")
+        engine.speak("New answer.", reply_id="new")
+        engine.speech_queue.join()
+        stats = engine.stats()
+        # Only the render already running when the new reply arrived is wasted
+        assert stats["rendered"] == 2
+        assert stats["dropped"] == 3
+        engine.close()
+
+
+def test_failed_render_speaks_live():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        engine = make_engine(cache_dir)
+
+        def broken(*args):
+            raise RuntimeError("no audio device")
+        engine._synthesize = broken
+        engine.speak("Still spoken.", reply_id="reply")
+        engine.speech_queue.join()
+        assert engine.stats()["spoken"] == 1
+        assert os.listdir(cache_dir) == []
+        engine.close()
+
+
+def test_render_timeout_and_superseded_wait():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        engine = make_engine(cache_dir, render_timeout_seconds=0.1)
+        slow_synthesis(engine)
+        start = time.perf_counter()
+        engine.speak(SENTENCES[0], reply_id="reply")
+        engine.speech_queue.join()
+        # Spoken live (0.5s) after the timeout instead of after the render
+        assert time.perf_counter() - start < RENDER_SECONDS + 0.5, time.perf_counter() - start
+        assert engine.stats()["render_timeouts"] == 1 and engine.stats()["spoken"] == 1
+        engine.close()
+
+        engine = make_engine(cache_dir, render_timeout_seconds=5)
+        slow_synthesis(engine)
+        engine.speak(SENTENCES[1], reply_id="old")
+        time.sleep(0.05)
+        start = time.perf_counter()
+        engine.speak(SENTENCES[2], reply_id="new")
+        while engine.stats()["dropped"] == 0 and time.perf_counter() - start < 1:
+            time.sleep(0.01)
+        assert time.perf_counter() - start < RENDER_SECONDS / 2
+        engine.speech_queue.join()
+        assert engine.stats()["spoken"] == 1 and engine.stats()["render_timeouts"] == 0
+        engine.close()
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Speech Render Tests")
+    print("=" * 60)
+    for test in [test_audio_cache_eviction, test_rendering_overlaps_playback, test_repeated_and_prerendered_lines_hit_the_cache,
+                 test_superseded_utterances_are_not_rendered, test_failed_render_speaks_live,
+                 test_render_timeout_and_superseded_wait]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
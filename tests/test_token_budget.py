@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Token Budget Tests
+Exercises CharacterManager's token-budgeted history without any LLM backend.
+
+Test Cases:
+1. History is trimmed to the budget left after the persona prompt, keeping the window on a user turn
+2. The budget is taken from the active persona's prompt, not the one last sent for another context
+3. With stable_prefix, eviction compacts below the budget so history stays append-only for several turns
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugin import CharacterManager
+
+TURN = "Tell me about the old temple beyond the northern ridge."
+
+
+def make_manager(**context_config):
+    os.chdir(tempfile.mkdtemp())
+    return CharacterManager(context_config)
+
+
+def prompt_tokens(manager, character, game):
+    manager.switch_context(character, game)
+    return manager.count_tokens(manager.active_system_prompt())
+
+
+def test_history_trimmed_to_budget():
+    manager = make_manager()
+    turn_tokens = manager.count_tokens(TURN)
+    manager.prompt_token_budget = prompt_tokens(manager, "Zeus", "Ancient Mythology") + 4 * turn_tokens
+    try:
+        for i in range(10):
+            manager.add_message("user" if i % 2 == 0 else "assistant", TURN)
+            assert manager.current_context.total_tokens <= 4 * turn_tokens
+        assert len(manager.current_history) == 4 and manager.current_history[0]["role"] == "user"
+        messages = manager.get_context_messages(manager.active_system_prompt())
+        assert len(messages) == 5
+    finally:
+        manager.close()
+
+
+def test_budget_uses_active_persona_prompt():
+    manager = make_manager()
+    turn_tokens = manager.count_tokens(TURN)
+    long_name = "Zeus, " + "Thunderer of the Heavens, " * 60
+    short_tokens = prompt_tokens(manager, "Hermes", "Ancient Mythology")
+    manager.prompt_token_budget = short_tokens + 6 * turn_tokens
+    try:
+        # Send a context for a persona whose prompt alone exceeds the budget
+        manager.switch_context(long_name, "Ancient Mythology")
+        manager.add_message("user", TURN)
+        manager.get_context_messages(manager.active_system_prompt())
+
+        manager.switch_context("Hermes", "Ancient Mythology")
+        for i in range(6):
+            manager.add_message("user" if i % 2 == 0 else "assistant", TURN)
+        assert len(manager.current_history) == 6
+        assert manager.system_prompt_tokens == short_tokens
+    finally:
+        manager.close()
+
+
+def test_stable_prefix_compaction():
+    manager = make_manager(stable_prefix=True, compaction_target=0.5)
+    turn_tokens = manager.count_tokens(TURN)
+    manager.prompt_token_budget = prompt_tokens(manager, "Zeus", "Ancient Mythology") + 8 * turn_tokens
+    try:
+        lengths = []
+        for i in range(16):
+            manager.add_message("user" if i % 2 == 0 else "assistant", TURN)
+            lengths.append(len(manager.current_history))
+        # Compacts to half the budget (and a user turn) at once, then grows append-only until the budget is exceeded again
+        assert lengths[:9] == [1, 2, 3, 4, 5, 6, 7, 8, 3]
+        assert lengths[9:15] == [4, 5, 6, 7, 8, 3]
+    finally:
+        manager.close()
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Token Budget Tests")
+    print("=" * 60)
+    for test in [test_history_trimmed_to_budget, test_budget_uses_active_persona_prompt, test_stable_prefix_compaction]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tracer Tests
+Exercises per-request stage timing with Tracer.
+
+Test Cases:
+1. Stages recorded inside a request are listed in its summary log line, with the request ID
+2. The request ID follows the call into asyncio tasks and onto the background loop, and is cleared afterwards
+3. Stages get rolling histograms per stage and per stage and model; reset() clears them
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plugin
+from plugin import LatencyHistogram, Tracer, background_loop
+
+
+def test_request_summary():
+    tracer = Tracer()
+    logged = []
+    log_event = plugin.log_event
+    plugin.log_event = lambda message, *args, **kwargs: logged.append(message)
+    try:
+        with tracer.request("talk") as trace:
+            with tracer.stage("parse"):
+                time.sleep(0.01)
+            tracer.record("llm", 0.25, "ollama:llama3.2")
+        with tracer.request("talk"):
+            pass
+    finally:
+        plugin.log_event = log_event
+    assert len(trace.request_id) == 8
+    assert logged[0].startswith(f"[{trace.request_id}] talk took ")
+    assert "(parse " in logged[0] and logged[0].endswith(", llm 250ms)")
+    assert logged[1].endswith("(no stages)") and logged[1][1:9] != trace.request_id
+    assert tracer.stats()["stages"]["talk"]["count"] == 2
+
+
+def test_request_id_follows_the_call():
+    tracer = Tracer()
+    assert tracer.request_id() is None
+
+    async def in_task():
+        await asyncio.sleep(0)
+        tracer.record("task", 0.001)
+        return tracer.request_id()
+
+    async def on_loop():
+        return await asyncio.gather(in_task(), in_task())
+
+    with tracer.request() as trace:
+        assert tracer.request_id() == trace.request_id
+        assert background_loop.run(on_loop()) == [trace.request_id, trace.request_id]
+    assert tracer.request_id() is None
+    assert trace.stages == [("task", 0.001), ("task", 0.001)]
+
+
+def test_histograms_per_model_and_reset():
+    tracer = Tracer(window=4)
+    for seconds in [0.1, 0.2, 0.3, 0.4, 0.5]:
+        tracer.record("llm", seconds, "openai:gpt-4o")
+    tracer.record("llm", 1.0, "ollama:llama3.2")
+    tracer.record("speech", 0.05)
+    stats = tracer.stats()
+    # The window keeps the 4 latest samples; count and mean cover all of them
+    assert stats["stages"]["llm"] == {"count": 6, "mean_ms": 416.7, "p50_ms": 500.0, "p95_ms": 1000.0,
+                                      "p99_ms": 1000.0, "max_ms": 1000.0}
+    assert stats["models"]["llm openai:gpt-4o"]["count"] == 5
+    assert stats["models"]["llm openai:gpt-4o"]["p50_ms"] == 400.0
+    assert stats["models"]["llm ollama:llama3.2"]["max_ms"] == 1000.0
+    assert set(stats["models"]) == {"llm openai:gpt-4o", "llm ollama:llama3.2"}
+    assert stats["stages"]["speech"]["count"] == 1
+    tracer.reset()
+    assert tracer.stats() == {"stages": {}, "models": {}}
+    assert LatencyHistogram().summary() == {"count": 0}
+
+
+def main():
+    """Main test runner"""
+    print("[START] Starting Tracer Tests")
+    print("=" * 60)
+    for test in [test_request_summary, test_request_id_follows_the_call, test_histograms_per_model_and_reset]:
+        test()
+        print(f"[SUCCESS] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()